@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# -------------------------------
+# 분석 결과 캐시 설정 (env로 조정)
+# -------------------------------
+# 비워두면 디스크 캐시 없이 프로세스 안 LRU 만 사용
+ANALYSIS_CACHE_PATH = os.getenv(
+    "ANALYSIS_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_cache.sqlite3"),
+)
+ANALYSIS_CACHE_LRU_SIZE = int(os.getenv("ANALYSIS_CACHE_LRU_SIZE", "2048"))
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "1") == "1"
+
+_SPACES = re.compile(r"\s+")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def normalize_text(text: str | None) -> str:
+    """
+    같은 기사인데 공백/줄바꿈/전각 문자만 다른 경우를 같은 키로 보도록 정규화.
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def cache_key(title: str, content: str, model: str, prompt_version: str) -> str:
+    """
+    모델 + 프롬프트 버전 + 정규화한 제목/본문의 sha256.
+    모델이나 프롬프트가 바뀌면 키가 달라져서 예전 결과를 쓰지 않는다.
+    """
+    h = hashlib.sha256()
+    for part in (model, prompt_version, normalize_text(title), normalize_text(content)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+# -------------------------------
+# SQLite + 프로세스 안 LRU
+# -------------------------------
+class AnalysisCache:
+    """
+    key → 분석 결과 dict.
+    먼저 메모리 LRU(lru_size 개)를 보고, 없으면 SQLite 파일을 본다.
+    SQLite 파일은 여러 프로세스(API 서버, 배치 runner)가 같이 쓸 수 있다.
+    """
+
+    def __init__(self, path: str | None, lru_size: int):
+        self.path = path
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # 여러 스레드에서 같은 커넥션을 쓰되, 접근은 self._lock 으로 직렬화
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key        TEXT PRIMARY KEY,
+                    value      TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+
+    def _remember(self, key: str, value: dict):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return dict(value)
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT value FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    return dict(value)
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            self._remember(key, dict(value))
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), time.time()),
+                )
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            stored = None
+            if self._conn is not None:
+                stored = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "memory_entries": len(self._lru),
+                "stored_entries": stored,
+                "path": self.path,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def get_analysis_cache() -> AnalysisCache | None:
+    """
+    프로세스 전체에서 하나만 만들어 공유. ANALYSIS_CACHE_ENABLED=0 이면 None.
+    """
+    global _cache
+    if not ANALYSIS_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache(ANALYSIS_CACHE_PATH or None, ANALYSIS_CACHE_LRU_SIZE)
+    return _cache
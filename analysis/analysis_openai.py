@@ -1,18 +1,50 @@
+import asyncio
 import json
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from analysis.analysis_cache import cache_key, get_analysis_cache
+from analysis.keywords_tfidf import fallback_keywords
+from analysis.tokens import UsageStats, count_tokens, split_chunks, truncate_lead_tail
 
 # .env 로드
 load_dotenv()
 
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+# 프롬프트 / 출력 형식을 바꾸면 올려서 예전 캐시 결과를 쓰지 않게 한다
+PROMPT_VERSION = "v1"
+
+# 긴 기사 처리: 본문이 OPENAI_INPUT_TOKEN_BUDGET 토큰을 넘으면
+# truncate(기본) = 앞 문단 + 끝 문단만 보냄 / map_reduce = 조각별 요약을 동시에 받은 뒤 합쳐서 분석
+OPENAI_INPUT_TOKEN_BUDGET = int(os.getenv("OPENAI_INPUT_TOKEN_BUDGET", "6000"))
+OPENAI_LONG_ARTICLE_MODE = os.getenv("OPENAI_LONG_ARTICLE_MODE", "truncate")
+OPENAI_CHUNK_TOKENS = int(os.getenv("OPENAI_CHUNK_TOKENS", "3000"))
+OPENAI_MAP_WORKERS = int(os.getenv("OPENAI_MAP_WORKERS", "4"))
+
+# 프로세스 전체 호출 통계 (토큰 / 지연시간 분포)
+USAGE_STATS = UsageStats()
+_usage_lock = threading.Lock()   # map 단계 호출들이 같은 usage dict 를 동시에 갱신
+
+# API 서버(async) 쪽 OpenAI 호출 설정
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))                   # 요청당 timeout(초)
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))    # keep-alive 커넥션 풀 크기
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
 # OpenAI 클라이언트 생성
 client = OpenAI(
     api_key=os.getenv("OPENAI_API_KEY")
 )
 
+_async_client = None
+
 
 def _extract_json(text: str) -> str:
     """
@@ -41,14 +73,13 @@ def _extract_json(text: str) -> str:
     return text.strip()
 
 
-def analyze_article_with_openai(title: str, content: str) -> dict:
+def build_chat_request(title: str, content: str) -> dict:
     """
-    article 테이블의 title + content 를 받아서
-    - summary: 한 문단 요약 (한국어)
-    - sentiment: positive | neutral | negative ...
-    - keywords: 키워드 리스트
-    를 반환한다.
+    기사 1개 분석용 chat.completions 요청 body.
+    (단건 호출과 Batch API 입력 파일이 같은 프롬프트를 쓰도록 한 곳에서 만든다)
+    본문은 OPENAI_INPUT_TOKEN_BUDGET 에 맞게 앞/뒤만 남겨서 넣는다.
     """
+    content = truncate_lead_tail(content, OPENAI_INPUT_TOKEN_BUDGET, OPENAI_MODEL)
 
     prompt = f"""
     너는 한국어 뉴스 기사를 분석하는 도우미야.
@@ -69,20 +100,22 @@ def analyze_article_with_openai(title: str, content: str) -> dict:
     설명 문장 없이 JSON만 출력해.
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [
             {"role": "system", "content": "너는 JSON만 출력하는 뉴스 분석기야. 반드시 순수 JSON만 반환해."},
             {"role": "user", "content": prompt},
         ],
-        temperature=0.2,
+        "temperature": 0.2,
         # 가능하면 JSON 모드 사용 (지원되는 모델에서만)
-        response_format={"type": "json_object"},
-    )
+        "response_format": {"type": "json_object"},
+    }
 
-    result_text = response.choices[0].message.content
-    print("[DEBUG] raw response:", repr(result_text))
 
+def parse_analysis_text(result_text: str) -> dict:
+    """
+    모델 응답 텍스트 → 분석 dict. JSON 이 깨졌으면 빈 결과 + raw 원문.
+    """
     # GPT 응답에서 JSON 부분만 추출
     clean_text = _extract_json(result_text)
 
@@ -99,3 +132,396 @@ def analyze_article_with_openai(title: str, content: str) -> dict:
         }
 
     return result_json
+
+
+def has_keywords(result: dict) -> bool:
+    keywords = result.get("keywords")
+    return isinstance(keywords, list) and any(str(k).strip() for k in keywords)
+
+
+def fill_missing_keywords(result: dict, title: str, content: str) -> dict:
+    """
+    모델이 키워드를 못 줬으면(JSON 깨짐, 빈 배열) 로컬 TF-IDF 키워드로 채운다.
+    채운 결과는 keywords_source="tfidf" 로 표시하고 캐시하지 않는다.
+    """
+    if has_keywords(result):
+        return result
+    result["keywords"] = fallback_keywords(title, content)
+    result["keywords_source"] = "tfidf"
+    print(f"[LOG] 모델 키워드 없음 → 로컬 TF-IDF 키워드 {len(result['keywords'])}개 사용")
+    return result
+
+
+def _new_usage(mode: str) -> dict:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_sec": 0.0, "mode": mode}
+
+
+def _record_call(response, kind: str, usage: dict, latency: float) -> str:
+    """
+    응답 1개의 토큰 사용량 / 지연시간 기록 후 본문 텍스트 반환.
+    usage 에는 기사 1개 분석에 든 호출 수 / 토큰을 누적한다.
+    """
+    prompt_tokens = getattr(response.usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(response.usage, "completion_tokens", 0) or 0
+    USAGE_STATS.record(kind, prompt_tokens, completion_tokens, latency)
+
+    with _usage_lock:
+        usage["calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["completion_tokens"] += completion_tokens
+        usage["latency_sec"] = round(usage["latency_sec"] + latency, 3)   # 호출 시간 합계
+    return response.choices[0].message.content
+
+
+def _chat(body: dict, kind: str, usage: dict) -> str:
+    """
+    chat.completions 호출 1번 + 토큰 사용량 / 지연시간 기록.
+    """
+    started = time.perf_counter()
+    response = client.chat.completions.create(**body)
+    return _record_call(response, kind, usage, time.perf_counter() - started)
+
+
+def _chunk_request(title: str, chunk: str, index: int, total: int) -> dict:
+    prompt = f"""
+    아래는 긴 뉴스 기사 "{title}" 의 {index}/{total} 번째 부분이야.
+    이 부분의 핵심 사실(누가, 무엇을, 수치, 인용)을 빠짐없이 한국어 3~5문장으로 요약해.
+
+    {chunk}
+    """
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.2,
+    }
+
+
+def _summarize_chunk(title: str, chunk: str, index: int, total: int, usage: dict) -> str:
+    return (_chat(_chunk_request(title, chunk, index, total), "map", usage) or "").strip()
+
+
+def _join_summaries(summaries) -> str:
+    return "\n".join(f"[{i + 1}부] {s}" for i, s in enumerate(summaries) if s)
+
+
+def _long_article_mode(content: str) -> str:
+    """
+    본문 토큰 수로 처리 방식 결정: single / truncate / map_reduce
+    """
+    content_tokens = count_tokens(content, OPENAI_MODEL)
+    if content_tokens <= OPENAI_INPUT_TOKEN_BUDGET:
+        return "single"
+    print(f"[LOG] 본문 {content_tokens} 토큰 > 예산 {OPENAI_INPUT_TOKEN_BUDGET}, mode={OPENAI_LONG_ARTICLE_MODE}")
+    return OPENAI_LONG_ARTICLE_MODE
+
+
+def _map_reduce_content(title: str, content: str, usage: dict) -> str:
+    """
+    긴 본문을 조각으로 나눠 동시에 요약한 뒤 이어붙인 텍스트 (최종 분석 호출의 본문으로 사용)
+    """
+    chunks = split_chunks(content, OPENAI_CHUNK_TOKENS, OPENAI_MODEL)
+    print(f"[LOG] 긴 기사 map-reduce: 조각 {len(chunks)}개")
+    with ThreadPoolExecutor(max_workers=max(1, min(OPENAI_MAP_WORKERS, len(chunks)))) as pool:
+        summaries = list(pool.map(
+            lambda args: _summarize_chunk(title, args[1], args[0] + 1, len(chunks), usage),
+            enumerate(chunks),
+        ))
+    return _join_summaries(summaries)
+
+
+def analyze_article_with_openai(title: str, content: str) -> dict:
+    """
+    article 테이블의 title + content 를 받아서
+    - summary: 한 문단 요약 (한국어)
+    - sentiment: positive | neutral | negative ...
+    - keywords: 키워드 리스트
+    - usage: 이 기사 분석에 든 호출 수 / prompt·completion 토큰 / 시간 (캐시에는 저장 안 함)
+    를 반환한다.
+    """
+    usage = _new_usage(_long_article_mode(content))
+    body = content
+    if usage["mode"] == "map_reduce":
+        body = _map_reduce_content(title, content, usage)
+
+    result_text = _chat(build_chat_request(title, body), "analyze", usage)
+    print("[DEBUG] raw response:", repr(result_text))
+
+    result = fill_missing_keywords(parse_analysis_text(result_text), title, content)
+    result["usage"] = usage
+    return result
+
+
+# -------------------------------
+# async 버전 (API 서버용: 이벤트 루프를 막지 않음)
+# -------------------------------
+def get_async_client() -> AsyncOpenAI:
+    """
+    keep-alive 커넥션 풀을 쓰는 AsyncOpenAI 클라이언트 (프로세스에 하나).
+    """
+    global _async_client
+    if _async_client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+        )
+        _async_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=http_client,
+            max_retries=OPENAI_MAX_RETRIES,
+        )
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+async def _achat(body: dict, kind: str, usage: dict) -> str:
+    started = time.perf_counter()
+    response = await get_async_client().chat.completions.create(**body)
+    return _record_call(response, kind, usage, time.perf_counter() - started)
+
+
+async def analyze_article_async(title: str, content: str) -> dict:
+    """
+    analyze_article_with_openai 의 async 버전. 결과 형식은 같다.
+    (task 가 취소되면 진행 중인 OpenAI 요청도 같이 끊긴다)
+    """
+    usage = _new_usage(_long_article_mode(content))
+    if usage["mode"] == "map_reduce":
+        chunks = split_chunks(content, OPENAI_CHUNK_TOKENS, OPENAI_MODEL)
+        print(f"[LOG] 긴 기사 map-reduce: 조각 {len(chunks)}개")
+        # sync 버전처럼 동시에 보내는 조각 요약은 OPENAI_MAP_WORKERS 개까지
+        limit = asyncio.Semaphore(max(1, OPENAI_MAP_WORKERS))
+
+        async def summarize(i: int, chunk: str) -> str:
+            async with limit:
+                return await _achat(_chunk_request(title, chunk, i + 1, len(chunks)), "map", usage)
+
+        summaries = await asyncio.gather(*(summarize(i, chunk) for i, chunk in enumerate(chunks)))
+        body = _join_summaries((s or "").strip() for s in summaries)
+    else:
+        body = content
+
+    result_text = await _achat(build_chat_request(title, body), "analyze", usage)
+    print("[DEBUG] raw response:", repr(result_text))
+
+    result = parse_analysis_text(result_text)
+    if not has_keywords(result):
+        # TF-IDF 계산(처음엔 IDF 파일 로드까지)은 CPU 작업이라 이벤트 루프 밖에서
+        result = await asyncio.to_thread(fill_missing_keywords, result, title, content)
+    result["usage"] = usage
+    return result
+
+
+# -------------------------------
+# 짧은 기사 여러 개를 한 번에 분석 (요청 수 / 반복되는 지시문 토큰 절약)
+# -------------------------------
+def build_packed_request(items) -> dict:
+    """
+    items: [(id, title, content), ...] → 기사별 결과를 results 배열로 받는 요청 body
+    """
+    articles = [
+        {"id": str(article_id), "title": title, "content": content}
+        for article_id, title, content in items
+    ]
+
+    prompt = f"""
+    너는 한국어 뉴스 기사를 분석하는 도우미야.
+
+    맨 아래 기사들을 각각 따로 분석해서 JSON 형식으로만 출력해.
+    기사끼리 내용을 섞지 말고, 입력한 기사마다 results 에 하나씩 입력 순서대로 넣어.
+
+    출력 형식(키 이름은 꼭 그대로 써):
+    {{
+      "results": [
+        {{
+          "id": "입력 기사의 id 그대로",
+          "summary": "한 문단 요약을 한국어로",
+          "sentiment": "POSITIVE | NEUTRAL | NEGATIVE | HOPEFUL | FEARFUL | ANGRY | SAD 중 하나(대문자)",
+          "keywords": ["키워드1", "키워드2", "키워드3"]
+        }}
+      ]
+    }}
+
+    설명 문장 없이 JSON만 출력해.
+
+    기사 목록:
+    {json.dumps(articles, ensure_ascii=False)}
+    """
+
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": "너는 JSON만 출력하는 뉴스 분석기야. 반드시 순수 JSON만 반환해."},
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": 0.2,
+        "response_format": {"type": "json_object"},
+    }
+
+
+def _valid_packed_item(item) -> bool:
+    if not isinstance(item, dict):
+        return False
+    summary = item.get("summary")
+    sentiment = item.get("sentiment")
+    keywords = item.get("keywords")
+    return (
+        isinstance(summary, str) and bool(summary.strip())
+        and isinstance(sentiment, str) and bool(sentiment.strip())
+        and isinstance(keywords, list) and any(str(k).strip() for k in keywords)
+    )
+
+
+def _analyze_pack(items, results: dict, usage: dict):
+    if len(items) == 1:
+        # 하나 남으면 단건 프롬프트로
+        article_id, title, content = items[0]
+        result = analyze_article_with_openai(title, content)
+        single = result.pop("usage", None) or {}
+        with _usage_lock:
+            for key in ("calls", "prompt_tokens", "completion_tokens"):
+                usage[key] += single.get(key, 0)
+            usage["latency_sec"] = round(usage["latency_sec"] + single.get("latency_sec", 0), 3)
+        results[article_id] = result
+        return
+
+    text = _chat(build_packed_request(items), "packed", usage)
+    parsed = parse_analysis_text(text)
+    returned = parsed.get("results") if isinstance(parsed.get("results"), list) else []
+    by_id = {str(r.get("id")): r for r in returned if isinstance(r, dict)}
+
+    bad = []
+    for item in items:
+        r = by_id.get(str(item[0]))
+        if _valid_packed_item(r):
+            results[item[0]] = {"summary": r["summary"], "sentiment": r["sentiment"], "keywords": r["keywords"]}
+        else:
+            bad.append(item)
+
+    if bad:
+        # 빠졌거나 형식이 깨진 기사만 반으로 나눠서 다시 요청
+        print(f"[LOG] 묶음 분석 {len(items)}건 중 {len(bad)}건 결과 이상 → 나눠서 재시도")
+        mid = (len(bad) + 1) // 2
+        _analyze_pack(bad[:mid], results, usage)
+        if bad[mid:]:
+            _analyze_pack(bad[mid:], results, usage)
+
+
+def analyze_articles_packed(items):
+    """
+    짧은 기사 여러 개를 요청 하나로 분석.
+    items: [(id, title, content), ...]
+    반환: ({id: {"summary", "sentiment", "keywords"}}, 전체 usage dict)
+    응답에서 빠지거나 형식이 깨진 기사는 반씩 나눠 다시 묶어 보내고, 끝까지 안 되면 단건으로 분석한다.
+    """
+    usage = _new_usage("packed")
+    results = {}
+    _analyze_pack(list(items), results, usage)
+    return results, usage
+
+
+def _is_cacheable(result: dict) -> bool:
+    # JSON 파싱에 실패했거나 요약/키워드가 빈(로컬 키워드로 채운) 결과는 다음에 다시 물어보도록 캐시하지 않음
+    return (
+        "raw" not in result
+        and result.get("keywords_source") != "tfidf"
+        and bool((result.get("summary") or "").strip())
+        and isinstance(result.get("keywords"), list)
+        and len(result["keywords"]) > 0
+    )
+
+
+def get_cached_analysis(title: str, content: str) -> dict | None:
+    cache = get_analysis_cache()
+    if cache is None:
+        return None
+    return cache.get(cache_key(title, content, OPENAI_MODEL, PROMPT_VERSION))
+
+
+def store_cached_analysis(title: str, content: str, result: dict):
+    cache = get_analysis_cache()
+    if cache is not None and _is_cacheable(result):
+        # 호출별 사용량은 그 호출에만 의미가 있으므로 빼고 저장
+        value = {k: v for k, v in result.items() if k != "usage"}
+        cache.put(cache_key(title, content, OPENAI_MODEL, PROMPT_VERSION), value)
+
+
+def analyze_article_cached(title: str, content: str, before_request=None) -> dict:
+    """
+    analyze_article_with_openai 앞에 (모델 + 프롬프트 버전 + 정규화한 제목/본문) 해시 캐시를 둔 버전.
+    여러 언론사에 같은 기사가 실리거나 같은 본문을 다시 보내면 OpenAI 를 부르지 않는다.
+    before_request: 캐시에 없어서 실제로 호출하기 직전에 불림 (rate limiter 대기 등)
+    """
+    cached = get_cached_analysis(title, content)
+    if cached is not None:
+        return cached
+
+    if before_request is not None:
+        before_request()
+    result = analyze_article_with_openai(title, content)
+
+    store_cached_analysis(title, content, result)
+    return result
+
+
+async def analyze_article_cached_async(title: str, content: str) -> dict:
+    """
+    analyze_article_cached 의 async 버전.
+    메모리 LRU 에 없을 때 SQLite 조회/저장은 스레드로 넘겨서 이벤트 루프를 막지 않는다.
+    """
+    cached = await asyncio.to_thread(get_cached_analysis, title, content)
+    if cached is not None:
+        return cached
+
+    result = await analyze_article_async(title, content)
+    await asyncio.to_thread(store_cached_analysis, title, content, result)
+    return result
+
+
+# -------------------------------
+# 같은 기사 동시 요청 합치기 (single-flight)
+# -------------------------------
+class _Flight:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+_inflight = {}   # cache_key → _Flight (이벤트 루프 스레드에서만 접근)
+COALESCE_STATS = {"upstream": 0, "coalesced": 0}
+
+
+async def analyze_article_coalesced(title: str, content: str) -> dict:
+    """
+    analyze_article_cached_async 와 같지만, 같은 기사(캐시 키 기준)를 분석 중인 요청이 이미 있으면
+    새로 호출하지 않고 그 결과를 같이 기다린다.
+    기다리던 쪽이 모두 취소되면(클라이언트 연결 끊김) 진행 중인 분석도 취소한다.
+    """
+    key = cache_key(title, content, OPENAI_MODEL, PROMPT_VERSION)
+    flight = _inflight.get(key)
+    if flight is None:
+        flight = _Flight(asyncio.ensure_future(analyze_article_cached_async(title, content)))
+        _inflight[key] = flight
+        flight.task.add_done_callback(lambda _: _inflight.pop(key, None) if _inflight.get(key) is flight else None)
+        COALESCE_STATS["upstream"] += 1
+    else:
+        COALESCE_STATS["coalesced"] += 1
+
+    flight.waiters += 1
+    try:
+        result = await asyncio.shield(flight.task)
+    except asyncio.CancelledError:
+        if flight.waiters == 1 and not flight.task.done():
+            flight.task.cancel()
+        raise
+    finally:
+        flight.waiters -= 1
+    return dict(result)
@@ -0,0 +1,410 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+
+# analysis/ 폴더에서 직접 실행해도 app, analysis 패키지를 import 할 수 있도록
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis.analysis_openai import (
+    build_chat_request,
+    client,
+    fill_missing_keywords,
+    get_cached_analysis,
+    parse_analysis_text,
+    store_cached_analysis,
+)
+from analysis.run_openai_for_articles import (
+    ensure_claim_table,
+    evaluate_analysis,
+    fail_articles_bulk,
+    fetch_target_articles,
+    reclaim_stale_leases,
+    save_analyses_bulk,
+)
+from app.db.db import close_pool
+
+# -------------------------------
+# Batch API 설정 (env로 조정)
+# -------------------------------
+ANALYSIS_BATCH_DIR = os.getenv(
+    "ANALYSIS_BATCH_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "batches"),
+)
+ANALYSIS_BATCH_MAX_ARTICLES = int(os.getenv("ANALYSIS_BATCH_MAX_ARTICLES", "5000"))
+ANALYSIS_BATCH_POLL_SECONDS = float(os.getenv("ANALYSIS_BATCH_POLL_SECONDS", "30"))
+# Batch API 완료 기한(24h) 동안 다른 worker 가 같은 기사를 가져가지 않도록 lease 를 길게 잡는다
+ANALYSIS_BATCH_LEASE_SECONDS = int(os.getenv("ANALYSIS_BATCH_LEASE_SECONDS", str(25 * 3600)))
+ANALYSIS_BATCH_WRITE_CHUNK = int(os.getenv("ANALYSIS_BATCH_WRITE_CHUNK", "500"))   # 결과를 이만큼씩 한 트랜잭션으로 저장
+
+CHAT_ENDPOINT = "/v1/chat/completions"
+DONE_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def _custom_id(article_id: int) -> str:
+    return f"article-{article_id}"
+
+
+def _article_id(custom_id: str) -> int | None:
+    prefix, _, value = (custom_id or "").partition("-")
+    return int(value) if prefix == "article" and value.isdigit() else None
+
+
+# -------------------------------
+# 제출 / 상태 조회 클라이언트 (교체 가능)
+# submit(input_path) -> batch_id
+# status(batch_id) -> {"status", "output_ref", "error_ref"}
+# download(ref, path)
+# -------------------------------
+class OpenAIBatchClient:
+    """
+    실제 OpenAI Batch API (files 업로드 → batches.create → 완료 후 결과 파일 다운로드)
+    """
+
+    def __init__(self, openai_client=None):
+        self.client = openai_client or client
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=CHAT_ENDPOINT,
+            completion_window="24h",
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> dict:
+        batch = self.client.batches.retrieve(batch_id)
+        return {
+            "status": batch.status,
+            "output_ref": batch.output_file_id,
+            "error_ref": batch.error_file_id,
+        }
+
+    def download(self, ref: str, path: str):
+        content = self.client.files.content(ref)
+        with open(path, "wb") as f:
+            f.write(content.read())
+
+
+def chat_completion_handler(body: dict) -> dict:
+    """
+    LocalBatchClient 기본 처리기: 요청 body 를 일반 chat.completions 호출로 보내고 응답 json 반환.
+    """
+    return client.chat.completions.create(**body).model_dump()
+
+
+class LocalBatchClient:
+    """
+    Batch API 와 같은 입력/출력 JSONL 형식을 쓰는 로컬 대체 구현.
+    submit 할 때 handler(body) -> chat completion dict 로 한 줄씩 바로 처리해서
+    <directory>/<batch_id>/output.jsonl, errors.jsonl 을 만든다.
+    (handler 를 바꿔 끼우면 네트워크 없이 제출 → 조회 → 결과 반영 전체 흐름을 돌려볼 수 있다)
+    """
+
+    def __init__(self, directory: str, handler=None):
+        self.directory = directory
+        self.handler = handler or chat_completion_handler
+
+    def submit(self, input_path: str) -> str:
+        batch_id = f"local_{uuid.uuid4().hex[:12]}"
+        batch_dir = os.path.join(self.directory, batch_id)
+        os.makedirs(batch_dir, exist_ok=True)
+        shutil.copyfile(input_path, os.path.join(batch_dir, "input.jsonl"))
+
+        with open(input_path, encoding="utf-8") as src, \
+                open(os.path.join(batch_dir, "output.jsonl"), "w", encoding="utf-8") as out, \
+                open(os.path.join(batch_dir, "errors.jsonl"), "w", encoding="utf-8") as err:
+            for n, line in enumerate(src):
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                record = {"id": f"{batch_id}_req_{n}", "custom_id": request["custom_id"]}
+                try:
+                    body = self.handler(request["body"])
+                except Exception as e:
+                    record.update(response=None, error={"code": type(e).__name__, "message": str(e)})
+                    err.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    continue
+                record.update(response={"status_code": 200, "body": body}, error=None)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        with open(os.path.join(batch_dir, "status.json"), "w", encoding="utf-8") as f:
+            json.dump({"status": "completed"}, f)
+        return batch_id
+
+    def status(self, batch_id: str) -> dict:
+        batch_dir = os.path.join(self.directory, batch_id)
+        with open(os.path.join(batch_dir, "status.json"), encoding="utf-8") as f:
+            status = json.load(f)["status"]
+        return {
+            "status": status,
+            "output_ref": os.path.join(batch_dir, "output.jsonl"),
+            "error_ref": os.path.join(batch_dir, "errors.jsonl"),
+        }
+
+    def download(self, ref: str, path: str):
+        shutil.copyfile(ref, path)
+
+
+# -------------------------------
+# 입력 파일 만들기 / 결과 파일 읽기
+# -------------------------------
+def write_batch_input(rows, path: str) -> int:
+    """
+    기사 rows → Batch API 입력 JSONL (한 줄에 요청 하나, custom_id=article-<id>)
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            request = {
+                "custom_id": _custom_id(row["article_id"]),
+                "method": "POST",
+                "url": CHAT_ENDPOINT,
+                "body": build_chat_request(row["title"], row["content"] or ""),
+            }
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def iter_batch_output(path: str):
+    """
+    결과 JSONL 을 한 줄씩 읽어서 (article_id, 분석 dict 또는 None, 에러 메시지 또는 None) 를 내보낸다.
+    파일 전체를 메모리에 올리지 않는다.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            article_id = _article_id(record.get("custom_id"))
+            if article_id is None:
+                print(f"[ERROR] 알 수 없는 custom_id: {record.get('custom_id')}")
+                continue
+
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                error = record.get("error") or (response.get("body") or {}).get("error")
+                yield article_id, None, json.dumps(error, ensure_ascii=False)
+                continue
+
+            try:
+                text = response["body"]["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                yield article_id, None, "응답에 choices[0].message.content 가 없음"
+                continue
+            yield article_id, parse_analysis_text(text), None
+
+
+# -------------------------------
+# 실행 상태 (중간에 죽어도 --resume 으로 이어서 결과 반영)
+# -------------------------------
+def _state_path(run_id: str) -> str:
+    return os.path.join(ANALYSIS_BATCH_DIR, run_id, "state.json")
+
+
+def _save_state(state: dict):
+    path = _state_path(state["run_id"])
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _load_state(run_id: str) -> dict:
+    with open(_state_path(run_id), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class _ResultWriter:
+    """
+    finish_article 과 같은 판정을 한 뒤 결과를 모아 두었다가
+    ANALYSIS_BATCH_WRITE_CHUNK 건씩 한 트랜잭션으로 저장 / 실패 처리 (배치 worker_id 로).
+    """
+
+    def __init__(self, worker_id: str, chunk: int = ANALYSIS_BATCH_WRITE_CHUNK):
+        self.worker_id = worker_id
+        self.chunk = max(1, chunk)
+        self.counts = {"ANALYZED": 0, "FAILED": 0, "SKIPPED": 0, "TFIDF_KEYWORDS": 0}
+        self._saved = []       # (article_id, 정제된 analysis, 캐시에 넣을 (title, content) 또는 None)
+        self._failed = []
+
+    def add(self, article_id: int, analysis: dict, cache_key: tuple | None = None):
+        ok, analysis, checks = evaluate_analysis(analysis)
+        if not ok:
+            self.fail(article_id, ", ".join(f"{name}={value}" for name, value in checks.items()))
+            return
+        self._saved.append((article_id, analysis, cache_key))
+        if len(self._saved) >= self.chunk:
+            self.flush()
+
+    def fail(self, article_id: int, reason: str):
+        print(f"[LOG] article_id={article_id} 분석 실패: {reason}")
+        self._failed.append(article_id)
+        if len(self._failed) >= self.chunk:
+            self.flush()
+
+    def flush(self):
+        if self._saved:
+            saved = save_analyses_bulk([(article_id, analysis) for article_id, analysis, _ in self._saved], self.worker_id)
+            for article_id, analysis, cache_key in self._saved:
+                if article_id not in saved:
+                    # lease 를 잃은 기사는 다른 worker 결과가 우선
+                    self.counts["SKIPPED"] += 1
+                    continue
+                self.counts["ANALYZED"] += 1
+                self.counts["TFIDF_KEYWORDS"] += int(analysis.get("keywords_source") == "tfidf")
+                if cache_key is not None:
+                    store_cached_analysis(*cache_key, analysis)
+            self._saved = []
+        if self._failed:
+            fail_articles_bulk(self._failed, self.worker_id)
+            self.counts["FAILED"] += len(self._failed)
+            self._failed = []
+
+
+def submit_batch(batch_client, limit: int) -> dict | None:
+    """
+    분석 대상 기사를 (긴 lease 로) 선점해서 입력 파일을 만들고 제출.
+    캐시에 이미 결과가 있는 기사는 제출하지 않고 바로 저장한다.
+    """
+    run_id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    worker_id = f"batch:{run_id}"
+    run_dir = os.path.join(ANALYSIS_BATCH_DIR, run_id)
+    os.makedirs(run_dir, exist_ok=True)
+
+    ensure_claim_table()
+    reclaim_stale_leases()
+    rows = fetch_target_articles(limit=limit, lease_seconds=ANALYSIS_BATCH_LEASE_SECONDS, worker_id=worker_id)
+    if not rows:
+        print("[LOG] 분석할 대상 기사가 없습니다.")
+        shutil.rmtree(run_dir, ignore_errors=True)
+        return None
+
+    pending = []
+    writer = _ResultWriter(worker_id)
+    for row in rows:
+        analysis = get_cached_analysis(row["title"], row["content"] or "")
+        if analysis is None:
+            pending.append(row)
+        else:
+            writer.add(row["article_id"], analysis)
+    writer.flush()
+    cached = writer.counts["ANALYZED"]
+    # 캐시 확인이 끝났으니 본문은 들고 있을 필요 없음
+    contents = {row["article_id"]: (row["title"], row["content"] or "") for row in pending}
+    del rows
+
+    state = {"run_id": run_id, "worker_id": worker_id, "batch_id": None, "status": "empty", "cached": cached}
+    if pending:
+        input_path = os.path.join(run_dir, "input.jsonl")
+        count = write_batch_input(pending, input_path)
+        print(f"[LOG] 배치 입력 {count}건 작성 (캐시 사용 {cached}건): {input_path}")
+
+        # 결과를 반영할 때 분석 캐시 키(제목/본문 해시)를 만들 수 있도록 남겨둔다
+        with open(os.path.join(run_dir, "articles.jsonl"), "w", encoding="utf-8") as f:
+            for article_id, (title, content) in contents.items():
+                f.write(json.dumps({"article_id": article_id, "title": title, "content": content}, ensure_ascii=False) + "\n")
+
+        state["batch_id"] = batch_client.submit(input_path)
+        state["status"] = "submitted"
+        print(f"[LOG] 배치 제출 완료 run_id={run_id}, batch_id={state['batch_id']}")
+    _save_state(state)
+    return state
+
+
+def wait_for_batch(batch_client, state: dict, poll_seconds: float) -> dict:
+    while True:
+        info = batch_client.status(state["batch_id"])
+        print(f"[LOG] batch_id={state['batch_id']} status={info['status']}")
+        if info["status"] in DONE_STATUSES:
+            return info
+        time.sleep(poll_seconds)
+
+
+def apply_batch_results(batch_client, state: dict, info: dict) -> dict:
+    """
+    결과 파일을 내려받아 한 줄씩 검증 → ANALYSIS_BATCH_WRITE_CHUNK 건씩 모아서 저장 / 실패 처리.
+    결과가 없는 기사(에러, 만료)는 FAILED 로 표시해서 나중에 다시 시도되게 한다.
+    """
+    run_dir = os.path.join(ANALYSIS_BATCH_DIR, state["run_id"])
+    writer = _ResultWriter(state["worker_id"])
+
+    articles = {}
+    with open(os.path.join(run_dir, "articles.jsonl"), encoding="utf-8") as f:
+        for line in f:
+            item = json.loads(line)
+            articles[item["article_id"]] = (item["title"], item["content"])
+    remaining = set(articles)
+
+    for kind in ("output_ref", "error_ref"):
+        if not info.get(kind):
+            continue
+        path = os.path.join(run_dir, "output.jsonl" if kind == "output_ref" else "errors.jsonl")
+        batch_client.download(info[kind], path)
+
+        for article_id, analysis, error in iter_batch_output(path):
+            if article_id not in remaining:
+                continue
+            remaining.discard(article_id)
+
+            if analysis is None:
+                writer.fail(article_id, str(error))
+                continue
+
+            fill_missing_keywords(analysis, *articles[article_id])
+            writer.add(article_id, analysis, cache_key=articles[article_id])
+
+    for article_id in sorted(remaining):
+        writer.fail(article_id, f"배치 결과 없음 (status={info['status']})")
+    writer.flush()
+    counts = writer.counts
+
+    state.update(status=info["status"], applied=counts)
+    _save_state(state)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenAI Batch API 로 쌓인 기사 한꺼번에 분석")
+    parser.add_argument("--limit", type=int, default=ANALYSIS_BATCH_MAX_ARTICLES, help="한 배치에 넣을 최대 기사 수")
+    parser.add_argument("--poll", type=float, default=ANALYSIS_BATCH_POLL_SECONDS, help="상태 조회 간격(초)")
+    parser.add_argument("--resume", metavar="RUN_ID", help="이미 제출한 배치의 결과를 기다려서 반영")
+    parser.add_argument("--no-wait", action="store_true", help="제출만 하고 종료 (나중에 --resume)")
+    parser.add_argument("--local", action="store_true",
+                        help="Batch API 대신 로컬에서 같은 형식으로 바로 처리 (일반 chat API 호출)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(ANALYSIS_BATCH_DIR, exist_ok=True)
+    if args.local:
+        batch_client = LocalBatchClient(os.path.join(ANALYSIS_BATCH_DIR, "local"))
+    else:
+        batch_client = OpenAIBatchClient()
+
+    if args.resume:
+        state = _load_state(args.resume)
+    else:
+        state = submit_batch(batch_client, args.limit)
+
+    if state is None or state.get("batch_id") is None:
+        print(f"[LOG] 제출할 기사가 없습니다 (캐시 사용 {state['cached'] if state else 0}건)")
+    elif args.no_wait:
+        print(f"[LOG] 나중에 결과 반영: --resume {state['run_id']}")
+    else:
+        info = wait_for_batch(batch_client, state, args.poll)
+        counts = apply_batch_results(batch_client, state, info)
+        print(
+            f"[LOG] 배치 반영 완료 (분석 {counts['ANALYZED']}건, TF-IDF 키워드 {counts['TFIDF_KEYWORDS']}건, "
+            f"실패 {counts['FAILED']}건, lease 잃음 {counts['SKIPPED']}건)"
+        )
+
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
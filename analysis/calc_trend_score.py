@@ -1,220 +1,300 @@
-# import os
-# import math
-# from datetime import datetime, timezone, timedelta
-
-# from dotenv import load_dotenv
-# import psycopg2
-# from psycopg2.extras import DictCursor
-
-# print("🔹 [LOG] calc_trend_score.py import 시작")
-
-# # 1) .env 로드
-# load_dotenv()
-# print("🔹 [LOG] .env 로드 완료")
-
-# DB_HOST = os.getenv("DB_HOST")
-# DB_PORT = os.getenv("DB_PORT")
-# DB_NAME = os.getenv("DB_NAME")
-# DB_USER = os.getenv("DB_USER")
-# DB_PASSWORD = os.getenv("DB_PASSWORD")
-
-# print(
-#     f"[ENV CHECK]\nHOST={DB_HOST}\nPORT={DB_PORT}\nDB={DB_NAME}\nUSER={DB_USER}\n"
-# )
-
-# # 2) DB 연결
-# try:
-#     conn = psycopg2.connect(
-#         host=DB_HOST,
-#         port=DB_PORT,
-#         dbname=DB_NAME,
-#         user=DB_USER,
-#         password=DB_PASSWORD,
-#     )
-#     print("[LOG] DB 연결 성공")
-# except Exception as e:
-#     print("[ERROR] DB 연결 실패:", e)
-#     raise
-
-
-# # 트렌드 계산 파라미터
-# RECENT_KEYWORD_DAYS = 3   # 최근 N일 안 기사 기준으로 키워드 빈도 계산
-# HALF_LIFE_DAYS = 7        # 7일 지나면 recency_score가 0.5가 되도록
-# LAMBDA = math.log(2) / HALF_LIFE_DAYS  # 지수감쇠 계수
-
-
-# def fetch_analyzed_articles():
-#     """
-#     ANALYZED 상태의 기사 + analysis_result + published_at + result_id 가져오기
-#     """
-#     print("[LOG] fetch_analyzed_articles() 호출")
-#     with conn.cursor(cursor_factory=DictCursor) as cur:
-#         cur.execute(
-#             """
-#             SELECT
-#                 a.article_id,
-#                 a.published_at,
-#                 ar.result_id
-#             FROM article a
-#             JOIN analysis_result ar
-#               ON ar.article_id = a.article_id
-#             WHERE a.ingest_status = 'ANALYZED'
-#               AND a.published_at IS NOT NULL;
-#             """
-#         )
-#         rows = cur.fetchall()
-#         print(f"[LOG] ANALYZED 기사 개수: {len(rows)}")
-#         return rows
-
-
-# def fetch_keywords_for_results():
-#     """
-#     모든 result_id에 대해 연결된 키워드 목록 조회
-#     """
-#     print("[LOG] fetch_keywords_for_results() 호출")
-#     with conn.cursor(cursor_factory=DictCursor) as cur:
-#         cur.execute(
-#             """
-#             SELECT result_id, keyword
-#             FROM analysis_keywords;
-#             """
-#         )
-#         rows = cur.fetchall()
-
-#     result_keywords = {}
-#     for row in rows:
-#         rid = row["result_id"]
-#         kw = (row["keyword"] or "").strip()
-#         if not kw:
-#             continue
-#         result_keywords.setdefault(rid, set()).add(kw)
-
-#     print(f"🔹 [LOG] 키워드가 있는 result_id 수: {len(result_keywords)}")
-#     return result_keywords
-
-
-# def compute_recency_score(published_at, now):
-#     """
-#     발행일 기준 recency_score 계산 (0~1)
-#     """
-#     # published_at이 timezone 없는 naive일 수도 있으니 처리
-#     if published_at.tzinfo is None:
-#         published_at = published_at.replace(tzinfo=timezone.utc)
-
-#     diff_days = (now - published_at).total_seconds() / 86400.0
-#     if diff_days < 0:
-#         diff_days = 0  # 미래 기사 방어
-
-#     score = math.exp(-LAMBDA * diff_days)  # 0 ~ 1
-#     return max(0.0, min(1.0, score))
-
-
-# def main():
-#     print("[LOG] calc_trend_score main() 시작")
-
-#     # 1) 기준 시간 (현재)
-#     now = datetime.now(timezone.utc)
-#     print(f"🔹 [LOG] now = {now.isoformat()}")
-
-#     # 2) 분석 완료 기사 + 키워드 조회
-#     articles = fetch_analyzed_articles()
-#     if not articles:
-#         print("[LOG] ANALYZED 상태의 기사가 없습니다. 종료.")
-#         return
-
-#     result_keywords = fetch_keywords_for_results()
-
-#     # 3) 최근 N일 안의 기사들만 뽑아서 키워드 빈도 계산
-#     recent_cutoff = now - timedelta(days=RECENT_KEYWORD_DAYS)
-#     print(
-#         f"[LOG] 최근 키워드 계산 기준: {RECENT_KEYWORD_DAYS}일 (cutoff={recent_cutoff.isoformat()})"
-#     )
-
-#     # article_id -> (result_id, published_at)
-#     article_map = {}
-#     for row in articles:
-#         article_map[row["article_id"]] = {
-#             "result_id": row["result_id"],
-#             "published_at": row["published_at"],
-#         }
-
-#     # keyword -> 최근 N일 내 등장 article 수
-#     keyword_freq = {}
-
-#     for row in articles:
-#         published_at = row["published_at"]
-#         if published_at.tzinfo is None:
-#             published_at = published_at.replace(tzinfo=timezone.utc)
-
-#         if published_at < recent_cutoff:
-#             continue
-
-#         rid = row["result_id"]
-#         kws = result_keywords.get(rid, set())
-#         for kw in kws:
-#             keyword_freq[kw] = keyword_freq.get(kw, 0) + 1
-
-#     if not keyword_freq:
-#         print("[LOG] 최근 N일 내 키워드가 없습니다. topical_score는 0으로 처리.")
-#         max_freq = 1
-#     else:
-#         max_freq = max(keyword_freq.values())
-
-#     print(f"🔹 [LOG] 최근 N일 내 서로 출현한 키워드 종류 수: {len(keyword_freq)}, 최대 빈도: {max_freq}")
-
-#     # 4) 각 기사별 trend_score 계산 및 UPDATE
-#     updated_count = 0
-
-#     with conn.cursor() as cur:
-#         for row in articles:
-#             article_id = row["article_id"]
-#             result_id = row["result_id"]
-#             published_at = row["published_at"]
-
-#             recency = compute_recency_score(published_at, now)
-
-#             kws = result_keywords.get(result_id, set())
-#             if kws and keyword_freq:
-#                 # 각 키워드에 대해 (빈도 / max_freq) 계산 → 평균
-#                 scores = []
-#                 for kw in kws:
-#                     freq = keyword_freq.get(kw, 0)
-#                     if freq <= 0:
-#                         continue
-#                     scores.append(freq / max_freq)
-
-#                 if scores:
-#                     topical = sum(scores) / len(scores)
-#                 else:
-#                     topical = 0.0
-#             else:
-#                 topical = 0.0
-
-#             # 최종 trend_score (0~1)
-#             trend_score = 0.7 * recency + 0.3 * topical
-#             trend_score = round(trend_score, 2)  # 소수 6자리 정도로 제한
-
-#             print(
-#                 f"🔹 [LOG] article_id={article_id}, result_id={result_id}, "
-#                 f"recency={recency:.3f}, topical={topical:.3f}, trend_score={trend_score:.3f}"
-#             )
-
-#             cur.execute(
-#                 """
-#                 UPDATE analysis_result
-#                 SET trend_score = %s
-#                 WHERE result_id = %s;
-#                 """,
-#                 (trend_score, result_id),
-#             )
-#             updated_count += 1
-
-#     conn.commit()
-#     print(f"[LOG] trend_score 업데이트 완료, 대상 기사 수={updated_count}")
-#     conn.close()
-#     print("[LOG] calc_trend_score 종료, DB 연결 닫음")
-
-
-# if __name__ == "__main__":
-#     print("[LOG] __main__ 블록 진입 (calc_trend_score)")
-#     main()
+import argparse
+import io
+import math
+import os
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from scipy import sparse
+
+# analysis/ 폴더에서 직접 실행해도 app 패키지를 import 할 수 있도록
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.db import db_conn, close_pool
+
+
+# 트렌드 계산 파라미터
+RECENT_KEYWORD_DAYS = 3   # 최근 N일 안 기사 기준으로 키워드 빈도 계산
+HALF_LIFE_DAYS = 7        # 7일 지나면 recency_score가 0.5가 되도록
+LAMBDA = math.log(2) / HALF_LIFE_DAYS  # 지수감쇠 계수
+
+RECENCY_WEIGHT = 0.7
+TOPICAL_WEIGHT = 0.3
+
+FETCH_CHUNK_ROWS = 100_000   # 서버 사이드 커서로 이만큼씩 읽기
+
+
+def _fetch_frame(sql: str, columns: list) -> pd.DataFrame:
+    """
+    서버 사이드 커서로 나눠 읽어서 DataFrame 으로 (수백만 행에서도 드라이버 버퍼가 한 번에 커지지 않도록)
+    """
+    frames = []
+    with db_conn() as conn:
+        with conn.cursor(name="trend_fetch") as cur:
+            cur.itersize = FETCH_CHUNK_ROWS
+            cur.execute(sql)
+            while True:
+                rows = cur.fetchmany(FETCH_CHUNK_ROWS)
+                if not rows:
+                    break
+                frames.append(pd.DataFrame.from_records(rows, columns=columns))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def fetch_analyzed_articles() -> pd.DataFrame:
+    """
+    ANALYZED 상태의 기사 + analysis_result + published_at + result_id 가져오기
+    """
+    print("[LOG] fetch_analyzed_articles() 호출")
+    df = _fetch_frame(
+        """
+        SELECT
+            a.article_id,
+            a.published_at,
+            ar.result_id
+        FROM article a
+        JOIN analysis_result ar
+          ON ar.article_id = a.article_id
+        WHERE a.ingest_status = 'ANALYZED'
+          AND a.published_at IS NOT NULL;
+        """,
+        ["article_id", "published_at", "result_id"],
+    )
+    print(f"[LOG] ANALYZED 기사 개수: {len(df)}")
+    return df
+
+
+def fetch_keywords_for_results() -> pd.DataFrame:
+    """
+    모든 result_id에 대해 연결된 키워드 (result_id, keyword) 조회
+    """
+    print("[LOG] fetch_keywords_for_results() 호출")
+    df = _fetch_frame(
+        """
+        SELECT result_id, keyword
+        FROM analysis_keywords;
+        """,
+        ["result_id", "keyword"],
+    )
+    print(f"🔹 [LOG] analysis_keywords 행 수: {len(df)}")
+    return df
+
+
+def _to_utc(values) -> pd.DatetimeIndex:
+    # published_at 이 timezone 없는 naive 면 UTC 로 간주 (기존 계산과 동일)
+    return pd.DatetimeIndex(pd.to_datetime(values, utc=True))
+
+
+def _utc_now(now: datetime) -> pd.Timestamp:
+    now = pd.Timestamp(now)
+    return now.tz_convert("UTC") if now.tzinfo else now.tz_localize("UTC")
+
+
+def compute_recency_scores(published_at, now: datetime) -> np.ndarray:
+    """
+    발행일 기준 recency_score 계산 (0~1), 배열 단위
+    """
+    diff_days = (_utc_now(now) - _to_utc(published_at)).total_seconds().to_numpy() / 86400.0
+    diff_days = np.maximum(diff_days, 0.0)   # 미래 기사 방어
+    return np.clip(np.exp(-LAMBDA * diff_days), 0.0, 1.0)
+
+
+def compute_trend_scores(articles: pd.DataFrame, keywords: pd.DataFrame, now: datetime) -> pd.DataFrame:
+    """
+    trend_score = 0.7 * recency + 0.3 * topical  (소수 둘째 자리 반올림)
+
+    articles: article_id, published_at, result_id  (analysis_result 1건당 1행)
+    keywords: result_id, keyword
+    - recency: 발행 후 지난 일수에 대한 지수감쇠 (HALF_LIFE_DAYS 에 0.5)
+    - topical: 기사 키워드 중 최근 RECENT_KEYWORD_DAYS 일 안에 나온 것들의 (빈도 / 최대 빈도) 평균
+      빈도 = 최근 기사 중 그 키워드를 가진 analysis_result 수
+
+    키워드는 정수 id 로 바꾸고 (결과 × 키워드) 희소 행렬 곱으로 한 번에 계산한다.
+    반환: result_id, article_id, recency, topical, trend_score
+    """
+    n = len(articles)
+    out = pd.DataFrame({
+        "result_id": articles["result_id"].to_numpy(dtype=np.int64),
+        "article_id": articles["article_id"].to_numpy(dtype=np.int64),
+    })
+    if n == 0:
+        out["recency"] = out["topical"] = out["trend_score"] = np.array([], dtype=float)
+        return out
+
+    published = _to_utc(articles["published_at"])
+    recency = compute_recency_scores(published, now)
+
+    # 키워드 → 정수 id. 공백 제거는 서로 다른 키워드 문자열에만 한 번씩 적용
+    raw_ids, raw_vocab = pd.factorize(keywords["keyword"].fillna("").astype(str))
+    clean_ids, vocab = pd.factorize(pd.Index(raw_vocab).str.strip())
+    kw_ids = clean_ids[raw_ids] if len(raw_ids) else raw_ids
+
+    rows = pd.Index(out["result_id"]).get_indexer(keywords["result_id"])
+    # 빈 키워드, 대상이 아닌 결과의 키워드 제외
+    keep = (rows >= 0) & (np.asarray(vocab)[kw_ids] != "") if len(kw_ids) else rows >= 0
+    rows, kw_ids = rows[keep], kw_ids[keep]
+
+    topical = np.zeros(n)
+    if len(kw_ids):
+        matrix = sparse.csr_matrix(
+            (np.ones(len(kw_ids), dtype=np.float64), (rows, kw_ids)),
+            shape=(n, len(vocab)),
+        )
+        # 같은 결과 안 중복 키워드는 한 번만 (기존 set 과 동일)
+        matrix.sum_duplicates()
+        matrix.data[:] = 1.0
+
+        # 최근 N일 안 결과들에서 키워드별 빈도
+        cutoff = _utc_now(now) - timedelta(days=RECENT_KEYWORD_DAYS)
+        recent = (published >= cutoff).astype(np.float64)
+        freq = np.asarray(matrix.T @ recent).ravel()
+
+        if freq.max() > 0:
+            max_freq = freq.max()
+            # 빈도 0 인 키워드는 평균에서 빠진다
+            score_sum = matrix @ (freq / max_freq)
+            score_cnt = matrix @ (freq > 0).astype(np.float64)
+            np.divide(score_sum, score_cnt, out=topical, where=score_cnt > 0)
+
+    trend = RECENCY_WEIGHT * recency + TOPICAL_WEIGHT * topical
+
+    out["recency"] = recency
+    out["topical"] = topical
+    # 기존 계산과 같은 반올림 결과가 나오도록 파이썬 round 사용
+    out["trend_score"] = [round(x, 2) for x in trend.tolist()]
+    return out
+
+
+def compute_trend_scores_reference(articles: pd.DataFrame, keywords: pd.DataFrame, now: datetime) -> dict:
+    """
+    예전 반복문 구현 그대로 (result_id → trend_score). --check 로 벡터 버전과 비교할 때만 사용.
+    """
+    result_keywords = {}
+    for rid, kw in zip(keywords["result_id"], keywords["keyword"]):
+        kw = (kw or "").strip()
+        if kw:
+            result_keywords.setdefault(rid, set()).add(kw)
+
+    def as_utc(value):
+        value = pd.Timestamp(value).to_pydatetime()
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+    recent_cutoff = now - timedelta(days=RECENT_KEYWORD_DAYS)
+    keyword_freq = {}
+    for rid, published_at in zip(articles["result_id"], articles["published_at"]):
+        if as_utc(published_at) < recent_cutoff:
+            continue
+        for kw in result_keywords.get(rid, set()):
+            keyword_freq[kw] = keyword_freq.get(kw, 0) + 1
+    max_freq = max(keyword_freq.values()) if keyword_freq else 1
+
+    scores = {}
+    for rid, published_at in zip(articles["result_id"], articles["published_at"]):
+        diff_days = max(0.0, (now - as_utc(published_at)).total_seconds() / 86400.0)
+        recency = max(0.0, min(1.0, math.exp(-LAMBDA * diff_days)))
+
+        kws = result_keywords.get(rid, set())
+        topical = 0.0
+        if kws and keyword_freq:
+            s = [keyword_freq.get(kw, 0) / max_freq for kw in kws if keyword_freq.get(kw, 0) > 0]
+            topical = sum(s) / len(s) if s else 0.0
+        scores[rid] = round(RECENCY_WEIGHT * recency + TOPICAL_WEIGHT * topical, 2)
+    return scores
+
+
+def write_trend_scores(scores: pd.DataFrame) -> int:
+    """
+    임시 테이블에 COPY 로 한 번에 넣고 UPDATE ... FROM 한 번으로 반영.
+    값이 바뀐 행만 갱신하고, 갱신한 행 수를 반환.
+    """
+    buf = io.StringIO()
+    scores[["result_id", "trend_score"]].to_csv(buf, index=False, header=False)
+    buf.seek(0)
+
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                CREATE TEMP TABLE tmp_trend_score (
+                    result_id   BIGINT PRIMARY KEY,
+                    trend_score DOUBLE PRECISION NOT NULL
+                ) ON COMMIT DROP;
+                """
+            )
+            cur.copy_expert("COPY tmp_trend_score (result_id, trend_score) FROM STDIN WITH (FORMAT csv)", buf)
+            cur.execute(
+                """
+                UPDATE analysis_result ar
+                SET trend_score = t.trend_score
+                FROM tmp_trend_score t
+                WHERE ar.result_id = t.result_id
+                  AND ar.trend_score IS DISTINCT FROM t.trend_score;
+                """
+            )
+            return cur.rowcount
+
+
+def main(argv=None):
+    print("[LOG] calc_trend_score main() 시작")
+
+    parser = argparse.ArgumentParser(description="analysis_result.trend_score 일괄 계산")
+    parser.add_argument("--dry-run", action="store_true", help="계산만 하고 DB에 쓰지 않음")
+    parser.add_argument("--check", action="store_true", help="예전 반복문 계산 결과와 같은지 비교")
+    args = parser.parse_args(argv)
+
+    # 1) 기준 시간 (현재)
+    now = datetime.now(timezone.utc)
+    print(f"🔹 [LOG] now = {now.isoformat()}")
+
+    # 2) 분석 완료 기사 + 키워드 조회
+    started = time.perf_counter()
+    articles = fetch_analyzed_articles()
+    if articles.empty:
+        print("[LOG] ANALYZED 상태의 기사가 없습니다. 종료.")
+        close_pool()
+        return
+
+    keywords = fetch_keywords_for_results()
+    fetched = time.perf_counter()
+
+    # 3) 계산
+    scores = compute_trend_scores(articles, keywords, now)
+    computed = time.perf_counter()
+    print(
+        f"[LOG] trend_score 계산 완료: {len(scores)}건, "
+        f"조회 {fetched - started:.2f}초, 계산 {computed - fetched:.2f}초"
+    )
+
+    if args.check:
+        reference = compute_trend_scores_reference(articles, keywords, now)
+        diff = [
+            (rid, reference[rid], score)
+            for rid, score in zip(scores["result_id"], scores["trend_score"])
+            if reference[rid] != score
+        ]
+        print(f"[LOG] 예전 계산과 비교: 불일치 {len(diff)}건 {diff[:10]}")
+
+    # 4) DB 반영
+    if args.dry_run:
+        print(scores.sort_values("trend_score", ascending=False).head(10).to_string(index=False))
+    else:
+        updated_count = write_trend_scores(scores)
+        print(f"[LOG] trend_score 업데이트 완료, 값이 바뀐 기사 수={updated_count} ({time.perf_counter() - computed:.2f}초)")
+
+    close_pool()
+    print("[LOG] calc_trend_score 종료, DB 연결 닫음")
+
+
+if __name__ == "__main__":
+    print("[LOG] __main__ 블록 진입 (calc_trend_score)")
+    # .env 로드는 스크립트로 실행할 때만 (API 서버가 import 할 때는 부작용 없이)
+    # DB 접속 정보는 app.db.db 커넥션 풀이 처음 사용될 때 읽는다
+    load_dotenv()
+    print("🔹 [LOG] .env 로드 완료")
+    main()
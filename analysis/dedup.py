@@ -0,0 +1,261 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from analysis.analysis_cache import normalize_text
+
+# -------------------------------
+# 유사 중복 기사 탐지 설정 (env로 조정)
+# -------------------------------
+# 비워두면 파일에 저장하지 않고 프로세스 안에서만 유지
+DEDUP_INDEX_PATH = os.getenv(
+    "DEDUP_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "dedup_index.npz"),
+)
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))         # 글자 n-gram 길이
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))               # MinHash 해시 함수 수
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))                      # LSH 밴드 수 (밴드당 NUM_PERM / BANDS 행)
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))           # 추정 Jaccard 가 이 이상이면 같은 묶음
+DEDUP_MIN_CHARS = int(os.getenv("DEDUP_MIN_CHARS", "200"))             # 이보다 짧은 본문은 묶지 않음
+DEDUP_RETENTION_DAYS = float(os.getenv("DEDUP_RETENTION_DAYS", "14"))  # 인덱스에 남겨둘 기간
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MASK32 = np.uint64(0xFFFFFFFF)
+_SEED = 20240601   # 저장된 signature 와 비교할 수 있도록 고정
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _permutations(num_perm: int):
+    # a, b < 2^32 (minhash_signature 의 넘침 방지 조건)
+    rng = np.random.RandomState(_SEED)
+    a = rng.randint(1, np.iinfo(np.uint32).max, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, np.iinfo(np.uint32).max, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+_PERM_A, _PERM_B = _permutations(DEDUP_NUM_PERM)
+
+
+def shingle_hashes(text: str, k: int = DEDUP_SHINGLE_SIZE) -> np.ndarray:
+    """
+    공백을 뺀 정규화 본문의 글자 k-gram 을 32비트 해시로 (중복 제거).
+    다항식 롤링 해시를 k 번의 배열 연산으로 계산한다.
+    """
+    text = normalize_text(text).replace(" ", "")
+    if len(text) < k:
+        return np.array([], dtype=np.uint64)
+
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    n = len(codes) - k + 1
+    h = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        h = h * np.uint64(1000003) + codes[j:j + n]   # uint64 넘침은 그대로 버림
+    return np.unique((h ^ (h >> np.uint64(32))) & _MASK32)
+
+
+def minhash_signature(hashes: np.ndarray) -> np.ndarray | None:
+    """
+    (a * x + b) mod (2^61 - 1) 의 최솟값을 NUM_PERM 개 → uint32 signature
+    x, a, b 를 모두 32비트 안으로 두면 a * x + b < 2^64 라서 uint64 로 계산해도 넘치지 않는다.
+    """
+    if len(hashes) == 0:
+        return None
+    x = hashes.astype(np.uint64) & _MASK32
+    values = (x[:, None] * _PERM_A[None, :] + _PERM_B[None, :]) % _MERSENNE
+    return (values.min(axis=0) & _MASK32).astype(np.uint32)
+
+
+class DedupIndex:
+    """
+    url → MinHash signature 와 묶음 대표 url.
+    LSH: signature 를 bands 개 구간으로 나눠 구간 값이 하나라도 같은 기사만 후보로 보고,
+    후보 중 signature 일치 비율(추정 Jaccard)이 threshold 이상인 가장 비슷한 기사의 묶음에 넣는다.
+    npz 파일로 저장해서 다음 크롤링 실행 / 분석 runner 가 이어서 쓴다.
+    """
+
+    def __init__(self, path: str | None = DEDUP_INDEX_PATH, bands: int = DEDUP_BANDS, threshold: float = DEDUP_THRESHOLD):
+        if DEDUP_NUM_PERM % bands:
+            raise ValueError(f"DEDUP_NUM_PERM({DEDUP_NUM_PERM}) 이 bands({bands}) 로 나누어떨어지지 않습니다")
+        self.path = path
+        self.bands = bands
+        self.rows = DEDUP_NUM_PERM // bands
+        self.threshold = threshold
+        self.dirty = False
+        self._mtime = None
+        self._lock = threading.RLock()
+        self._reset()
+
+        if path and os.path.exists(path):
+            self._load()
+
+    def _reset(self):
+        self.urls = []
+        self.sigs = []
+        self.reps = []
+        self.added_at = []
+        self.url_pos = {}                                  # url → 위치
+        self.members = {}                                  # 대표 url → 묶음 url 들
+        self.buckets = [{} for _ in range(self.bands)]     # 밴드별 구간 값 → 위치 목록
+
+    # ---------- 추가 / 조회 ----------
+    def _insert(self, url: str, sig: np.ndarray, rep: str, added_at: float):
+        pos = len(self.urls)
+        self.urls.append(url)
+        self.sigs.append(sig)
+        self.reps.append(rep)
+        self.added_at.append(added_at)
+        self.url_pos[url] = pos
+        self.members.setdefault(rep, []).append(url)
+        for band in range(self.bands):
+            key = sig[band * self.rows:(band + 1) * self.rows].tobytes()
+            self.buckets[band].setdefault(key, []).append(pos)
+
+    def _candidates(self, sig: np.ndarray) -> set:
+        found = set()
+        for band in range(self.bands):
+            key = sig[band * self.rows:(band + 1) * self.rows].tobytes()
+            found.update(self.buckets[band].get(key, ()))
+        return found
+
+    def add(self, url: str, text: str) -> str:
+        """
+        기사 하나를 인덱스에 넣고 묶음 대표 url 을 반환 (비슷한 기사가 없으면 자기 자신).
+        이미 있는 url 이면 기존 묶음 그대로.
+        """
+        with self._lock:
+            if url in self.url_pos:
+                return self.reps[self.url_pos[url]]
+
+        if not url or len(normalize_text(text)) < DEDUP_MIN_CHARS:
+            return url
+        sig = minhash_signature(shingle_hashes(text))
+        if sig is None:
+            return url
+
+        with self._lock:
+            if url in self.url_pos:
+                return self.reps[self.url_pos[url]]
+
+            rep, best = url, self.threshold
+            candidates = list(self._candidates(sig))
+            if candidates:
+                similarity = (np.stack([self.sigs[c] for c in candidates]) == sig).mean(axis=1)
+                top = int(similarity.argmax())
+                if similarity[top] >= best:
+                    rep = self.reps[candidates[top]]
+
+            self._insert(url, sig, rep, time.time())
+            self.dirty = True
+            return rep
+
+    def rep_of(self, url: str) -> str:
+        with self._lock:
+            pos = self.url_pos.get(url)
+            return url if pos is None else self.reps[pos]
+
+    def cluster_of(self, url: str) -> list:
+        """
+        url 과 같은 묶음의 url 전부 (묶음이 없으면 [url])
+        """
+        with self._lock:
+            pos = self.url_pos.get(url)
+            if pos is None:
+                return [url]
+            return list(self.members.get(self.reps[pos], [url]))
+
+    # ---------- 저장 / 불러오기 ----------
+    def _read_file(self):
+        with np.load(self.path) as data:
+            meta = data["meta"].tolist()
+            if meta != [DEDUP_NUM_PERM, DEDUP_SHINGLE_SIZE, _SEED]:
+                print(f"[LOG] dedup 인덱스 설정이 바뀌어서 기존 파일 무시: {self.path}")
+                return None
+            return data["urls"].tolist(), data["sigs"], data["reps"].tolist(), data["added_at"].tolist()
+
+    def _load(self):
+        loaded = self._read_file()
+        self._mtime = os.path.getmtime(self.path)
+        if loaded is None:
+            return
+        urls, sigs, reps, added_at = loaded
+        for url, sig, rep, ts in zip(urls, sigs, reps, added_at):
+            self._insert(url, sig, rep, ts)
+        print(f"[LOG] dedup 인덱스 로드: {len(self.urls)}건 ({self.path})")
+
+    def reload_if_changed(self):
+        """
+        다른 프로세스(크롤러)가 파일을 갱신했으면 새로 읽는다 (분석 runner 용, 읽기 전용).
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        with self._lock:
+            if os.path.getmtime(self.path) == self._mtime:
+                return
+            self._reset()
+            self._load()
+
+    def save(self):
+        """
+        오래된(DEDUP_RETENTION_DAYS) 기사는 빼고 임시 파일에 쓴 뒤 교체.
+        다른 프로세스가 그사이 파일을 갱신했으면 그쪽에만 있는 기사도 합쳐서 쓴다.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if os.path.exists(self.path) and os.path.getmtime(self.path) != self._mtime:
+                loaded = self._read_file()
+                if loaded is not None:
+                    for url, sig, rep, ts in zip(*loaded):
+                        if url not in self.url_pos:
+                            self._insert(url, sig, rep, ts)
+
+            cutoff = time.time() - DEDUP_RETENTION_DAYS * 86400
+            keep = [i for i, ts in enumerate(self.added_at) if ts >= cutoff]
+            if len(keep) < len(self.urls):
+                kept = [(self.urls[i], self.sigs[i], self.reps[i], self.added_at[i]) for i in keep]
+                self._reset()
+                for url, sig, rep, ts in kept:
+                    self._insert(url, sig, rep, ts)
+
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.savez(
+                    f,
+                    meta=np.array([DEDUP_NUM_PERM, DEDUP_SHINGLE_SIZE, _SEED]),
+                    urls=np.array(self.urls, dtype=str),
+                    sigs=np.stack(self.sigs) if self.sigs else np.zeros((0, DEDUP_NUM_PERM), dtype=np.uint32),
+                    reps=np.array(self.reps, dtype=str),
+                    added_at=np.array(self.added_at, dtype=np.float64),
+                )
+            os.replace(tmp, self.path)
+            self._mtime = os.path.getmtime(self.path)
+            self.dirty = False
+        print(f"[LOG] dedup 인덱스 저장: {len(self.urls)}건 ({self.path})")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "articles": len(self.urls),
+                "clusters": len(self.members),
+                "duplicates": len(self.urls) - len(self.members),
+            }
+
+
+def get_dedup_index() -> DedupIndex | None:
+    """
+    DEDUP_ENABLED=0 이면 None (중복 탐지 안 함)
+    """
+    global _index
+    if not DEDUP_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DedupIndex()
+    return _index
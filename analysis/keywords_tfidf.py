@@ -0,0 +1,302 @@
+import argparse
+import os
+import re
+import sys
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.utils import murmurhash3_32
+
+# analysis/ 폴더에서 직접 실행해도 app, analysis 패키지를 import 할 수 있도록
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis.analysis_cache import normalize_text
+
+# -------------------------------
+# 로컬 TF-IDF 키워드 추출 설정 (env로 조정)
+# -------------------------------
+# 비워두면 문서 빈도(DF)를 파일에 저장하지 않음
+KEYWORD_IDF_PATH = os.getenv(
+    "KEYWORD_IDF_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "keyword_idf.npz"),
+)
+KEYWORD_HASH_BITS = int(os.getenv("KEYWORD_HASH_BITS", "20"))        # 해시 공간 2^N (단어 사전 없이 DF 를 배열로 유지)
+KEYWORD_TOP_K = int(os.getenv("KEYWORD_TOP_K", "5"))                 # 기사당 키워드 수
+KEYWORD_TITLE_WEIGHT = int(os.getenv("KEYWORD_TITLE_WEIGHT", "2"))   # 제목에 나온 단어는 이만큼 더 센다
+KEYWORD_FIT_CHUNK = int(os.getenv("KEYWORD_FIT_CHUNK", "5000"))      # --fit 때 한 번에 읽을 기사 수
+
+# 한글 2글자 이상 / 영문(숫자 섞임) / 5G 같은 숫자+영문
+_TOKEN = re.compile(r"[가-힣]{2,}|[A-Za-z][A-Za-z0-9]+|[0-9]+[A-Za-z]+")
+
+# 명사 뒤에 붙는 조사 / 서술격 어미 (긴 것부터 떼어본다)
+_JOSA = sorted(
+    """
+    으로부터 에서부터 이라고 이라는 이었다 에서는 에게서 으로는 으로서 으로써 까지는 부터는 에서도 에게는
+    으로 에서 에게 한테 까지 부터 보다 처럼 만큼 라고 라는 이나 이며 이고 이다 였다 와의 과의 에는 에도 로는 로서 로써
+    하는 하고 하며 하면 해야 했던 하기 했고 한다 했다 된다 됐다 되는 되고
+    은 는 이 가 을 를 의 에 도 만 로 와 과 나 고
+    """.split(),
+    key=len,
+    reverse=True,
+)
+
+# 기사마다 나오는 말 (키워드로 의미 없음)
+_STOPWORDS = set(
+    """
+    기자 뉴스 무단 전재 배포 금지 재배포 저작권 사진 제공 영상 연합뉴스 뉴시스 뉴스1 특파원 앵커 리포트
+    오늘 어제 내일 지난 이번 올해 지난해 현재 당시 최근 관련 대해 대한 위해 통해 따라 따르면 가운데 이후 이전
+    그러나 하지만 그리고 또한 이날 이어 한편 특히 경우 정도 모두 우리 이상 이하 밝혔다 말했다 설명했다 전했다
+    있다 없다 했다 한다 된다 됐다 것으로 것이 것은 있는 없는 있도록 하는 했다고 있다고 라며 이라며
+    """.split()
+)
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+@lru_cache(maxsize=200_000)
+def _normalize_token(raw: str) -> str | None:
+    # 같은 어절은 기사마다 반복되므로 결과를 캐시 (None: 버리는 토큰)
+    if "가" <= raw[0] <= "힣":
+        token = raw
+        # "지원한다고" 처럼 어미 + 조사가 겹친 경우가 있어 두 번까지 뗀다
+        for _ in range(2):
+            for josa in _JOSA:
+                if token.endswith(josa) and len(token) - len(josa) >= 2:
+                    token = token[:-len(josa)]
+                    break
+            else:
+                break
+    else:
+        token = raw.lower()
+    if len(token) < 2 or token in _STOPWORDS:
+        return None
+    return token
+
+
+def tokenize(text: str | None) -> list:
+    """
+    형태소 분석기 없이 쓰는 간단한 한국어 토큰화: 조사/어미를 떼고 불용어와 한 글자 토큰은 버린다.
+    """
+    tokens = []
+    for raw in _TOKEN.findall(normalize_text(text)):
+        token = _normalize_token(raw)
+        if token is not None:
+            tokens.append(token)
+    return tokens
+
+
+class KeywordExtractor:
+    """
+    해싱 트릭 TF-IDF.
+    - 단어 → murmurhash3 % 2^KEYWORD_HASH_BITS 열 (HashingVectorizer 와 같은 방식, 사전을 키우지 않음)
+    - 문서 빈도(DF)는 해시 열 단위 배열로 누적하므로 partial_fit 으로 계속 늘려갈 수 있다
+    - 점수: (1 + log tf) × idf,  idf = log((1 + N) / (1 + df)) + 1  (scikit-learn smooth_idf 와 같은 식)
+    배치 단위로 (문서 × 배치 안 단어) 희소 행렬을 만들어 한 번에 계산한다.
+    """
+
+    def __init__(self, path: str | None = KEYWORD_IDF_PATH, hash_bits: int = KEYWORD_HASH_BITS):
+        self.path = path
+        self.n_features = 1 << hash_bits
+        self.df = np.zeros(self.n_features, dtype=np.int32)
+        self.n_docs = 0
+        self.last_article_id = 0      # --fit 으로 어디까지 반영했는지
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self._load()
+
+    # ---------- 행렬 ----------
+    def _hash_columns(self, vocab) -> np.ndarray:
+        n = self.n_features
+        return np.fromiter(
+            (murmurhash3_32(token, seed=0, positive=True) % n for token in vocab),
+            dtype=np.int64,
+            count=len(vocab),
+        )
+
+    def _count_matrix(self, docs) -> tuple:
+        """
+        docs: [(title, content), ...] → (문서 × 배치 단어 개수 행렬, 배치 단어 목록, 단어별 해시 열)
+        """
+        rows, tokens = [], []
+        for i, (title, content) in enumerate(docs):
+            doc_tokens = tokenize(title) * KEYWORD_TITLE_WEIGHT + tokenize(content)
+            tokens.extend(doc_tokens)
+            rows.extend([i] * len(doc_tokens))
+
+        ids, vocab = pd.factorize(pd.Series(tokens, dtype=object))
+        counts = sparse.csr_matrix(
+            (np.ones(len(ids), dtype=np.float64), (np.asarray(rows, dtype=np.int64), ids)),
+            shape=(len(docs), len(vocab)),
+        )
+        counts.sum_duplicates()
+        return counts, np.asarray(vocab, dtype=object), self._hash_columns(vocab)
+
+    def _add_df(self, counts, columns):
+        presence = np.asarray((counts > 0).sum(axis=0)).ravel().astype(np.int32)
+        with self._lock:
+            np.add.at(self.df, columns, presence)
+            self.n_docs += counts.shape[0]
+
+    # ---------- 학습 / 추출 ----------
+    def partial_fit(self, docs):
+        """
+        문서 빈도에 docs 를 더한다 (기존 상태는 유지)
+        """
+        if not docs:
+            return
+        counts, _, columns = self._count_matrix(docs)
+        self._add_df(counts, columns)
+
+    def extract_batch(self, docs, top_k: int = KEYWORD_TOP_K, update: bool = False) -> list:
+        """
+        docs: [(title, content), ...] → 문서별 키워드 리스트 (점수 높은 순)
+        update=True 면 이 문서들도 문서 빈도에 먼저 반영한다.
+        """
+        if not docs:
+            return []
+        counts, vocab, columns = self._count_matrix(docs)
+        if update:
+            self._add_df(counts, columns)
+
+        with self._lock:
+            n_docs, df = self.n_docs, self.df[columns]
+        idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+
+        scores = counts.copy()
+        scores.data = (1.0 + np.log(scores.data)) * idf[scores.indices]
+
+        results = []
+        indptr, indices, data = scores.indptr, scores.indices, scores.data
+        for i in range(len(docs)):
+            start, end = indptr[i], indptr[i + 1]
+            if start == end:
+                results.append([])
+                continue
+            row = data[start:end]
+            k = min(top_k, end - start)
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top], kind="stable")]
+            results.append(vocab[indices[start:end][top]].tolist())
+        return results
+
+    def extract(self, title: str, content: str, top_k: int = KEYWORD_TOP_K) -> list:
+        return self.extract_batch([(title, content)], top_k)[0]
+
+    # ---------- 저장 / 불러오기 ----------
+    def _load(self):
+        with np.load(self.path) as data:
+            if int(data["n_features"]) != self.n_features:
+                print(f"[LOG] 키워드 해시 크기가 바뀌어서 기존 DF 파일 무시: {self.path}")
+                return
+            self.df = data["df"].astype(np.int32)
+            self.n_docs = int(data["n_docs"])
+            self.last_article_id = int(data["last_article_id"])
+        print(f"[LOG] 키워드 DF 로드: 문서 {self.n_docs}건 ({self.path})")
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            with open(tmp, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    n_features=np.int64(self.n_features),
+                    df=self.df,
+                    n_docs=np.int64(self.n_docs),
+                    last_article_id=np.int64(self.last_article_id),
+                )
+            os.replace(tmp, self.path)
+        print(f"[LOG] 키워드 DF 저장: 문서 {self.n_docs}건 ({self.path})")
+
+
+def get_keyword_extractor() -> KeywordExtractor:
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                _extractor = KeywordExtractor()
+    return _extractor
+
+
+def fallback_keywords(title: str, content: str, top_k: int = KEYWORD_TOP_K) -> list:
+    """
+    LLM 이 키워드를 못 줬을 때 쓰는 로컬 키워드 (문서 빈도가 비어 있으면 tf 순)
+    """
+    return get_keyword_extractor().extract(title, content, top_k)
+
+
+# -------------------------------
+# CLI: 기사 테이블로 문서 빈도 학습 (지난번 이후 새 기사만)
+# -------------------------------
+def fit_from_db(extractor: KeywordExtractor) -> int:
+    from app.db.db import db_conn
+
+    fitted = 0
+    started = time.perf_counter()
+    with db_conn() as conn:
+        with conn.cursor(name="keyword_fit") as cur:
+            cur.itersize = KEYWORD_FIT_CHUNK
+            cur.execute(
+                """
+                SELECT article_id, title, content
+                FROM article
+                WHERE article_id > %s
+                  AND content IS NOT NULL
+                ORDER BY article_id;
+                """,
+                (extractor.last_article_id,),
+            )
+            while True:
+                rows = cur.fetchmany(KEYWORD_FIT_CHUNK)
+                if not rows:
+                    break
+                extractor.partial_fit([(title, content) for _, title, content in rows])
+                extractor.last_article_id = rows[-1][0]
+                fitted += len(rows)
+
+    elapsed = time.perf_counter() - started
+    print(f"[LOG] 문서 빈도 학습: 새 기사 {fitted}건, {elapsed:.2f}초 ({fitted / max(elapsed, 1e-9):.0f}건/초)")
+    return fitted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 TF-IDF 키워드 추출")
+    parser.add_argument("--fit", action="store_true", help="article 테이블의 새 기사로 문서 빈도 학습 후 저장")
+    parser.add_argument("--show", type=int, default=0, help="최근 기사 N건의 키워드 출력")
+    args = parser.parse_args(argv)
+
+    from app.db.db import db_conn, close_pool
+
+    extractor = get_keyword_extractor()
+    if args.fit:
+        if fit_from_db(extractor):
+            extractor.save()
+
+    if args.show:
+        with db_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT article_id, title, content FROM article WHERE content IS NOT NULL ORDER BY article_id DESC LIMIT %s;",
+                    (args.show,),
+                )
+                rows = cur.fetchall()
+        started = time.perf_counter()
+        keywords = extractor.extract_batch([(title, content) for _, title, content in rows])
+        elapsed = time.perf_counter() - started
+        for (article_id, title, _), kws in zip(rows, keywords):
+            print(f"[article_id={article_id}] {title} → {kws}")
+        print(f"[LOG] 키워드 추출 {len(rows)}건, {elapsed:.3f}초")
+
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
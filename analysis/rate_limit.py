@@ -0,0 +1,77 @@
+import threading
+import time
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토크나이저 없이 대충 세는 토큰 수.
+    영문/숫자는 4글자당 1토큰, 한글 등 나머지는 1글자당 1토큰 정도로 잡는다 (넉넉하게).
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+class _Bucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        # 버킷 용량보다 큰 요청은 가득 찼을 때 보내도록 용량만큼만 요구
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+# -------------------------------
+# 분당 요청 수(RPM) + 분당 토큰 수(TPM) 제한
+# -------------------------------
+class RateLimiter:
+    """
+    OpenAI 계정 한도에 맞춰 분당 요청 수 / 토큰 수를 같이 제한한다.
+    acquire(tokens) 는 두 한도 모두 여유가 생길 때까지 기다린 뒤 차감한다.
+    rpm, tpm 이 0 이하면 해당 한도는 없음.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self._requests = _Bucket(rpm) if rpm > 0 else None
+        self._tokens = _Bucket(tpm) if tpm > 0 else None
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = 0.0
+                for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                    if bucket is not None:
+                        bucket.refill(now)
+                        wait = max(wait, bucket.wait_time(amount))
+
+                if wait <= 0:
+                    if self._requests is not None:
+                        self._requests.tokens -= 1
+                    if self._tokens is not None:
+                        self._tokens.tokens -= min(tokens, self._tokens.capacity)
+                    return
+            time.sleep(wait)
+
+    def record_usage(self, estimated: int, actual: int):
+        """
+        호출 뒤 실제 사용 토큰(response.usage)으로 acquire 때 추정치와의 차이를 보정.
+        더 썼으면 그만큼 더 차감(음수까지 내려가면 다음 acquire 가 기다림), 덜 썼으면 돌려준다.
+        """
+        if self._tokens is None or not actual:
+            return
+        with self._lock:
+            self._tokens.refill(time.monotonic())
+            self._tokens.tokens = min(self._tokens.capacity, self._tokens.tokens - (actual - estimated))
@@ -1,63 +1,178 @@
+import argparse
 import os
+import socket
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import load_dotenv
-import psycopg2
-from psycopg2.extras import DictCursor
-
-from analysis_openai import analyze_article_with_openai
+from psycopg2.extras import DictCursor, execute_values
+
+# analysis/ 폴더에서 직접 실행해도 app, analysis 패키지를 import 할 수 있도록
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis.analysis_cache import get_analysis_cache
+from analysis.dedup import get_dedup_index
+from analysis.analysis_openai import (
+    OPENAI_INPUT_TOKEN_BUDGET,
+    OPENAI_MODEL,
+    USAGE_STATS,
+    analyze_article_cached,
+    analyze_articles_packed,
+    get_cached_analysis,
+    store_cached_analysis,
+)
+from analysis.rate_limit import RateLimiter
+from analysis.tokens import count_tokens
+from analysis.trend_incremental import notify_saved_analysis
+from app.db.db import db_conn, close_pool
 
 print("🔹 [LOG] run_openai_for_articles.py import 시작")
 
-# .env 로드
+# .env 로드 (DB 접속 정보는 app.db.db 의 커넥션 풀이 처음 사용될 때 읽는다)
 load_dotenv()
 print("🔹 [LOG] .env 로드 완료")
 
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-
-# 환경 변수 체크 (디버깅용, 민감 정보는 출력 X)
-print(f"🔹 [ENV CHECK]\nHOST={DB_HOST}\nPORT={DB_PORT}\nDB={DB_NAME}\nUSER={DB_USER}\n")
-
-# 1) DB 연결 생성
-try:
-    conn = psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-    )
-    print("[LOG] DB 연결 성공")
-except Exception as e:
-    print("[ERROR] DB 연결 실패:", e)
-    raise
-
-
-def fetch_target_articles(limit: int = 5):
-    """
-    아직 analysis_result에 없는 article 몇 개 가져오기.
-    """
-    print(f"[LOG] fetch_target_articles() 호출, limit={limit}")
-    with conn.cursor(cursor_factory=DictCursor) as cur:
-        cur.execute(
-            """
-            SELECT a.article_id, a.title, a.content
-            FROM article a
-            LEFT JOIN analysis_result ar 
-                   ON ar.article_id = a.article_id
-            WHERE ar.article_id IS NULL
-              AND a.content IS NOT NULL
-            ORDER BY a.article_id DESC
-            LIMIT %s;
-            """,
-            (limit,),
-        )
-        rows = cur.fetchall()
-        print(f"[LOG] 가져온 기사 개수: {len(rows)}")
-        return rows
+# worker 설정 (기본값은 기존과 같은 순차 처리 5건)
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "1"))
+ANALYSIS_BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", "5"))
+OPENAI_RPM_LIMIT = float(os.getenv("OPENAI_RPM_LIMIT", "0"))
+OPENAI_TPM_LIMIT = float(os.getenv("OPENAI_TPM_LIMIT", "0"))
+PROMPT_TOKEN_OVERHEAD = 600   # 지시문 + 응답 JSON 몫으로 넉넉히 잡은 토큰 수
+
+# 짧은 기사는 ANALYSIS_PACK_SIZE 개까지 묶어서 요청 하나로 분석 (1 이면 묶지 않음)
+ANALYSIS_PACK_SIZE = int(os.getenv("ANALYSIS_PACK_SIZE", "8"))
+ANALYSIS_PACK_MAX_TOKENS = int(os.getenv("ANALYSIS_PACK_MAX_TOKENS", "700"))   # 이 토큰 이하 본문만 묶음 대상
+PACK_ITEM_OVERHEAD = 150      # 묶음 안 기사 1개당 id / 응답 JSON 몫
+
+# 여러 프로세스/호스트가 나눠서 분석할 때 쓰는 작업 선점(lease) 설정
+WORKER_ID = os.getenv("ANALYSIS_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+ANALYSIS_LEASE_SECONDS = int(os.getenv("ANALYSIS_LEASE_SECONDS", "600"))          # 이 시간 안에 못 끝내면 다른 worker 가 가져감
+ANALYSIS_RETRY_FAILED_AFTER = int(os.getenv("ANALYSIS_RETRY_FAILED_AFTER", "3600"))  # 실패한 기사는 이만큼 지나야 다시 시도
+
+# 저장한 결과의 키워드 출처 (model / tfidf) 누적 — 모델 키워드 없이 TF-IDF 로 채워 저장한 비율 확인용
+KEYWORD_SOURCE_COUNTS = Counter()
+_keyword_source_lock = threading.Lock()
+
+
+def ensure_claim_table():
+    """
+    기사별 분석 작업 선점 상태 테이블.
+    (article.ingest_status 는 백엔드 enum / check constraint 를 따르므로 IN_PROGRESS 는 여기서 관리)
+    status: IN_PROGRESS / DONE / FAILED / EXPIRED
+    """
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analysis_claim (
+                    article_id  BIGINT PRIMARY KEY,
+                    worker_id   TEXT NOT NULL,
+                    status      TEXT NOT NULL,
+                    claimed_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    lease_until TIMESTAMPTZ NOT NULL,
+                    attempts    INT NOT NULL DEFAULT 1
+                );
+                """
+            )
+
+
+def reclaim_stale_leases() -> int:
+    """
+    lease 가 만료된 IN_PROGRESS 작업(죽은 worker 가 잡고 있던 것)을 EXPIRED 로 표시.
+    EXPIRED 는 다음 fetch_target_articles() 에서 다시 선점된다.
+    """
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE analysis_claim
+                SET status = 'EXPIRED'
+                WHERE status = 'IN_PROGRESS'
+                  AND lease_until < NOW();
+                """
+            )
+            count = cur.rowcount
+    if count:
+        print(f"[LOG] 만료된 lease {count}건 회수")
+    return count
+
+
+def fetch_target_articles(limit: int = 5, lease_seconds: int | None = None, worker_id: str | None = None):
+    """
+    아직 analysis_result에 없는 article 몇 개를 이 worker 몫으로 선점해서 가져오기.
+    FOR UPDATE SKIP LOCKED 로 다른 worker 가 동시에 고르는 행은 건너뛰고,
+    analysis_claim 에 IN_PROGRESS + lease 만료 시각을 기록한다.
+    이미 다른 worker 가 잡고 있거나(lease 유효) 분석이 끝난 기사(DONE)는 가져오지 않는다.
+    상세 크롤링에 실패한 자리표시 행(본문 없음)도 제외 — 다음 크롤링에서 다시 받는다.
+    (분석 실패로 FAILED 가 된 기사는 본문이 있으므로 ANALYSIS_RETRY_FAILED_AFTER 뒤 다시 선점된다)
+    """
+    lease_seconds = lease_seconds or ANALYSIS_LEASE_SECONDS
+    worker_id = worker_id or WORKER_ID
+    print(f"[LOG] fetch_target_articles() 호출, limit={limit}, worker={worker_id}")
+    with db_conn() as conn:
+        with conn.cursor(cursor_factory=DictCursor) as cur:
+            cur.execute(
+                """
+                WITH candidates AS (
+                    SELECT a.article_id
+                    FROM article a
+                    LEFT JOIN analysis_result ar
+                           ON ar.article_id = a.article_id
+                    LEFT JOIN analysis_claim c
+                           ON c.article_id = a.article_id
+                    WHERE ar.article_id IS NULL
+                      AND a.content IS NOT NULL
+                      AND a.content <> ''
+                      AND (c.article_id IS NULL
+                           OR (c.status <> 'DONE' AND c.lease_until < NOW()))
+                    ORDER BY a.article_id DESC
+                    LIMIT %s
+                    FOR UPDATE OF a SKIP LOCKED
+                ),
+                claimed AS (
+                    INSERT INTO analysis_claim (article_id, worker_id, status, claimed_at, lease_until)
+                    SELECT article_id, %s, 'IN_PROGRESS', NOW(), NOW() + make_interval(secs => %s)
+                    FROM candidates
+                    ON CONFLICT (article_id) DO UPDATE SET
+                        worker_id = EXCLUDED.worker_id,
+                        status = 'IN_PROGRESS',
+                        claimed_at = NOW(),
+                        lease_until = EXCLUDED.lease_until,
+                        attempts = analysis_claim.attempts + 1
+                    WHERE analysis_claim.status <> 'DONE'
+                      AND analysis_claim.lease_until < NOW()
+                    RETURNING article_id
+                )
+                SELECT a.article_id, a.title, a.content, a.url
+                FROM article a
+                JOIN claimed USING (article_id)
+                ORDER BY a.article_id DESC;
+                """,
+                (limit, worker_id, lease_seconds),
+            )
+            rows = cur.fetchall()
+    print(f"[LOG] 가져온 기사 개수: {len(rows)}")
+    return rows
+
+
+def finish_claim(article_id: int, status: str, worker_id: str | None = None):
+    """
+    선점한 작업 마무리. FAILED 는 ANALYSIS_RETRY_FAILED_AFTER 초 뒤에 다시 선점 가능.
+    """
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE analysis_claim
+                SET status = %s,
+                    lease_until = NOW() + make_interval(secs => %s)
+                WHERE article_id = %s
+                  AND worker_id = %s;
+                """,
+                (status, ANALYSIS_RETRY_FAILED_AFTER if status == "FAILED" else 0, article_id, worker_id or WORKER_ID),
+            )
 
 
 def update_article_status(article_id: int, status: str):
@@ -66,29 +181,24 @@ def update_article_status(article_id: int, status: str):
     status: 'ANALYZED', 'FAILED' 등
     """
     print(f"[LOG] article_id={article_id} ingest_status -> {status}")
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            UPDATE article
-            SET ingest_status = %s
-            WHERE article_id = %s;
-            """,
-            (status, article_id),
-        )
-    conn.commit()
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE article
+                SET ingest_status = %s
+                WHERE article_id = %s;
+                """,
+                (status, article_id),
+            )
 
 
-def save_analysis_to_db(article_id: int, analysis: dict):
+def normalize_sentiment(sentiment: str | None) -> str:
     """
-    OpenAI 분석 결과를 analysis_result, analysis_keywords에 저장.
     sentiment는 DB 제약 조건( POSITIVE / NEUTRAL / NEGATIVE / HOPEFUL / ANXIOUS )
-    에 맞도록 매핑해서 넣는다.
+    에 맞도록 매핑
     """
-    print(f"🔹 [LOG] save_analysis_to_db() 호출, article_id={article_id}")
-
-    summary = (analysis.get("summary") or "").strip()
-    sentiment = (analysis.get("sentiment") or "NEUTRAL").strip().upper()
-    keywords = analysis.get("keywords") or []
+    sentiment = (sentiment or "NEUTRAL").strip().upper()
 
     # DB가 허용하는 5가지 값
     allowed = {"POSITIVE", "NEUTRAL", "NEGATIVE", "HOPEFUL", "ANXIOUS"}
@@ -109,117 +219,543 @@ def save_analysis_to_db(article_id: int, analysis: dict):
     if sentiment not in allowed:
         print(f"🔹 [LOG] sentiment {sentiment} 허용값 아님 → NEUTRAL로 변경")
         sentiment = "NEUTRAL"
+    return sentiment
 
-    with conn.cursor() as cur:
-        # 1) analysis_result 추가
-        cur.execute(
-            """
-            INSERT INTO analysis_result (
-                created_at,
-                processed_at,
-                sentiment,
-                summary,
-                article_id
-            )
-            VALUES (NOW(), NOW(), %s, %s, %s)
-            RETURNING result_id;
-            """,
-            (sentiment, summary, article_id),
-        )
-        result_id = cur.fetchone()[0]
-        print(f"🔹 [LOG] analysis_result 저장 완료, result_id={result_id}")
 
-        # 2) analysis_keywords 추가
-        for kw in keywords:
-            kw_str = str(kw).strip()
-            if not kw_str:
-                continue
+def save_analysis_to_db(article_id: int, analysis: dict, claimed: bool = False, worker_id: str | None = None):
+    """
+    OpenAI 분석 결과를 analysis_result, analysis_keywords에 저장.
+    sentiment는 DB 제약 조건( POSITIVE / NEUTRAL / NEGATIVE / HOPEFUL / ANXIOUS )
+    에 맞도록 매핑해서 넣는다.
+
+    claimed=True 면 같은 트랜잭션에서 이 worker(worker_id, 기본 WORKER_ID)가 아직 lease 를 갖고 있는지 확인하고
+    (lease 가 만료돼 다른 worker 가 가져갔으면 저장하지 않음) 작업을 DONE 으로 표시한다.
+    반환: 저장된 result_id, 저장 안 했으면 None
+    """
+    print(f"🔹 [LOG] save_analysis_to_db() 호출, article_id={article_id}")
 
+    summary = (analysis.get("summary") or "").strip()
+    sentiment = normalize_sentiment(analysis.get("sentiment"))
+    keywords = analysis.get("keywords") or []
+
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            if claimed:
+                cur.execute(
+                    """
+                    SELECT 1
+                    FROM analysis_claim
+                    WHERE article_id = %s
+                      AND worker_id = %s
+                      AND status = 'IN_PROGRESS'
+                    FOR UPDATE;
+                    """,
+                    (article_id, worker_id or WORKER_ID),
+                )
+                if cur.fetchone() is None:
+                    print(f"[LOG] article_id={article_id} lease 를 잃어서 저장 생략 (다른 worker 가 처리)")
+                    return None
+
+            # 1) analysis_result 추가
             cur.execute(
                 """
-                INSERT INTO analysis_keywords (result_id, keyword)
-                VALUES (%s, %s);
+                INSERT INTO analysis_result (
+                    created_at,
+                    processed_at,
+                    sentiment,
+                    summary,
+                    article_id
+                )
+                VALUES (NOW(), NOW(), %s, %s, %s)
+                RETURNING result_id;
                 """,
-                (result_id, kw_str),
+                (sentiment, summary, article_id),
             )
-        print(f"🔹 [LOG] analysis_keywords {len(keywords)}개 저장 완료")
+            result_id = cur.fetchone()[0]
+            print(f"🔹 [LOG] analysis_result 저장 완료, result_id={result_id}")
+
+            # 2) analysis_keywords 추가
+            for kw in keywords:
+                kw_str = str(kw).strip()
+                if not kw_str:
+                    continue
+
+                cur.execute(
+                    """
+                    INSERT INTO analysis_keywords (result_id, keyword)
+                    VALUES (%s, %s);
+                    """,
+                    (result_id, kw_str),
+                )
+            print(f"🔹 [LOG] analysis_keywords {len(keywords)}개 저장 완료")
+
+            if claimed:
+                cur.execute(
+                    """
+                    UPDATE analysis_claim
+                    SET status = 'DONE'
+                    WHERE article_id = %s;
+                    """,
+                    (article_id,),
+                )
+
+            # 커밋되면 증분 트렌드 엔진(API 서버의 트렌드 인덱스 등)이 바로 refresh 하도록 알림
+            notify_saved_analysis(cur, result_id)
 
-    conn.commit()
     print(f"[LOG] article_id={article_id} 전체 저장 커밋 완료\n")
+    return result_id
 
 
-def main():
-    print("[LOG] main() 시작")
+def save_analyses_bulk(items, worker_id: str | None = None) -> dict:
+    """
+    save_analysis_to_db(claimed=True) + update_article_status(ANALYZED) 를 여러 건 한 트랜잭션으로.
+    items: [(article_id, analysis), ...]
+    이 worker 가 아직 lease 를 가진 기사만 저장하고 DONE / ANALYZED 로 표시한다.
+    반환: 저장한 article_id → result_id
+    """
+    if not items:
+        return {}
+    worker_id = worker_id or WORKER_ID
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT article_id
+                FROM analysis_claim
+                WHERE article_id = ANY(%s::bigint[])
+                  AND worker_id = %s
+                  AND status = 'IN_PROGRESS'
+                FOR UPDATE;
+                """,
+                ([article_id for article_id, _ in items], worker_id),
+            )
+            owned = {row[0] for row in cur.fetchall()}
+            items = [(article_id, analysis) for article_id, analysis in items if article_id in owned]
+            if not items:
+                return {}
 
-    # 1) 분석할 기사 가져오기
-    articles = fetch_target_articles(limit=5)
+            rows = execute_values(
+                cur,
+                """
+                INSERT INTO analysis_result (created_at, processed_at, sentiment, summary, article_id)
+                VALUES %s
+                RETURNING article_id, result_id;
+                """,
+                [
+                    (normalize_sentiment(analysis.get("sentiment")), (analysis.get("summary") or "").strip(), article_id)
+                    for article_id, analysis in items
+                ],
+                template="(NOW(), NOW(), %s, %s, %s)",
+                page_size=len(items),
+                fetch=True,
+            )
+            saved = dict(rows)
+
+            keyword_rows = [
+                (saved[article_id], str(kw).strip())
+                for article_id, analysis in items
+                for kw in analysis.get("keywords") or []
+                if str(kw).strip()
+            ]
+            if keyword_rows:
+                execute_values(
+                    cur,
+                    "INSERT INTO analysis_keywords (result_id, keyword) VALUES %s;",
+                    keyword_rows,
+                    page_size=1000,
+                )
+
+            article_ids = list(saved)
+            cur.execute(
+                "UPDATE analysis_claim SET status = 'DONE' WHERE article_id = ANY(%s::bigint[]);",
+                (article_ids,),
+            )
+            cur.execute(
+                "UPDATE article SET ingest_status = 'ANALYZED' WHERE article_id = ANY(%s::bigint[]);",
+                (article_ids,),
+            )
+            notify_saved_analysis(cur, max(saved.values()))
+
+    print(f"[LOG] 분석 결과 {len(saved)}건 일괄 저장 (키워드 {len(keyword_rows)}개)")
+    return saved
+
+
+def fail_articles_bulk(article_ids, worker_id: str | None = None) -> int:
+    """
+    finish_claim(FAILED) + update_article_status(FAILED) 를 여러 건 한 트랜잭션으로.
+    이 worker 가 잡고 있는 기사만 바꾼다. 바꾼 건수 반환.
+    """
+    if not article_ids:
+        return 0
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                WITH failed AS (
+                    UPDATE analysis_claim
+                    SET status = 'FAILED',
+                        lease_until = NOW() + make_interval(secs => %s)
+                    WHERE article_id = ANY(%s::bigint[])
+                      AND worker_id = %s
+                    RETURNING article_id
+                )
+                UPDATE article a
+                SET ingest_status = 'FAILED'
+                FROM failed
+                WHERE a.article_id = failed.article_id;
+                """,
+                (ANALYSIS_RETRY_FAILED_AFTER, list(article_ids), worker_id or WORKER_ID),
+            )
+            updated = cur.rowcount
+    print(f"[LOG] 분석 실패 {updated}건 일괄 표시")
+    return updated
+
+
+def evaluate_analysis(analysis: dict):
+    """
+    OpenAI 결과 성공 / 실패 판정.
+    반환: (성공 여부, 정제된 analysis, 판정 근거 dict)
+    """
+    summary_raw = (analysis.get("summary") or "").strip()
+    sentiment_raw = (analysis.get("sentiment") or "").strip()
+    keywords_raw = analysis.get("keywords") or []
+
+    # 요약 존재 여부
+    ok_summary = bool(summary_raw)
+
+    # 키워드 정제 (빈 문자열 제거)
+    if isinstance(keywords_raw, (list, tuple)):
+        valid_keywords = [str(k).strip() for k in keywords_raw if str(k).strip()]
+    else:
+        valid_keywords = []
+    ok_keywords = len(valid_keywords) > 0
+
+    # 감정 레이블 존재 여부
+    ok_sentiment = bool(sentiment_raw)
 
-    if not articles:
-        print("[LOG] 분석할 대상 기사가 없습니다.")
+    checks = {"summary_ok": ok_summary, "keywords_ok": ok_keywords, "sentiment_ok": ok_sentiment}
+    if not (ok_summary and ok_keywords and ok_sentiment):
+        return False, analysis, checks
+
+    # 성공 케이스: 정제된 값으로 analysis 덮어쓰기
+    cleaned = dict(analysis)
+    cleaned["summary"] = summary_raw
+    cleaned["sentiment"] = sentiment_raw
+    cleaned["keywords"] = valid_keywords
+    return True, cleaned, checks
+
+
+def _log_usage(usage: dict, limiter: RateLimiter | None, estimated: int):
+    if not usage:
         return
+    # 실제 사용 토큰으로 TPM 한도 보정
+    if limiter is not None:
+        limiter.record_usage(estimated, usage["prompt_tokens"] + usage["completion_tokens"])
+    print(
+        f"[LOG] 토큰: prompt {usage['prompt_tokens']}, completion {usage['completion_tokens']}, "
+        f"호출 {usage['calls']}번 ({usage['mode']}), {usage['latency_sec']}초"
+    )
+
+
+def finish_article(article_id: int, analysis: dict) -> str:
+    """
+    분석 결과 판정 → 저장 → ingest_status 갱신.
+    최종 상태('ANALYZED' / 'FAILED' / 'SKIPPED': lease 를 잃어서 저장 안 함) 반환.
+    """
+    print("요약 :", (analysis.get("summary") or "").strip())
+    print("감정 :", (analysis.get("sentiment") or "").strip())
+    print("키워드 :", analysis.get("keywords") or [], f"({analysis.get('keywords_source') or 'model'})")
+    print()
+
+    # 3) 성공 / 실패 판정
+    ok, analysis, checks = evaluate_analysis(analysis)
+    if not ok:
+        print(
+            f"[LOG] article_id={article_id} 분석 실패 "
+            f"(summary_ok={checks['summary_ok']}, keywords_ok={checks['keywords_ok']}, "
+            f"sentiment_ok={checks['sentiment_ok']})"
+        )
+        # 실패 → ingest_status = FAILED, 분석결과는 저장 안 함
+        update_article_status(article_id, "FAILED")
+        finish_claim(article_id, "FAILED")
+        return "FAILED"
+
+    # 4) DB 저장 (lease 를 잃었으면 다른 worker 결과가 우선)
+    if save_analysis_to_db(article_id, analysis, claimed=True) is None:
+        return "SKIPPED"
+
+    # 5) article.ingest_status = ANALYZED
+    update_article_status(article_id, "ANALYZED")
+    with _keyword_source_lock:
+        KEYWORD_SOURCE_COUNTS[analysis.get("keywords_source") or "model"] += 1
+    return "ANALYZED"
+
+
+def process_article(row, limiter: RateLimiter | None = None) -> str:
+    """
+    선점한 기사 1개 분석 → 저장 → ingest_status 갱신. 최종 상태 반환.
+    """
+    article_id = row["article_id"]
+    title = row["title"]
+    content = row["content"] or ""
+
+    print("=" * 80)
+    print(f"[article_id={article_id}] {title}")
+    print("- 원문 일부:")
+    print(content[:200].strip(), "...\n")
+
+    # 2) OpenAI로 분석 (RPM / TPM 한도 안에서)
+    #    같은 본문을 이미 분석한 적 있으면 캐시 결과 사용 (호출/한도 차감 없음)
+    #    본문은 OPENAI_INPUT_TOKEN_BUDGET 까지만 보내므로 추정 토큰도 그만큼으로 자른다
+    estimated = (
+        count_tokens(title, OPENAI_MODEL)
+        + min(count_tokens(content, OPENAI_MODEL), OPENAI_INPUT_TOKEN_BUDGET)
+        + PROMPT_TOKEN_OVERHEAD
+    )
+
+    def wait_for_limit():
+        if limiter is not None:
+            limiter.acquire(estimated)
+
+    print("[LOG] OpenAI 분석 호출")
+    try:
+        analysis = analyze_article_cached(title, content, before_request=wait_for_limit)
+    except Exception as e:
+        print(f"[ERROR] article_id={article_id} OpenAI 호출 실패: {e}")
+        update_article_status(article_id, "FAILED")
+        finish_claim(article_id, "FAILED")
+        return "FAILED"
 
-    for row in articles:
-        article_id = row["article_id"]
-        title = row["title"]
-        content = row["content"] or ""
+    _log_usage(analysis.get("usage"), limiter, estimated)
+    return finish_article(article_id, analysis)
+
+
+def process_pack(rows, limiter: RateLimiter | None = None) -> list:
+    """
+    짧은 기사 여러 개를 요청 하나로 분석 → 기사별 저장. rows 순서대로 최종 상태 반환.
+    캐시에 있는 기사는 빼고 묶고, 묶음 호출 자체가 실패하면 한 건씩 다시 분석한다.
+    """
+    statuses = {}
+    pending = []
+    for row in rows:
+        cached = get_cached_analysis(row["title"], row["content"] or "")
+        if cached is not None:
+            print(f"[LOG] article_id={row['article_id']} 캐시 결과 사용")
+            statuses[row["article_id"]] = finish_article(row["article_id"], cached)
+        else:
+            pending.append(row)
+
+    if pending:
+        items = [(row["article_id"], row["title"], row["content"] or "") for row in pending]
+        estimated = PROMPT_TOKEN_OVERHEAD + sum(
+            count_tokens(title, OPENAI_MODEL) + count_tokens(content, OPENAI_MODEL) + PACK_ITEM_OVERHEAD
+            for _, title, content in items
+        )
+        if limiter is not None:
+            limiter.acquire(estimated)
 
         print("=" * 80)
-        print(f"[article_id={article_id}] {title}")
-        print("- 원문 일부:")
-        print(content[:200].strip(), "...\n")
+        print(f"[LOG] 기사 {len(items)}건 묶어서 OpenAI 분석 호출: {[i[0] for i in items]}")
+        try:
+            results, usage = analyze_articles_packed(items)
+        except Exception as e:
+            print(f"[ERROR] 묶음 분석 호출 실패, 한 건씩 다시 분석: {e}")
+            for row in pending:
+                statuses[row["article_id"]] = process_article(row, limiter)
+        else:
+            _log_usage(usage, limiter, estimated)
+            for article_id, title, content in items:
+                analysis = results.get(article_id) or {}
+                store_cached_analysis(title, content, analysis)
+                print(f"[article_id={article_id}] {title}")
+                statuses[article_id] = finish_article(article_id, analysis)
+
+    return [statuses[row["article_id"]] for row in rows]
 
-        # 2) OpenAI로 분석
-        print("[LOG] OpenAI 분석 호출")
-        analysis = analyze_article_with_openai(title, content)
 
-        summary_raw = (analysis.get("summary") or "").strip()
-        sentiment_raw = (analysis.get("sentiment") or "").strip()
-        keywords_raw = analysis.get("keywords") or []
+def plan_packs(rows, pack_size: int, max_tokens: int) -> list:
+    """
+    가져온 기사들을 분석 단위로 나눈다.
+    본문이 max_tokens 이하인 짧은 기사는 pack_size 개씩 묶고, 나머지는 한 건씩.
+    """
+    groups, short = [], []
+    for row in rows:
+        if pack_size > 1 and count_tokens(row["content"] or "", OPENAI_MODEL) <= max_tokens:
+            short.append(row)
+        else:
+            groups.append([row])
+    groups.extend(short[i:i + pack_size] for i in range(0, len(short), pack_size))
+    return groups
 
-        print("요약 :", summary_raw)
-        print("감정 :", sentiment_raw)
-        print("키워드 :", keywords_raw)
-        print()
 
-        # ============================
-        # 3) 성공 / 실패 판정 로직
-        # ============================
+# -------------------------------
+# 유사 중복 묶음: 묶음당 한 건만 분석하고 나머지는 결과 복사
+# -------------------------------
+def fetch_cluster_analysis(urls: list) -> dict | None:
+    """
+    같은 묶음 기사 중 이미 분석된 것이 있으면 그 결과(summary / sentiment / keywords)
+    """
+    if not urls:
+        return None
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT a.article_id, ar.summary, ar.sentiment,
+                       COALESCE(array_agg(k.keyword) FILTER (WHERE k.keyword IS NOT NULL), '{}')
+                FROM article a
+                JOIN analysis_result ar ON ar.article_id = a.article_id
+                LEFT JOIN analysis_keywords k ON k.result_id = ar.result_id
+                WHERE a.url = ANY(%s)
+                GROUP BY a.article_id, ar.result_id
+                ORDER BY ar.result_id DESC
+                LIMIT 1;
+                """,
+                (urls,),
+            )
+            row = cur.fetchone()
+    if row is None:
+        return None
+    return {"source_article_id": row[0], "summary": row[1], "sentiment": row[2], "keywords": list(row[3])}
 
-        # 요약 존재 여부
-        ok_summary = bool(summary_raw)
 
-        # 키워드 정제 (빈 문자열 제거)
-        if isinstance(keywords_raw, (list, tuple)):
-            valid_keywords = [str(k).strip() for k in keywords_raw if str(k).strip()]
+def split_duplicates(rows) -> tuple:
+    """
+    가져온 기사를 (분석할 기사, 묶음 결과를 복사할 기사 [(row, 묶음 url 들, 이미 있던 분석 결과)]) 로 나눈다.
+    묶음마다 이번 배치의 첫 기사만 분석하고, 이미 분석된 묶음이면 그 기사도 복사 대상.
+    (이번 배치의 대표를 기다리는 기사는 분석 결과가 None → process_duplicate 에서 한 번 조회)
+    """
+    dedup = get_dedup_index()
+    if dedup is None:
+        return list(rows), []
+    dedup.reload_if_changed()
+
+    leaders, followers, seen = [], [], set()
+    for row in rows:
+        urls = dedup.cluster_of(row["url"])
+        if len(urls) == 1:
+            leaders.append(row)
+            continue
+        rep = dedup.rep_of(row["url"])
+        others = [u for u in urls if u != row["url"]]
+        analysis = None if rep in seen else fetch_cluster_analysis(others)
+        if rep in seen or analysis is not None:
+            followers.append((row, others, analysis))
         else:
-            valid_keywords = []
-        ok_keywords = len(valid_keywords) > 0
+            leaders.append(row)
+        seen.add(rep)
+    return leaders, followers
+
+
+def process_duplicate(row, urls: list, analysis: dict | None = None, limiter: RateLimiter | None = None) -> tuple:
+    """
+    같은 묶음에서 먼저 분석된 결과를 복사. 없으면(대표 분석 실패 등) 직접 분석.
+    analysis 가 None 이면(split_duplicates 때 아직 없던 묶음) 여기서 한 번 조회한다.
+    반환: (최종 상태, 복사했는지)
+    """
+    if analysis is None:
+        analysis = fetch_cluster_analysis(urls)
+    if analysis is None:
+        return process_article(row, limiter), False
+
+    print("=" * 80)
+    print(
+        f"[article_id={row['article_id']}] {row['title']}\n"
+        f"[LOG] 유사 기사 article_id={analysis['source_article_id']} 분석 결과 복사 (OpenAI 호출 없음)"
+    )
+    return finish_article(row["article_id"], analysis), True
+
 
-        # 감정 레이블 존재 여부
-        ok_sentiment = bool(sentiment_raw)
+def process_group(group, limiter: RateLimiter | None = None) -> list:
+    if len(group) == 1:
+        return [process_article(group[0], limiter)]
+    return process_pack(group, limiter)
+
+
+def run_worker(
+        workers: int,
+        batch_size: int,
+        loop: bool,
+        rpm: float,
+        tpm: float,
+        pack_size: int = ANALYSIS_PACK_SIZE,
+) -> dict:
+    """
+    workers 개 스레드로 기사를 동시에 분석.
+    loop=True 면 분석할 기사가 없을 때까지 batch_size 개씩 계속 가져온다.
+    짧은 기사는 pack_size 개씩 묶어서 요청 하나로 분석한다.
+    기사는 analysis_claim 으로 선점하므로 여러 프로세스/호스트에서 같이 돌려도 중복 분석하지 않는다.
+    (실패한 기사는 ANALYSIS_RETRY_FAILED_AFTER 동안 다시 선점되지 않음)
+    """
+    limiter = RateLimiter(rpm=rpm, tpm=tpm) if (rpm > 0 or tpm > 0) else None
+    counts = {"ANALYZED": 0, "FAILED": 0, "SKIPPED": 0, "DEDUPED": 0, "TFIDF_KEYWORDS": 0}
+    tfidf_before = KEYWORD_SOURCE_COUNTS["tfidf"]
+
+    ensure_claim_table()
+    reclaim_stale_leases()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analyze") as pool:
+        while True:
+            # 1) 분석할 기사 선점해서 가져오기
+            articles = fetch_target_articles(limit=batch_size)
+            if not articles:
+                print("[LOG] 분석할 대상 기사가 없습니다.")
+                break
+
+            # 유사 중복 묶음은 대표만 먼저 분석하고, 나머지는 그 결과를 복사
+            leaders, followers = split_duplicates(articles)
+
+            groups = plan_packs(leaders, pack_size, ANALYSIS_PACK_MAX_TOKENS)
+            for statuses in pool.map(lambda group: process_group(group, limiter), groups):
+                for status in statuses:
+                    counts[status] += 1
+
+            for status, copied in pool.map(lambda follower: process_duplicate(*follower, limiter), followers):
+                counts[status] += 1
+                counts["DEDUPED"] += int(copied and status == "ANALYZED")
+            counts["TFIDF_KEYWORDS"] = KEYWORD_SOURCE_COUNTS["tfidf"] - tfidf_before
 
-        if not (ok_summary and ok_keywords and ok_sentiment):
             print(
-                f"[LOG] article_id={article_id} 분석 실패 "
-                f"(summary_ok={ok_summary}, keywords_ok={ok_keywords}, sentiment_ok={ok_sentiment})"
+                f"[LOG] 진행 상황: 분석 {counts['ANALYZED']}건 (유사 기사 결과 복사 {counts['DEDUPED']}건, "
+                f"TF-IDF 키워드 {counts['TFIDF_KEYWORDS']}건), "
+                f"실패 {counts['FAILED']}건, lease 잃음 {counts['SKIPPED']}건"
             )
-            # 실패 → ingest_status = FAILED, 분석결과는 저장 안 함
-            update_article_status(article_id, "FAILED")
-            continue
+            if not loop:
+                break
 
-        # 성공 케이스: 정제된 값으로 analysis 덮어쓰기
-        analysis["summary"] = summary_raw
-        analysis["sentiment"] = sentiment_raw
-        analysis["keywords"] = valid_keywords
+    return counts
 
-        # 4) DB 저장
-        save_analysis_to_db(article_id, analysis)
 
-        # 5) article.ingest_status = ANALYZED
-        update_article_status(article_id, "ANALYZED")
+def main(argv=None):
+    print("[LOG] main() 시작")
+
+    parser = argparse.ArgumentParser(description="article → OpenAI 분석 → analysis_result 저장")
+    parser.add_argument("--workers", type=int, default=ANALYSIS_WORKERS, help="동시에 분석할 기사 수")
+    parser.add_argument("--batch-size", type=int, default=ANALYSIS_BATCH_SIZE, help="한 번에 가져올 기사 수")
+    parser.add_argument("--loop", action="store_true", help="대상 기사가 없을 때까지 계속 가져와서 분석")
+    parser.add_argument("--rpm", type=float, default=OPENAI_RPM_LIMIT, help="분당 요청 수 한도 (0 = 없음)")
+    parser.add_argument("--tpm", type=float, default=OPENAI_TPM_LIMIT, help="분당 토큰 수 한도 (0 = 없음)")
+    parser.add_argument("--pack", type=int, default=ANALYSIS_PACK_SIZE, help="짧은 기사를 몇 개씩 묶어서 분석할지 (1 = 묶지 않음)")
+    args = parser.parse_args(argv)
+
+    counts = run_worker(args.workers, args.batch_size, args.loop, args.rpm, args.tpm, pack_size=args.pack)
+
+    cache = get_analysis_cache()
+    if cache is not None:
+        stats = cache.stats()
+        print(f"[LOG] 분석 캐시: hit {stats['hits']}건, miss {stats['misses']}건 (hit rate {stats['hit_rate']})")
+
+    usage = USAGE_STATS.summary()
+    print(
+        f"[LOG] OpenAI 호출 {usage['calls']}번, prompt {usage['prompt_tokens']} / completion {usage['completion_tokens']} 토큰, "
+        f"지연 p50={usage['latency_sec_p50']} p95={usage['latency_sec_p95']}"
+    )
 
-    conn.close()
-    print("[LOG] 모든 작업 완료, DB 연결 종료")
+    close_pool()
+    print(
+        f"[LOG] 모든 작업 완료 (분석 {counts['ANALYZED']}건, TF-IDF 키워드 {counts['TFIDF_KEYWORDS']}건, "
+        f"실패 {counts['FAILED']}건), DB 연결 종료"
+    )
 
 
 if __name__ == "__main__":
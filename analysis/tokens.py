@@ -0,0 +1,181 @@
+import threading
+from collections import deque
+
+from analysis.rate_limit import estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:  # 없으면 estimate_tokens 로 대충 센다
+    tiktoken = None
+
+# 긴 기사 앞/뒤만 남길 때 가운데에 넣는 표시
+ELLIPSIS_MARK = "(중략)"
+
+_encodings = {}
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding(model: str):
+    if tiktoken is None:
+        return None
+    with _encoding_lock:
+        if model not in _encodings:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                # 인코딩 파일을 못 받는 환경(오프라인 등)
+                encoding = None
+            _encodings[model] = encoding
+        return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4.1-mini") -> int:
+    """
+    tiktoken 이 있으면 모델 토크나이저로, 없으면 estimate_tokens 로 센다.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _paragraphs(content: str) -> list[str]:
+    return [p.strip() for p in content.split("\n") if p.strip()]
+
+
+def _cut(text: str, budget: int, model: str, from_end: bool = False) -> str:
+    """
+    문단 하나가 통째로 예산을 넘을 때 글자 단위로 잘라냄 (이진 탐색)
+    """
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        piece = text[-mid:] if from_end else text[:mid]
+        if count_tokens(piece, model) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    if lo == 0:
+        return ""
+    return text[-lo:] if from_end else text[:lo]
+
+
+def truncate_lead_tail(content: str, budget: int, model: str = "gpt-4.1-mini", lead_ratio: float = 0.7) -> str:
+    """
+    본문이 budget 토큰을 넘으면 앞 문단(리드)을 lead_ratio 만큼, 나머지는 끝 문단으로 채우고
+    가운데는 (중략) 으로 줄인다. 예산 안이면 그대로 반환.
+    """
+    if not content or count_tokens(content, model) <= budget:
+        return content
+
+    paragraphs = _paragraphs(content)
+    sizes = [count_tokens(p, model) + 1 for p in paragraphs]   # +1: 줄바꿈
+    budget -= count_tokens(ELLIPSIS_MARK, model) + 2
+
+    lead, used = [], 0
+    lead_budget = int(budget * lead_ratio)
+    for p, size in zip(paragraphs, sizes):
+        if used + size > lead_budget:
+            if not lead:   # 첫 문단부터 너무 길면 잘라서라도 넣기
+                lead.append(_cut(p, lead_budget, model))
+                used += count_tokens(lead[0], model) + 1
+            break
+        lead.append(p)
+        used += size
+
+    tail = []
+    for p, size in zip(reversed(paragraphs[len(lead):]), reversed(sizes[len(lead):])):
+        if used + size > budget:
+            if not tail:
+                piece = _cut(p, budget - used - 1, model, from_end=True)
+                if piece:
+                    tail.append(piece)
+            break
+        tail.append(p)
+        used += size
+    tail.reverse()
+
+    return "\n".join(lead + [ELLIPSIS_MARK] + tail)
+
+
+def split_chunks(content: str, chunk_tokens: int, model: str = "gpt-4.1-mini") -> list[str]:
+    """
+    문단 경계를 지키면서 chunk_tokens 이하 조각으로 나눈다 (map-reduce 요약용).
+    """
+    chunks, current, used = [], [], 0
+    for p in _paragraphs(content):
+        size = count_tokens(p, model) + 1
+        if size > chunk_tokens:
+            # 문단 하나가 조각보다 크면 글자 단위로 나눈다
+            if current:
+                chunks.append("\n".join(current))
+                current, used = [], 0
+            while p:
+                piece = _cut(p, chunk_tokens, model) or p[:1]
+                chunks.append(piece)
+                p = p[len(piece):]
+            continue
+        if used + size > chunk_tokens and current:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(p)
+        used += size
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+# -------------------------------
+# 호출별 토큰 사용량 / 지연시간 통계
+# -------------------------------
+class UsageStats:
+    """
+    OpenAI 호출마다 prompt / completion 토큰 수와 걸린 시간을 모은다.
+    최근 window 건으로 분포(p50 / p95)를 계산하고, 합계는 전체 누적.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, kind: str, prompt_tokens: int, completion_tokens: int, latency: float):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self._recent.append((kind, prompt_tokens, completion_tokens, latency))
+
+    @staticmethod
+    def _percentile(values, q: float):
+        if not values:
+            return None
+        values = sorted(values)
+        return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+    def summary(self) -> dict:
+        with self._lock:
+            recent = list(self._recent)
+            result = {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+        by_kind = {}
+        for kind, _, _, _ in recent:
+            by_kind[kind] = by_kind.get(kind, 0) + 1
+
+        for name, idx in (("prompt_tokens", 1), ("completion_tokens", 2), ("latency_sec", 3)):
+            values = [r[idx] for r in recent]
+            for label, q in (("p50", 0.5), ("p95", 0.95)):
+                value = self._percentile(values, q)
+                result[f"{name}_{label}"] = round(value, 3) if value is not None else None
+        result["recent_calls_by_kind"] = by_kind
+        return result
@@ -0,0 +1,525 @@
+import argparse
+import heapq
+import math
+import os
+import select
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from psycopg2 import sql
+
+# analysis/ 폴더에서 직접 실행해도 app, analysis 패키지를 import 할 수 있도록
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis.calc_trend_score import (
+    LAMBDA,
+    RECENCY_WEIGHT,
+    RECENT_KEYWORD_DAYS,
+    TOPICAL_WEIGHT,
+    compute_trend_scores,
+    write_trend_scores,
+)
+from app.db.db import close_pool, db_conn, get_conn
+
+# -------------------------------
+# 증분 트렌드 설정 (env로 조정)
+# -------------------------------
+TREND_BUCKET_SECONDS = int(os.getenv("TREND_BUCKET_SECONDS", "3600"))        # 키워드 빈도 시간 버킷 크기
+TREND_REFRESH_SECONDS = float(os.getenv("TREND_REFRESH_SECONDS", "60"))      # refresh 주기 (--loop)
+TREND_FETCH_LIMIT = int(os.getenv("TREND_FETCH_LIMIT", "50000"))             # refresh 한 번에 읽을 새 결과 수
+TREND_WAIT_SECONDS = float(os.getenv("TREND_WAIT_SECONDS", "3600"))          # 아직 ANALYZED 가 아닌 결과를 다시 볼 기간
+TREND_RESCAN_SECONDS = float(os.getenv("TREND_RESCAN_SECONDS", "600"))      # high-water 아래에서 늦게 커밋된 결과를 다시 찾을 기간
+TREND_NOTIFY_CHANNEL = os.getenv("TREND_NOTIFY_CHANNEL", "analysis_saved")    # 분석 저장 알림(NOTIFY) 채널, 비우면 알림 없이 주기 refresh 만
+TREND_NOTIFY_MIN_SECONDS = float(os.getenv("TREND_NOTIFY_MIN_SECONDS", "5"))  # 알림으로 앞당기는 refresh 사이 최소 간격
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _to_ts(value) -> float | None:
+    """
+    datetime → UTC epoch 초. timezone 없는 값은 UTC 로 간주 (calc_trend_score 와 동일)
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _clean_keywords(keywords) -> frozenset:
+    return frozenset(k for k in ((str(k) if k is not None else "").strip() for k in keywords or []) if k)
+
+
+class _Result:
+    __slots__ = ("article_id", "ts", "category", "keywords", "in_window")
+
+    def __init__(self, article_id, ts, category, keywords):
+        self.article_id = article_id
+        self.ts = ts
+        self.category = category
+        self.keywords = keywords
+        self.in_window = False
+
+
+# -------------------------------
+# 증분 트렌드 엔진
+# -------------------------------
+class IncrementalTrendEngine:
+    """
+    calc_trend_score 와 같은 점수(0.7 * recency + 0.3 * topical)를 전체 재계산 없이 유지한다.
+
+    - 키워드 빈도: 최근 window_days 안에 발행된 결과를 시간 버킷(bucket_seconds)별로 묶어 두고,
+      기준 시각이 지나가면 오래된 버킷을 통째로 빼서 빈도를 줄인다 (경계 버킷만 한 건씩 확인).
+    - 역색인(키워드 → 결과)으로 빈도가 바뀐 키워드를 가진 결과만 topical 합계/개수를 고친다.
+      topical = (빈도 합) / (개수 × 최대 빈도) 라서 최대 빈도가 바뀌어도 다시 계산할 필요가 없다.
+    - recency 는 저장하지 않고 조회 시점에 published_at 과 HALF_LIFE_DAYS 로 계산한다.
+    """
+
+    def __init__(self, window_days: float = RECENT_KEYWORD_DAYS, bucket_seconds: int = TREND_BUCKET_SECONDS):
+        self.window_seconds = window_days * 86400
+        self.bucket_seconds = bucket_seconds
+
+        self.results = {}                       # result_id → _Result
+        self.postings = defaultdict(set)        # keyword → result_id 들
+        self.freq = Counter()                   # keyword → 창 안 결과 수
+        self._freq_hist = Counter()             # 빈도 값 → 그 빈도인 키워드 수 (최대 빈도 O(1) 유지용)
+        self.max_freq = 0
+        self._sum = {}                          # result_id → 키워드 빈도 합
+        self._cnt = {}                          # result_id → 빈도 > 0 인 키워드 수
+        self._dirty = {}                        # 빈도가 바뀐 키워드 → 바뀌기 전 빈도 (_flush 전까지)
+
+        self._buckets = {}                      # 버킷 번호 → [(ts, result_id)] (창 안 결과)
+        self._bucket_heap = []
+        self._bucket_sorted = set()             # 정렬돼 있는 버킷
+        self.cutoff_ts = float("-inf")
+
+        self.high_water = 0                     # DB 에서 읽은 최대 result_id
+        self._waiting = {}                      # 아직 ANALYZED 가 아닌 result_id → 처음 본 시각
+        self.version = 0                        # 내용이 바뀔 때마다 증가
+        self.lock = threading.RLock()
+
+    # ---------- 빈도 / topical 갱신 ----------
+    def _change(self, keyword: str, delta: int):
+        old = self.freq[keyword]
+        new = old + delta
+
+        if old:
+            self._freq_hist[old] -= 1
+        if new:
+            self._freq_hist[new] += 1
+            self.freq[keyword] = new
+        else:
+            del self.freq[keyword]
+
+        if new > self.max_freq:
+            self.max_freq = new
+        elif old == self.max_freq and self._freq_hist[old] == 0:
+            # 최대 빈도였던 키워드가 하나 줄면 최대 빈도는 old - 1 (그 키워드가 있으므로)
+            self.max_freq = old - 1 if old - 1 > 0 and self._freq_hist[old - 1] else self._recompute_max()
+
+        # 역색인 갱신은 _flush() 에서 키워드당 한 번만 (여러 건을 한꺼번에 반영할 때 같은 목록을 반복해서 돌지 않도록)
+        self._dirty.setdefault(keyword, old)
+
+    def _flush(self):
+        """
+        빈도가 바뀐 키워드를 가진 결과만 빈도 합/개수를 고친다.
+        """
+        for keyword, old in self._dirty.items():
+            new = self.freq.get(keyword, 0)
+            delta = new - old
+            if delta == 0:
+                continue
+            entered, left = old == 0 and new > 0, old > 0 and new == 0
+            for rid in self.postings[keyword]:
+                self._sum[rid] += delta
+                if entered:
+                    self._cnt[rid] += 1
+                elif left:
+                    self._cnt[rid] -= 1
+        self._dirty.clear()
+
+    def _recompute_max(self) -> int:
+        return max((f for f, n in self._freq_hist.items() if n > 0), default=0)
+
+    def _enter_window(self, rid: int, result: _Result):
+        result.in_window = True
+        bucket = int(result.ts // self.bucket_seconds)
+        entries = self._buckets.get(bucket)
+        if entries is None:
+            entries = self._buckets[bucket] = []
+            heapq.heappush(self._bucket_heap, bucket)
+        entries.append((result.ts, rid))
+        self._bucket_sorted.discard(bucket)
+        for kw in result.keywords:
+            self._change(kw, +1)
+
+    def _leave_window(self, rid: int):
+        result = self.results[rid]
+        result.in_window = False
+        for kw in result.keywords:
+            self._change(kw, -1)
+
+    # ---------- 결과 추가 / 기준 시각 이동 ----------
+    def add_result(self, result_id: int, article_id: int, published_at, category, keywords, flush: bool = True) -> bool:
+        """
+        분석 결과 1건 반영. 이미 있거나 published_at 이 없으면 무시(False).
+        여러 건을 한꺼번에 넣을 때는 flush=False 로 넣고 마지막에 한 번 _flush().
+        """
+        ts = _to_ts(published_at)
+        if ts is None:
+            return False
+        with self.lock:
+            if result_id in self.results:
+                return False
+            result = _Result(article_id, ts, category, _clean_keywords(keywords))
+            self.results[result_id] = result
+
+            # 아직 _flush 안 된 키워드는 바뀌기 전 빈도 기준 (flush 때 차이만큼 더해진다)
+            base = [self._dirty.get(kw, self.freq.get(kw, 0)) for kw in result.keywords]
+            self._sum[result_id] = sum(base)
+            self._cnt[result_id] = sum(1 for f in base if f > 0)
+            for kw in result.keywords:
+                self.postings[kw].add(result_id)
+
+            if ts >= self.cutoff_ts:
+                self._enter_window(result_id, result)
+            if flush:
+                self._flush()
+            self.high_water = max(self.high_water, result_id)
+            self.version += 1
+            return True
+
+    def advance(self, now: datetime | float | None = None) -> int:
+        """
+        기준 시각을 now 로 옮기고 창(최근 window_days) 밖으로 나간 결과를 빈도에서 뺀다.
+        뺀 결과 수 반환.
+        """
+        now_ts = _to_ts(now) if now is not None else time.time()
+        cutoff = now_ts - self.window_seconds
+        expired = 0
+        with self.lock:
+            if cutoff <= self.cutoff_ts:
+                return 0
+            self.cutoff_ts = cutoff
+
+            while self._bucket_heap:
+                bucket = self._bucket_heap[0]
+                entries = self._buckets[bucket]
+                if (bucket + 1) * self.bucket_seconds <= cutoff:
+                    # 버킷 전체가 창 밖
+                    heapq.heappop(self._bucket_heap)
+                    del self._buckets[bucket]
+                    self._bucket_sorted.discard(bucket)
+                    for _, rid in entries:
+                        self._leave_window(rid)
+                    expired += len(entries)
+                    continue
+
+                # 경계 버킷: 발행 시각 순으로 앞에서부터 확인
+                if bucket * self.bucket_seconds < cutoff:
+                    if bucket not in self._bucket_sorted:
+                        entries.sort()
+                        self._bucket_sorted.add(bucket)
+                    n = 0
+                    while n < len(entries) and entries[n][0] < cutoff:
+                        self._leave_window(entries[n][1])
+                        n += 1
+                    if n:
+                        del entries[:n]
+                        expired += n
+                break
+
+            self._flush()
+            if expired:
+                self.version += 1
+        return expired
+
+    # ---------- 점수 ----------
+    def topical(self, result_id: int) -> float:
+        cnt = self._cnt.get(result_id, 0)
+        if cnt <= 0 or self.max_freq <= 0:
+            return 0.0
+        return self._sum[result_id] / (cnt * self.max_freq)
+
+    def score(self, result_id: int, now: datetime | float | None = None) -> float | None:
+        now_ts = _to_ts(now) if now is not None else time.time()
+        with self.lock:
+            result = self.results.get(result_id)
+            if result is None:
+                return None
+            diff_days = max(0.0, (now_ts - result.ts) / 86400.0)
+            recency = max(0.0, min(1.0, math.exp(-LAMBDA * diff_days)))
+            return round(RECENCY_WEIGHT * recency + TOPICAL_WEIGHT * self.topical(result_id), 2)
+
+    def snapshot(self, now: datetime | float | None = None) -> pd.DataFrame:
+        """
+        전체 결과의 현재 점수 (result_id, article_id, category, published_ts, recency, topical, trend_score).
+        recency 는 여기서 한 번에 계산한다.
+        """
+        now_ts = _to_ts(now) if now is not None else time.time()
+        with self.lock:
+            rids = np.fromiter(self.results.keys(), dtype=np.int64, count=len(self.results))
+            results = list(self.results.values())
+            ts = np.fromiter((r.ts for r in results), dtype=np.float64, count=len(results))
+            topical = np.fromiter((self.topical(rid) for rid in rids.tolist()), dtype=np.float64, count=len(results))
+            df = pd.DataFrame({
+                "result_id": rids,
+                "article_id": np.fromiter((r.article_id for r in results), dtype=np.int64, count=len(results)),
+                "category": [r.category for r in results],
+                "published_ts": ts,
+            })
+
+        diff_days = np.maximum((now_ts - ts) / 86400.0, 0.0)
+        recency = np.clip(np.exp(-LAMBDA * diff_days), 0.0, 1.0)
+        df["recency"] = recency
+        df["topical"] = topical
+        df["trend_score"] = [round(x, 2) for x in (RECENCY_WEIGHT * recency + TOPICAL_WEIGHT * topical).tolist()]
+        return df
+
+    def keyword_counts(self) -> dict:
+        """
+        현재 창 안 키워드 빈도 (복사본)
+        """
+        with self.lock:
+            return dict(self.freq)
+
+    def keyword_counts_since(self, since: datetime | float) -> Counter:
+        """
+        since 이후 발행된 결과의 키워드 빈도. 창(window_days) 안 버킷만 보므로 since 가 창보다 오래되면 창까지만.
+        """
+        since_ts = _to_ts(since)
+        counts = Counter()
+        with self.lock:
+            for bucket, entries in self._buckets.items():
+                if (bucket + 1) * self.bucket_seconds <= since_ts:
+                    continue
+                whole = bucket * self.bucket_seconds >= since_ts
+                for ts, rid in entries:
+                    if whole or ts >= since_ts:
+                        counts.update(self.results[rid].keywords)
+        return counts
+
+    # ---------- DB 동기화 ----------
+    def _load_rows(self, where: str, params) -> list:
+        with db_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    SELECT ar.result_id, a.article_id, a.published_at, a.category, a.ingest_status,
+                           COALESCE(array_agg(k.keyword) FILTER (WHERE k.keyword IS NOT NULL), '{{}}')
+                    FROM analysis_result ar
+                    JOIN article a ON a.article_id = ar.article_id
+                    LEFT JOIN analysis_keywords k ON k.result_id = ar.result_id
+                    WHERE {where}
+                    GROUP BY ar.result_id, a.article_id
+                    ORDER BY ar.result_id
+                    LIMIT %s;
+                    """,
+                    params,
+                )
+                return cur.fetchall()
+
+    def _apply_rows(self, rows, now_ts: float) -> int:
+        added = 0
+        for result_id, article_id, published_at, category, status, keywords in rows:
+            if result_id in self.results:
+                continue
+            if status != "ANALYZED":
+                # 저장 직후 ingest_status 갱신 전일 수 있으니 잠시 뒤 다시 확인
+                self._waiting.setdefault(result_id, now_ts)
+                continue
+            self._waiting.pop(result_id, None)
+            if self.add_result(result_id, article_id, published_at, category, keywords, flush=False):
+                added += 1
+        self._flush()
+        return added
+
+    def refresh_from_db(self, now: datetime | float | None = None) -> int:
+        """
+        지난번 이후 새로 생긴 analysis_result(result_id 가 high-water 보다 큰 것)만 읽어서 반영하고
+        기준 시각을 now 로 옮긴다. 반영한 결과 수 반환.
+
+        result_id 는 INSERT 때 정해지지만 보이는 건 커밋 순서라서, 여러 worker 가 동시에 저장하면
+        high-water 보다 작은 id 가 나중에 커밋될 수 있다. 그래서 high-water 아래라도
+        최근 TREND_RESCAN_SECONDS 안에 만들어진 결과는 매번 다시 읽고, 이미 반영한 것은 건너뛴다.
+        """
+        now_ts = _to_ts(now) if now is not None else time.time()
+        added = 0
+        with self.lock:
+            # 기준 시각을 먼저 옮겨서 이미 창 밖인 새 결과는 빈도에 넣었다 빼는 일이 없도록
+            self.advance(now_ts)
+            if self._waiting:
+                waiting = list(self._waiting)
+                rows = self._load_rows("ar.result_id = ANY(%s::bigint[])", (waiting, len(waiting)))
+                added += self._apply_rows(rows, now_ts)
+                # 너무 오래 ANALYZED 가 안 되는 결과는 포기 (배치 재계산 때 반영)
+                for rid, seen in list(self._waiting.items()):
+                    if now_ts - seen > TREND_WAIT_SECONDS:
+                        del self._waiting[rid]
+
+            if self.high_water and TREND_RESCAN_SECONDS > 0:
+                rows = self._load_rows(
+                    "ar.result_id <= %s AND ar.created_at >= NOW() - make_interval(secs => %s)",
+                    (self.high_water, TREND_RESCAN_SECONDS, TREND_FETCH_LIMIT),
+                )
+                added += self._apply_rows(rows, now_ts)
+
+            while True:
+                rows = self._load_rows("ar.result_id > %s", (self.high_water, TREND_FETCH_LIMIT))
+                if not rows:
+                    break
+                self.high_water = max(self.high_water, rows[-1][0])
+                added += self._apply_rows(rows, now_ts)
+                if len(rows) < TREND_FETCH_LIMIT:
+                    break
+        return added
+
+
+# -------------------------------
+# 프로세스 안 엔진
+# -------------------------------
+def get_trend_engine() -> IncrementalTrendEngine:
+    """
+    프로세스에 하나. 처음 만들 때는 비어 있으므로 refresh_from_db() 로 채운다.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = IncrementalTrendEngine()
+    return _engine
+
+
+# -------------------------------
+# 분석 저장 알림 (save_analysis_to_db → NOTIFY, 엔진 쪽 → LISTEN)
+# -------------------------------
+def notify_saved_analysis(cur, result_id: int):
+    """
+    save_analysis_to_db 트랜잭션 안에서 호출. 커밋될 때 LISTEN 중인 프로세스(트렌드 인덱스, --loop)에 알림이 간다.
+    """
+    if TREND_NOTIFY_CHANNEL:
+        cur.execute("SELECT pg_notify(%s, %s);", (TREND_NOTIFY_CHANNEL, str(result_id)))
+
+
+class SavedAnalysisListener:
+    """
+    분석 저장 알림을 기다린다. 풀과 별개인 전용 커넥션 하나를 쓰고, 끊기면 다음 wait 에서 다시 붙는다.
+    알림을 못 받는 상황이면 기다리기만 하므로 주기 refresh 는 그대로 돈다.
+    """
+
+    def __init__(self, channel: str = TREND_NOTIFY_CHANNEL):
+        self.channel = channel
+        self.conn = None
+
+    def _connect(self):
+        conn = get_conn()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("LISTEN {};").format(sql.Identifier(self.channel)))
+        self.conn = conn
+
+    def wait(self, timeout: float) -> int:
+        """
+        timeout 초 동안 알림을 기다려서 받은 알림 수 반환 (0 이면 시간 초과)
+        """
+        if not self.channel:
+            time.sleep(timeout)
+            return 0
+        try:
+            if self.conn is None:
+                self._connect()
+            if select.select([self.conn], [], [], timeout) == ([], [], []):
+                return 0
+            self.conn.poll()
+            count = len(self.conn.notifies)
+            self.conn.notifies.clear()
+            return count
+        except Exception as e:
+            print(f"[ERROR] 분석 저장 알림 대기 실패: {e}")
+            self.close()
+            time.sleep(timeout)
+            return 0
+
+    def wait_next(self, started: float, interval: float, stop: threading.Event | None = None):
+        """
+        started(time.monotonic) 부터 interval 초가 지날 때까지 기다리되,
+        분석 저장 알림이 오면 TREND_NOTIFY_MIN_SECONDS 만 지나면 바로 돌아온다.
+        """
+        notified = False
+        while stop is None or not stop.is_set():
+            due = started + (min(interval, TREND_NOTIFY_MIN_SECONDS) if notified else interval)
+            remaining = due - time.monotonic()
+            if remaining <= 0:
+                return
+            notified = self.wait(min(1.0, remaining)) > 0 or notified
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="증분 트렌드 점수 갱신")
+    parser.add_argument("--loop", action="store_true", help=f"TREND_REFRESH_SECONDS({TREND_REFRESH_SECONDS}초)마다, 분석 저장 알림이 오면 더 빨리 계속 갱신")
+    parser.add_argument("--write", action="store_true", help="점수를 analysis_result.trend_score 에 반영 (바뀐 값만)")
+    parser.add_argument("--check", action="store_true", help="전체 재계산(calc_trend_score) 결과와 비교")
+    args = parser.parse_args(argv)
+
+    engine = get_trend_engine()
+    listener = SavedAnalysisListener() if args.loop else None
+    while True:
+        now = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        cycle_started = time.monotonic()
+        added = engine.refresh_from_db(now)
+        refreshed = time.perf_counter()
+        print(
+            f"[LOG] 트렌드 갱신: 새 결과 {added}건 (전체 {len(engine.results)}건, 키워드 {len(engine.freq)}개, "
+            f"최대 빈도 {engine.max_freq}), {refreshed - started:.3f}초"
+        )
+
+        if args.write or args.check:
+            snapshot = engine.snapshot(now)
+
+        if args.check:
+            articles = snapshot.rename(columns={"published_ts": "published_at"})[["article_id", "published_at", "result_id"]]
+            articles["published_at"] = pd.to_datetime(articles["published_at"], unit="s", utc=True)
+            keywords = pd.DataFrame(
+                [(rid, kw) for rid, r in engine.results.items() for kw in r.keywords],
+                columns=["result_id", "keyword"],
+            )
+            full = compute_trend_scores(articles, keywords, now)
+            merged = snapshot.merge(full, on="result_id", suffixes=("", "_full"))
+            diff = merged[merged["trend_score"] != merged["trend_score_full"]]
+            print(f"[LOG] 전체 재계산과 비교: {len(merged)}건 중 불일치 {len(diff)}건")
+
+        if args.write:
+            updated = write_trend_scores(snapshot)
+            print(f"[LOG] trend_score 반영: 값이 바뀐 결과 {updated}건")
+
+        if not args.loop:
+            break
+        listener.wait_next(cycle_started, TREND_REFRESH_SECONDS)
+
+    if listener is not None:
+        listener.close()
+    close_pool()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    main()
@@ -1,8 +1,18 @@
 # db.py
 import psycopg2
+from psycopg2 import extensions
+from psycopg2.extras import execute_values
+from psycopg2.pool import PoolError
 import os
+import threading
+import time
+from contextlib import contextmanager
 
 def get_conn():
+    """
+    새 psycopg2 커넥션 1개 생성 (env 파싱은 여기 한 곳에서만).
+    평소에는 직접 쓰지 말고 db_conn() 으로 풀에서 빌려 쓴다.
+    """
     return psycopg2.connect(
         host=os.getenv("DB_HOST", "localhost"),
         port=os.getenv("DB_PORT", "5432"),
@@ -11,6 +21,175 @@ def get_conn():
         password=os.getenv("DB_PASSWORD", "postgres"),  # default 제거 권장
     )
 
+
+# -------------------------------
+# 커넥션 풀 (FastAPI 앱 + analysis 배치 공용)
+# -------------------------------
+class ConnectionPool:
+    """
+    스레드 안전한 psycopg2 커넥션 풀.
+    - minconn: 처음 빌려갈 때 미리 만들어두는 커넥션 수
+    - maxconn: 동시에 빌려갈 수 있는 최대 커넥션 수 (초과 시 timeout 까지 대기)
+    - max_lifetime: 이 시간(초)보다 오래된 커넥션은 반납/대여 시 닫고 새로 만든다
+    대여 시 SELECT 1 로 살아있는지 확인한다.
+    """
+
+    def __init__(self, connect, minconn: int, maxconn: int, max_lifetime: float, timeout: float):
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._idle = []          # [(conn, created_at)], 끝에서 꺼내서 재사용 (LIFO)
+        self._created_at = {}    # id(conn) -> 생성 시각
+        self._closed = False
+
+        for _ in range(minconn):
+            self._idle.append(self._new_conn())
+
+    def _new_conn(self):
+        conn = self._connect()
+        created_at = time.monotonic()
+        self._created_at[id(conn)] = created_at
+        return conn, created_at
+
+    def _expired(self, created_at: float) -> bool:
+        return self.max_lifetime > 0 and time.monotonic() - created_at > self.max_lifetime
+
+    def _discard(self, conn):
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        if self._closed:
+            raise PoolError("connection pool is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"커넥션 풀 대기 시간 초과 ({self.timeout}s, max={self.maxconn})")
+
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    conn, _ = self._new_conn()
+                    return conn
+
+                conn, created_at = item
+                if not self._expired(created_at) and self._healthy(conn):
+                    return conn
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close: bool = False):
+        try:
+            created_at = self._created_at.get(id(conn))
+            if close or self._closed or conn.closed or created_at is None or self._expired(created_at):
+                self._discard(conn)
+                return
+
+            # 트랜잭션이 열린 채로 반납되면 정리하고 풀에 돌려놓는다
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    self._discard(conn)
+                    return
+
+            with self._lock:
+                self._idle.append((conn, created_at))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        with pool.connection() as conn: ...
+        블록이 정상 종료되면 commit, 예외면 rollback 후 풀에 반납.
+        """
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+
+    def closeall(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    처음 사용할 때 풀을 만든다 (import 시점에는 DB에 붙지 않음).
+    analysis 스크립트처럼 load_dotenv() 이후에 env를 읽어야 하는 경우도 있어서
+    설정값도 이 시점에 읽는다.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_conn,
+                    minconn=int(os.getenv("DB_POOL_MIN", "1")),
+                    maxconn=int(os.getenv("DB_POOL_MAX", "10")),
+                    max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+                )
+    return _pool
+
+
+@contextmanager
+def db_conn():
+    """
+    풀에서 커넥션을 빌려주는 컨텍스트 매니저.
+        with db_conn() as conn:
+            with conn.cursor() as cur: ...
+    정상 종료 시 commit, 예외 시 rollback 된다.
+    """
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
 ALLOWED_CATEGORIES = {"POLITICS", "ECONOMY", "SOCIETY", "CULTURE", "WORLD", "IT"}
 
 def normalize_category(cat: str | None) -> str:
@@ -37,45 +216,188 @@ def normalize_category(cat: str | None) -> str:
 
 # 백엔드 enum / DB check constraint와 동일하게 맞추기
 DEFAULT_INGEST_STATUS = "PENDING"   # 분석 대기중
+FAILED_INGEST_STATUS = "FAILED"
+
+
+INSERT_BATCH_SIZE = int(os.getenv("DB_INSERT_BATCH_SIZE", "500"))
+
+_UPSERT_SQL = """
+    INSERT INTO article
+        (title, author, category, content,
+         published_at, source, url,
+         ingest_status, image_url, created_at, updated_at)
+    VALUES %s
+    ON CONFLICT (url) DO UPDATE SET
+        title = EXCLUDED.title,
+        author = EXCLUDED.author,
+        content = EXCLUDED.content,
+        category = EXCLUDED.category,
+        published_at = COALESCE(EXCLUDED.published_at, article.published_at),
+        source = EXCLUDED.source,
+        ingest_status = EXCLUDED.ingest_status,
+        image_url = EXCLUDED.image_url,
+        updated_at = NOW()
+    RETURNING (xmax = 0) AS inserted;
+"""
+
+# 상세 크롤링 실패 기록: 이미 저장된 정상 기사는 덮어쓰지 않음
+_INSERT_FAILED_SQL = """
+    INSERT INTO article
+        (title, author, category, content,
+         published_at, source, url,
+         ingest_status, image_url, created_at, updated_at)
+    VALUES %s
+    ON CONFLICT (url) DO NOTHING;
+"""
+
+_UPSERT_TEMPLATE = """
+    (%(title)s, %(author)s, %(category)s, %(content)s,
+     %(published_at)s, %(source)s, %(url)s,
+     %(ingest_status)s, %(image_url)s, NOW(), NOW())
+"""
+
+
+def _prepare_article(article: dict) -> dict:
+    data = article.copy()
+    data["category"] = normalize_category(data.get("category"))
+    data["author"] = data.get("author") or "UNKNOWN"
+    data["content"] = data.get("content") or ""
+    data["source"] = data.get("source") or ""
+    data["image_url"] = data.get("image_url") or ""
+    data["published_at"] = data.get("published_at")
+
+    # 여기서 무조건 PENDING으로 세팅 (외부 값은 무시)
+    # 단, 상세 크롤링 자체가 실패한 기사(error 있음)는 FAILED 로 기록
+    data["ingest_status"] = FAILED_INGEST_STATUS if data.get("error") else DEFAULT_INGEST_STATUS
+    data["title"] = data.get("title") or ""
+    return data
 
 
 def insert_article(article: dict):
 
-    conn = get_conn()
-    cur = conn.cursor()
-
-    try:
-        data = article.copy()
-        data["category"] = normalize_category(data.get("category"))
-        data["author"] = data.get("author") or "UNKNOWN"
-        data["content"] = data.get("content") or ""
-        data["source"] = data.get("source") or ""
-        data["image_url"] = data.get("image_url") or ""
-
-        # 여기서 무조건 PENDING으로 세팅 (외부 값은 무시)
-        data["ingest_status"] = DEFAULT_INGEST_STATUS
-
-        sql = """
-            INSERT INTO article
-                (title, author, category, content,
-                 published_at, source, url,
-                 ingest_status, image_url, created_at, updated_at)
-            VALUES
-                (%(title)s, %(author)s, %(category)s, %(content)s,
-                 %(published_at)s, %(source)s, %(url)s,
-                 %(ingest_status)s, %(image_url)s, NOW(), NOW())
-            ON CONFLICT (url) DO UPDATE SET
-                title = EXCLUDED.title,
-                content = EXCLUDED.content,
-                category = EXCLUDED.category,
-                ingest_status = EXCLUDED.ingest_status,
-                image_url = EXCLUDED.image_url,
-                updated_at = NOW();
-        """
+    data = _prepare_article(article)
+
+    sql = """
+        INSERT INTO article
+            (title, author, category, content,
+             published_at, source, url,
+             ingest_status, image_url, created_at, updated_at)
+        VALUES
+            (%(title)s, %(author)s, %(category)s, %(content)s,
+             %(published_at)s, %(source)s, %(url)s,
+             %(ingest_status)s, %(image_url)s, NOW(), NOW())
+        ON CONFLICT (url) DO UPDATE SET
+            title = EXCLUDED.title,
+            content = EXCLUDED.content,
+            category = EXCLUDED.category,
+            ingest_status = EXCLUDED.ingest_status,
+            image_url = EXCLUDED.image_url,
+            updated_at = NOW();
+    """
+
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, data)
+
+
+def insert_articles(articles, batch_size: int | None = None) -> dict:
+    """
+    기사 여러 개를 커넥션 1개 + 트랜잭션 1개로 upsert.
+    batch_size 개씩 multi-row VALUES(execute_values)로 묶어서 보낸다.
+
+    상세 크롤링에 실패한 기사(error 있음)는 ingest_status FAILED 로 넣되,
+    같은 url 이 이미 있으면 건드리지 않는다.
+
+    반환: {"inserted": 새로 들어간 행 수, "updated": 기존 url 이라 갱신된 행 수,
+           "failed": FAILED 로 새로 기록된 행 수}
+    """
+    batch_size = batch_size or INSERT_BATCH_SIZE
+
+    # 같은 url 이 한 문장에 두 번 들어가면 ON CONFLICT 가 에러를 내므로 마지막 값만 남김
+    rows = {}
+    for article in articles:
+        data = _prepare_article(article)
+        if not data.get("url"):
+            continue
+        rows[data["url"]] = data
+    failed_rows = [r for r in rows.values() if r["ingest_status"] == FAILED_INGEST_STATUS]
+    rows = [r for r in rows.values() if r["ingest_status"] != FAILED_INGEST_STATUS]
+
+    inserted = 0
+    updated = 0
+    failed = 0
+    if not rows and not failed_rows:
+        return {"inserted": inserted, "updated": updated, "failed": failed}
+
+    # 전체 배치를 커넥션 1개 / 트랜잭션 1개로 (db_conn 이 끝에서 commit)
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            for i in range(0, len(rows), batch_size):
+                batch = rows[i : i + batch_size]
+                results = execute_values(
+                    cur, _UPSERT_SQL, batch,
+                    template=_UPSERT_TEMPLATE,
+                    page_size=len(batch),
+                    fetch=True,
+                )
+                # xmax = 0 이면 새로 INSERT 된 행, 아니면 UPDATE 된 행
+                for (is_inserted,) in results:
+                    if is_inserted:
+                        inserted += 1
+                    else:
+                        updated += 1
+
+            for i in range(0, len(failed_rows), batch_size):
+                batch = failed_rows[i : i + batch_size]
+                execute_values(
+                    cur, _INSERT_FAILED_SQL, batch,
+                    template=_UPSERT_TEMPLATE,
+                    page_size=len(batch),
+                )
+                failed += cur.rowcount
+
+    return {"inserted": inserted, "updated": updated, "failed": failed}
+
+
+# -------------------------------
+# 증분 크롤링용 조회
+# -------------------------------
+def fetch_known_urls() -> dict:
+    """
+    이미 저장된 기사 url → 마지막 저장 후 지난 시간(초).
+    크롤링 시작할 때 한 번에 읽어서 상세 페이지 재요청 여부를 판단하는 데 쓴다.
+    (상세 크롤링 실패로 본문 없이 FAILED 기록만 남은 url 은 다음 실행에서 다시 받도록 제외)
+    (시간 계산은 DB 시계 기준이라 타임존 차이에 영향 없음)
+    """
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT url, EXTRACT(EPOCH FROM (NOW() - updated_at))
+                FROM article
+                WHERE NOT (ingest_status = 'FAILED' AND content = '');
+                """
+            )
+            return {url: (float(age) if age is not None else None) for url, age in cur}
+
 
-        cur.execute(sql, data)
-        conn.commit()
+def fetch_latest_published_at(categories) -> dict:
+    """
+    카테고리별 가장 최근 published_at (지난 크롤링의 high-water mark).
+    """
+    categories = list(categories)
+    if not categories:
+        return {}
 
-    finally:
-        cur.close()
-        conn.close()
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT category, MAX(published_at)
+                FROM article
+                WHERE category = ANY(%s)
+                GROUP BY category;
+                """,
+                (categories,),
+            )
+            return dict(cur.fetchall())
@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------------------
+# 백그라운드 작업 큐 설정 (env로 조정)
+# -------------------------------
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))                 # 동시에 실행할 작업 수
+JOB_PER_KEY_LIMIT = int(os.getenv("JOB_PER_KEY_LIMIT", "1"))     # 같은 key(섹션)로 동시에 실행할 작업 수
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "200"))               # 끝난 작업을 몇 개까지 기억할지
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+CANCELLED = "CANCELLED"
+FINISHED_STATUSES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class JobCancelled(Exception):
+    """
+    작업 함수가 job.check_cancelled() 에서 취소 요청을 확인했을 때.
+    """
+
+
+class Job:
+    """
+    작업 하나의 상태. 작업 함수는 job.progress 를 갱신하고,
+    중간중간 job.check_cancelled() 를 불러서 취소 요청에 응한다.
+    """
+
+    def __init__(self, kind: str, key: str, params: dict):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.params = params
+        self.status = QUEUED
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def update(self, **counters):
+        with self._lock:
+            self.progress.update(counters)
+
+    def add(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                self.progress[name] = self.progress.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            progress = dict(self.progress)
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "params": self.params,
+            "status": self.status,
+            "cancel_requested": self.cancel_requested,
+            "progress": progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# -------------------------------
+# 프로세스 안 작업 큐 + worker 풀
+# -------------------------------
+class JobManager:
+    """
+    submit() 은 바로 job 을 돌려주고, 작업은 worker 스레드에서 실행된다.
+    같은 key(예: 섹션) 작업은 per_key_limit 개까지만 동시에 실행되고 나머지는 QUEUED 로 기다린다.
+    기다리는 작업은 key 별 대기열에만 있고 worker 를 차지하지 않으므로 다른 key 작업을 막지 않는다.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, per_key_limit: int = JOB_PER_KEY_LIMIT, history: int = JOB_HISTORY):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.per_key_limit = per_key_limit
+        self.history = history
+        self._jobs = {}                # id → Job (생성 순서 유지)
+        self._running = {}             # key → 실행(또는 executor 에 넘긴) 작업 수
+        self._pending = {}             # key → 자리 나길 기다리는 (job, fn) deque
+        self._lock = threading.Lock()
+
+    def _forget_old(self):
+        # 끝난 작업이 history 개를 넘으면 오래된 것부터 버림
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATUSES]
+        for job_id in finished[: max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def submit(self, kind: str, key: str, params: dict, fn) -> Job:
+        """
+        fn(job, **params) 를 백그라운드에서 실행. 반환값은 job.result 에 들어간다.
+        """
+        job = Job(kind, key, params)
+        with self._lock:
+            self._forget_old()
+            self._jobs[job.id] = job
+            if self._running.get(key, 0) < self.per_key_limit:
+                self._running[key] = self._running.get(key, 0) + 1
+            else:
+                self._pending.setdefault(key, deque()).append((job, fn))
+                return job
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def _release(self, key: str):
+        # 끝난 작업 자리를 같은 key 의 다음 대기 작업에 넘긴다 (없으면 자리 반납)
+        with self._lock:
+            pending = self._pending.get(key)
+            while pending:
+                job, fn = pending.popleft()
+                if job.status not in FINISHED_STATUSES:
+                    break
+            else:
+                self._pending.pop(key, None)
+                self._running[key] -= 1
+                if not self._running[key]:
+                    del self._running[key]
+                return
+            if not pending:
+                del self._pending[key]
+        try:
+            self._pool.submit(self._run, job, fn)
+        except RuntimeError:
+            # shutdown 뒤에는 새 작업을 받지 않는다
+            self._finish(job, CANCELLED)
+
+    def _run(self, job: Job, fn):
+        try:
+            if job.cancel_requested:
+                self._finish(job, CANCELLED)
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+            print(f"[LOG] job {job.id} ({job.kind} {job.key}) 시작")
+            try:
+                result = fn(job, **job.params)
+            except JobCancelled:
+                self._finish(job, CANCELLED)
+            except Exception as e:
+                print(f"[ERROR] job {job.id} 실패: {e}")
+                self._finish(job, FAILED, error=str(e))
+            else:
+                self._finish(job, SUCCEEDED, result=result)
+        finally:
+            self._release(job.key)
+
+    @staticmethod
+    def _finish(job: Job, status: str, result=None, error=None):
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job.status = status
+        print(f"[LOG] job {job.id} ({job.kind} {job.key}) {status}")
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, limit: int = 50) -> list:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict() for job in reversed(jobs[-limit:])]
+
+    def cancel(self, job_id: str) -> Job | None:
+        """
+        취소 요청. 대기 중이면 실행되지 않고, 실행 중이면 다음 check_cancelled() 에서 멈춘다.
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+        job._cancel.set()
+        # 아직 대기열에 있으면 자리를 기다리지 않고 바로 CANCELLED
+        queued = False
+        with self._lock:
+            pending = self._pending.get(job.key, ())
+            for entry in pending:
+                if entry[0] is job:
+                    pending.remove(entry)
+                    queued = True
+                    break
+            if job.key in self._pending and not pending:
+                del self._pending[job.key]
+        if queued:
+            self._finish(job, CANCELLED)
+        return job
+
+    def wait(self, job_id: str, timeout: float | None = None) -> Job | None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        job = self.get(job_id)
+        while job is not None and job.status not in FINISHED_STATUSES:
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            time.sleep(0.1)
+        return job
+
+    def shutdown(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if job.status not in FINISHED_STATUSES:
+                self.cancel(job.id)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+    return _manager
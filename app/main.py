@@ -1,11 +1,30 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import os
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 
-from crawler.crawler import crawl_section_page, crawl_article_detail
-from app.db.db import insert_article  # db.py의 insert_article 사용
+from app.pipeline import ALL_SECTIONS, run_crawl_pipeline
+from app.jobs import SUCCEEDED, Job, get_job_manager
+from app.db.db import ALLOWED_CATEGORIES
+from app.trends import ALL, TREND_INDEX_ENABLED, TREND_INDEX_MAX_K, TREND_KEYWORD_WINDOWS, get_trend_index
+
+from analysis.analysis_cache import get_analysis_cache
+from analysis.analysis_openai import (
+    COALESCE_STATS,
+    USAGE_STATS,
+    analyze_article_coalesced,
+    close_async_client,
+)
 
-from analysis.analysis_openai import analyze_article_with_openai
+# /analyze 동시 처리 상한: 넘으면 줄 세우지 않고 바로 429 (호출 쪽에서 재시도)
+ANALYZE_MAX_IN_FLIGHT = int(os.getenv("ANALYZE_MAX_IN_FLIGHT", "64"))
+ANALYZE_DISCONNECT_POLL = float(os.getenv("ANALYZE_DISCONNECT_POLL", "0.5"))   # 클라이언트 연결 끊김 확인 간격(초)
+ANALYZE_BATCH_MAX_ITEMS = int(os.getenv("ANALYZE_BATCH_MAX_ITEMS", "100"))       # /analyze/batch 한 번에 받는 기사 수
+ANALYZE_BATCH_CONCURRENCY = int(os.getenv("ANALYZE_BATCH_CONCURRENCY", "16"))    # 배치 하나 안에서 동시에 분석할 기사 수
 
 class ArticleAnalysisRequest(BaseModel):
     title: str
@@ -18,15 +37,80 @@ class ArticleAnalysisResponse(BaseModel):
     keywords: list[str]
     category: str
 
+
+class ArticleAnalysisBatchItem(BaseModel):
+    # 요청 순서 그대로, 기사별 성공(result) 또는 실패(error)
+    index: int
+    result: Optional[ArticleAnalysisResponse] = None
+    error: Optional[str] = None
+
 app = FastAPI()
 
+_analyze_in_flight = 0   # 이벤트 루프 스레드에서만 바뀜
+
+
+@app.on_event("startup")
+async def startup():
+    if TREND_INDEX_ENABLED:
+        get_trend_index().start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_async_client()
+    get_job_manager().shutdown()
+    get_trend_index().stop()
+
+
+async def _run_until_disconnect(request: Request, coro):
+    """
+    coro 를 실행하다가 클라이언트가 연결을 끊으면 취소한다 (남은 OpenAI 요청도 같이 끊김).
+    끊겼으면 None 반환.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=ANALYZE_DISCONNECT_POLL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                print("[LOG] /analyze 클라이언트 연결 끊김 → 분석 취소")
+                return None
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 @app.post("/analyze", response_model=ArticleAnalysisResponse)
-async def analyze_article(req: ArticleAnalysisRequest):
+async def analyze_article(req: ArticleAnalysisRequest, request: Request):
     """
     프론트나 스프링부트에서 호출할 /analyze 엔드포인트
+    OpenAI 호출은 async 라서 기다리는 동안 다른 요청을 계속 처리한다.
+    동시에 ANALYZE_MAX_IN_FLIGHT 건 넘게 들어오면 429.
     """
-    result = analyze_article_with_openai(req.title, req.content)
+    global _analyze_in_flight
+    if _analyze_in_flight >= ANALYZE_MAX_IN_FLIGHT:
+        raise HTTPException(
+            status_code=429,
+            detail=f"분석 요청이 너무 많습니다 (동시 {ANALYZE_MAX_IN_FLIGHT}건 처리 중)",
+            headers={"Retry-After": "1"},
+        )
+
+    _analyze_in_flight += 1
+    try:
+        # 같은 기사를 이미 분석 중이면 그 결과를 같이 기다림
+        result = await _run_until_disconnect(request, analyze_article_coalesced(req.title, req.content))
+    finally:
+        _analyze_in_flight -= 1
+
+    if result is None:
+        # 클라이언트가 이미 떠나서 응답은 전달되지 않음 (nginx 관례 499)
+        return Response(status_code=499)
 
+    return _to_analysis_response(result)
+
+
+def _to_analysis_response(result: dict) -> ArticleAnalysisResponse:
     # OpenAI 결과 dict → 응답 모델에 맞게 변환
     return ArticleAnalysisResponse(
         summary=result.get("summary", ""),
@@ -35,83 +119,284 @@ async def analyze_article(req: ArticleAnalysisRequest):
         category=result.get("category", "Society"),
     )
 
-class ArticlePayload(BaseModel):
-    # DB에 넣을 때 사용할 기사 정보 모델
-    title: str
-    author: Optional[str]
-    category: str
-    content: Optional[str]
-    published_at: Optional[str]
-    source: Optional[str]
-    url: str
-    origin_link: Optional[str]
-    thumbnail: Optional[str]      # 목록에서 가져오는 썸네일
-    image_url: Optional[str]      # 본문 이미지 (첫 장)
-    ingest_status: str
 
+@app.post("/analyze/batch", response_model=List[ArticleAnalysisBatchItem])
+async def analyze_articles_batch(reqs: List[ArticleAnalysisRequest], request: Request):
+    """
+    기사 여러 개를 한 요청으로 받아 동시에 분석하고, 요청 순서대로 결과를 돌려준다.
+    - 배치 안/다른 요청과 겹치는 같은 기사는 OpenAI 를 한 번만 호출 (single-flight)
+    - 기사 하나가 실패해도 나머지는 그대로 반환 (해당 항목에 error)
+    - 배치 하나는 최대 ANALYZE_BATCH_CONCURRENCY 건씩 동시에 돌고, 그만큼 in-flight 한도를 차지한다
+    """
+    global _analyze_in_flight
+    if len(reqs) > ANALYZE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"한 번에 최대 {ANALYZE_BATCH_MAX_ITEMS}건까지 분석할 수 있습니다")
+    if not reqs:
+        return []
+
+    slots = min(len(reqs), ANALYZE_BATCH_CONCURRENCY)
+    if _analyze_in_flight + slots > ANALYZE_MAX_IN_FLIGHT:
+        raise HTTPException(
+            status_code=429,
+            detail=f"분석 요청이 너무 많습니다 (동시 {ANALYZE_MAX_IN_FLIGHT}건 처리 중)",
+            headers={"Retry-After": "1"},
+        )
+
+    semaphore = asyncio.Semaphore(slots)
+
+    async def analyze_one(index: int, req: ArticleAnalysisRequest) -> ArticleAnalysisBatchItem:
+        async with semaphore:
+            try:
+                result = await analyze_article_coalesced(req.title, req.content)
+            except Exception as e:
+                print(f"[ERROR] /analyze/batch {index}번 분석 실패: {e}")
+                return ArticleAnalysisBatchItem(index=index, error=str(e))
+        return ArticleAnalysisBatchItem(index=index, result=_to_analysis_response(result))
+
+    async def analyze_all():
+        return await asyncio.gather(*(analyze_one(i, req) for i, req in enumerate(reqs)))
+
+    _analyze_in_flight += slots
+    try:
+        items = await _run_until_disconnect(request, analyze_all())
+    finally:
+        _analyze_in_flight -= slots
+
+    if items is None:
+        return Response(status_code=499)
+    return items
+
+@app.get("/analyze/cache/stats")
+def analysis_cache_stats():
+    """
+    분석 결과 캐시 hit / miss 카운터 (이 프로세스 기준)
+    """
+    cache = get_analysis_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
 
-@app.get("/crawl/send")
+
+@app.get("/analyze/usage/stats")
+def analysis_usage_stats():
+    """
+    OpenAI 호출별 prompt / completion 토큰과 지연시간 분포 (이 프로세스 기준)
+    """
+    return {**USAGE_STATS.summary(), "analyze_in_flight": _analyze_in_flight, "coalesce": COALESCE_STATS}
+
+
+# 상세 크롤링 → DB 저장 단위 (이 단위마다 저장 후 취소 요청 확인)
+CRAWL_JOB_CHUNK_SIZE = int(os.getenv("CRAWL_JOB_CHUNK_SIZE", "32"))
+# 결과에 적을 상세 크롤링 실패 기사 수 (크롤링 규모가 커져도 결과 크기는 일정하게)
+CRAWL_JOB_MAX_FAILED = int(os.getenv("CRAWL_JOB_MAX_FAILED", "100"))
+
+
+def crawl_and_save_job(
+        job: Job,
+        section: str,
+        clicks: int,
+        use_selenium: Optional[bool],
+        incremental: bool,
+) -> dict:
+    """
+    섹션 목록 → 상세 크롤링 → db.insert_articles() 저장을 run_crawl_pipeline 으로 흘려보낸다.
+    단계 사이 큐가 꽉 차면 앞 단계가 기다리고, 기사는 CRAWL_JOB_CHUNK_SIZE 건씩 저장한 뒤 버리므로
+    clicks 가 커져도 메모리 사용량은 일정하다.
+    이벤트마다 job.progress 를 갱신하고, 한 묶음 저장이 끝날 때마다 취소 요청을 확인한다.
+    """
+    job.update(listed=0, skipped=0, crawled=0, failed=0, duplicates=0, inserted=0, updated=0)
+
+    failed = []
+    list_error = None
+    events = run_crawl_pipeline(
+        [section],
+        clicks=clicks,
+        use_selenium=use_selenium,
+        batch_size=CRAWL_JOB_CHUNK_SIZE,
+        incremental=incremental,
+    )
+    try:
+        for event in events:
+            kind = event["event"]
+            if kind == "article":
+                job.add(crawled=1, duplicates=int("duplicate_of" in event))
+                if event.get("error"):
+                    # 상세 크롤링 실패 기사 (FAILED 로 기록, 배치는 계속 진행)
+                    job.add(failed=1)
+                    if len(failed) < CRAWL_JOB_MAX_FAILED:
+                        failed.append({"url": event["url"], "error": event["error"]})
+            elif kind == "saved":
+                job.add(inserted=event["inserted"], updated=event["updated"])
+                # 저장까지 끝난 묶음 다음에서 멈춘다
+                job.check_cancelled()
+            elif kind in ("section_done", "section_error"):
+                job.update(listed=event["listed"], skipped=event.get("skipped", 0))
+                list_error = event.get("error")
+    finally:
+        # 취소 / 에러로 빠져나와도 파이프라인 스레드를 멈춘다
+        events.close()
+
+    progress = job.to_dict()["progress"]
+    if list_error:
+        # 목록 크롤링 실패 (그 전까지 받은 기사는 저장됨)
+        raise RuntimeError(f"목록 크롤링 실패 (저장 {progress['inserted'] + progress['updated']}건): {list_error}")
+
+    return {
+        "crawled": progress["crawled"],
+        "saved": progress["inserted"] + progress["updated"],
+        "inserted": progress["inserted"],
+        "updated": progress["updated"],
+        "skipped": progress["skipped"],
+        "duplicates": progress["duplicates"],
+        "failed_count": progress["failed"],
+        # 상세 크롤링 실패 기사 (앞에서부터 CRAWL_JOB_MAX_FAILED 건까지)
+        "failed": failed,
+    }
+
+
+@app.get("/crawl/send", status_code=202)
 def crawl_and_save(
         section: str = "101",
         clicks: int = 3,
+        use_selenium: Optional[bool] = None,    # None 이면 CRAWLER_USE_SELENIUM env 따름
+        incremental: bool = True,               # 이미 저장된 url 건너뛰기 + 지난 실행 지점에서 멈추기
+        wait: bool = False,                     # True 면 예전처럼 끝날 때까지 기다렸다가 결과 반환
 ):
     """
-    1) 네이버 섹션 페이지 크롤링
-    2) 각 기사 상세 크롤링
-    3) db.insert_article() 사용해서 PostgreSQL article 테이블에 저장
+    섹션 크롤링 → 저장 작업을 백그라운드 큐에 넣고 job_id 를 바로 반환한다.
+    진행 상황 / 결과는 GET /jobs/{job_id}, 취소는 POST /jobs/{job_id}/cancel.
+    같은 섹션 작업은 JOB_PER_KEY_LIMIT 개까지만 동시에 실행된다.
     """
+    if section not in ALL_SECTIONS:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 section: {section}")
 
-    try:
-        # 1) 섹션 페이지에서 기사 목록 크롤링
-        section_articles = crawl_section_page(section, clicks)
-
-        saved_count = 0
-        payloads: List[ArticlePayload] = []
-
-        for a in section_articles:
-            link = a.get("link")
-            if not link:
-                continue
-
-            # 2) 상세 페이지 크롤링 (crawler.py에서 dict 반환)
-            detail = crawl_article_detail(link, section)
-
-            payload = ArticlePayload(
-                title=detail.get("title"),
-                author=detail.get("author"),
-                category=detail.get("category"),
-                content=detail.get("content"),
-                published_at=detail.get("published_at"),
-                source=detail.get("source"),
-                url=detail.get("url"),
-                origin_link=detail.get("origin_link"),
-                thumbnail=a.get("thumbnail"),              # 목록 썸네일
-                image_url=detail.get("image_url"),
-                ingest_status=detail.get("ingest_status", "INGESTED"),
-            )
-            payloads.append(payload)
-
-            # 3) DB에 저장할 dict로 변환해서 insert_article 호출
-            article_dict = {
-                "title": payload.title,
-                "author": payload.author or "UNKNOWN",
-                "category": payload.category,                # POLITICS / ECONOMY / ...
-                "content": payload.content or "",
-                "published_at": payload.published_at,        # "YYYY-MM-DD HH:MM:SS" 형태
-                "source": payload.source or "",
-                "url": payload.url,
-                "image_url": payload.image_url or "",
-                "ingest_status": payload.ingest_status or "INGESTED",
-            }
-
-            insert_article(article_dict)
-            saved_count += 1
+    job = get_job_manager().submit(
+        "crawl",
+        key=section,
+        params={"section": section, "clicks": clicks, "use_selenium": use_selenium, "incremental": incremental},
+        fn=crawl_and_save_job,
+    )
+    if not wait:
+        return {"job_id": job.id, "status": job.status}
+
+    job = get_job_manager().wait(job.id)
+    if job.status != SUCCEEDED:
+        # 어디서 에러 났는지 확인하기 쉽게 500과 함께 메시지 반환
+        raise HTTPException(status_code=500, detail=f"crawl_and_save 실패: {job.error or job.status}")
+    return JSONResponse(job.result)
+
+
+@app.get("/jobs")
+def list_jobs(limit: int = 50):
+    return get_job_manager().list(limit)
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"job 없음: {job_id}")
+    return job.to_dict()
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"job 없음: {job_id}")
+    return job.to_dict()
+
+
+@app.get("/crawl/sections")
+def crawl_sections_stream(
+        sections: Optional[str] = None,         # "100,101,105" 형태, 없으면 전체 섹션
+        clicks: int = 3,
+        use_selenium: Optional[bool] = None,
+        incremental: bool = True,
+):
+    """
+    여러 섹션을 병렬로 크롤링하면서 목록 → 상세 → DB 저장을 파이프라인으로 돌리고,
+    기사별 진행 상황을 NDJSON(한 줄에 JSON 하나)으로 스트리밍한다.
+    """
+    if sections:
+        section_list = [s.strip() for s in sections.split(",") if s.strip()]
+    else:
+        section_list = ALL_SECTIONS
+
+    unknown = [s for s in section_list if s not in ALL_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 section: {unknown}")
 
+    def ndjson():
+        for event in run_crawl_pipeline(section_list, clicks=clicks, use_selenium=use_selenium, incremental=incremental):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+# -------------------------------
+# 트렌드 조회 (인메모리 스냅샷, 요청마다 DB 조회 없음)
+# -------------------------------
+def _trend_response(request: Request, key: tuple, build) -> Response:
+    """
+    현재 스냅샷에서 응답을 만들고 If-None-Match 가 같으면 304 로 본문 없이 응답.
+    스냅샷 생성 시각은 본문이 아니라 헤더로 보내서, 내용이 그대로면 ETag 도 그대로 유지된다.
+    인덱스가 아직 안 떠 있으면(TREND_INDEX_ENABLED=0) 첫 요청 때 띄우고 준비될 때까지 503.
+    """
+    index = get_trend_index()
+    index.start()
+    snapshot = index.snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="트렌드 인덱스 준비 중", headers={"Retry-After": "5"})
+
+    body, etag = snapshot.render(key, lambda: build(snapshot))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "X-Trends-Generated-At": snapshot.generated_at.isoformat(),
+    }
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _check_k(k: int):
+    if not 1 <= k <= TREND_INDEX_MAX_K:
+        raise HTTPException(status_code=400, detail=f"k 는 1~{TREND_INDEX_MAX_K} 사이여야 합니다")
+
+
+@app.get("/trends/articles")
+def trending_articles(request: Request, k: int = 20, category: Optional[str] = None):
+    """
+    trend_score 상위 k개 기사 (category 를 주면 그 카테고리 안에서)
+    """
+    _check_k(k)
+    category = category.strip().upper() if category else ALL
+    if category != ALL and category not in ALLOWED_CATEGORIES:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 category: {category}")
+
+    def build(snapshot):
         return {
-            "crawled": len(payloads),
-            "saved": saved_count,
+            "category": None if category == ALL else category,
+            "items": snapshot.articles[category][:k],
         }
 
-    except Exception as e:
-        # 어디서 에러 났는지 확인하기 쉽게 500과 함께 메시지 반환
-        raise HTTPException(status_code=500, detail=f"crawl_and_save 실패: {e}")
+    return _trend_response(request, ("articles", category, k), build)
+
+
+@app.get("/trends/keywords")
+def trending_keywords(request: Request, k: int = 20, hours: int = 24):
+    """
+    최근 hours 시간 안에 발행된 분석 결과에서 많이 나온 키워드 상위 k개
+    """
+    _check_k(k)
+    if hours not in TREND_KEYWORD_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"hours 는 {TREND_KEYWORD_WINDOWS} 중 하나여야 합니다")
+
+    def build(snapshot):
+        return {
+            "hours": hours,
+            "items": snapshot.keywords[hours][:k],
+        }
+
+    return _trend_response(request, ("keywords", hours, k), build)
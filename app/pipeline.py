@@ -0,0 +1,347 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from crawler.crawler import (
+    CRAWLER_USE_SELENIUM,
+    SECTION_CATEGORIES,
+    crawl_article_detail_safe,
+    iter_section_page,
+    parse_relative_time,
+    section_to_category,
+)
+from crawler.http_client import CRAWLER_MAX_WORKERS
+from app.db.db import fetch_known_urls, fetch_latest_published_at, insert_articles
+from analysis.dedup import get_dedup_index
+
+# -------------------------------
+# 파이프라인 설정 (env로 조정)
+# -------------------------------
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "200"))       # 단계 사이 큐 크기 (꽉 차면 앞 단계가 대기)
+PIPELINE_DB_BATCH_SIZE = int(os.getenv("PIPELINE_DB_BATCH_SIZE", "50"))   # 이만큼 모이면 DB에 한 번에 저장
+
+# 증분 크롤링 설정
+CRAWL_REFETCH_AGE_HOURS = float(os.getenv("CRAWL_REFETCH_AGE_HOURS", "24"))          # 저장된 지 이보다 오래된 url 만 다시 받음
+CRAWL_HIGH_WATER_SLACK_MINUTES = int(os.getenv("CRAWL_HIGH_WATER_SLACK_MINUTES", "60"))  # "N시간전" 표기 오차 여유
+CRAWL_HIGH_WATER_STREAK = int(os.getenv("CRAWL_HIGH_WATER_STREAK", "5"))            # 연속 N개가 기준보다 오래되면 페이지 넘기기 중단
+
+KST = ZoneInfo("Asia/Seoul")
+
+ALL_SECTIONS = list(SECTION_CATEGORIES.keys())
+
+_DONE = object()   # 상세 worker 종료 신호
+
+
+def to_article_dict(item: dict, detail: dict) -> dict:
+    """
+    목록 item + 상세 detail → insert_articles 에 넘길 dict
+    """
+    return {
+        "title": detail.get("title") or item.get("title"),
+        "author": detail.get("author") or "UNKNOWN",
+        "category": detail.get("category"),              # POLITICS / ECONOMY / ...
+        "content": detail.get("content") or "",
+        "published_at": detail.get("published_at"),      # "YYYY-MM-DD HH:MM:SS" 형태
+        "source": detail.get("source") or "",
+        "url": detail.get("url"),
+        "image_url": detail.get("image_url") or "",
+        "ingest_status": detail.get("ingest_status") or "INGESTED",
+        "error": detail.get("error"),      # 상세 크롤링 실패 사유 (있으면 FAILED 로 저장)
+    }
+
+
+# -------------------------------
+# 증분 크롤링: 이미 저장된 url 건너뛰기 + 지난 실행 지점에서 멈추기
+# -------------------------------
+def _to_kst_naive(value: datetime | None) -> datetime | None:
+    # published_at 컬럼이 timestamptz 면 aware 로 온다 → KST 로 바꿔서 naive 로 맞춤
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(KST).replace(tzinfo=None)
+
+
+class CrawlIndex:
+    """
+    - known_urls: 저장된 url → 저장 후 지난 초 (fetch_known_urls)
+    - high_water: category → 지난 크롤링에서 가장 최근 published_at (KST, naive)
+    목록 item 을 걸러서 상세 페이지를 받아야 하는 것만 통과시킨다.
+    """
+
+    def __init__(self, known_urls: dict, high_water: dict, refetch_age_hours: float = None):
+        self.known_urls = known_urls
+        self.high_water = {category: _to_kst_naive(ts) for category, ts in high_water.items()}
+        refetch_age_hours = CRAWL_REFETCH_AGE_HOURS if refetch_age_hours is None else refetch_age_hours
+        self.refetch_age_seconds = refetch_age_hours * 3600
+
+    @classmethod
+    def load(cls, sections):
+        categories = {section_to_category(sec) for sec in sections}
+        return cls(fetch_known_urls(), fetch_latest_published_at(categories))
+
+    def should_fetch(self, url: str) -> bool:
+        if url not in self.known_urls:
+            return True
+        age = self.known_urls[url]
+        return age is None or age > self.refetch_age_seconds
+
+    def is_past_high_water(self, section: str, item: dict, now: datetime) -> bool:
+        """
+        목록의 "N분전/N시간전" 으로 추정한 발행 시각이 지난 high-water mark 보다 오래됐는지.
+        """
+        high_water = self.high_water.get(section_to_category(section))
+        minutes = parse_relative_time(item.get("time"))
+        if high_water is None or minutes is None:
+            return False
+        published = now - timedelta(minutes=minutes)
+        return published < high_water - timedelta(minutes=CRAWL_HIGH_WATER_SLACK_MINUTES)
+
+    def filter_items(self, section: str, items, stats: dict | None = None):
+        """
+        items(목록 제너레이터)를 돌면서 상세 크롤링이 필요한 item 만 yield.
+        high-water 보다 오래된 item 이 연속 CRAWL_HIGH_WATER_STREAK 개 나오면 중단
+        (제너레이터를 닫으므로 다음 목록 페이지도 요청하지 않음, Selenium 이면 드라이버도 반납).
+        """
+        stats = stats if stats is not None else {}
+        stats.setdefault("skipped", 0)
+        stats.setdefault("stopped_at_high_water", False)
+
+        now = datetime.now(KST).replace(tzinfo=None)
+        old_streak = 0
+
+        try:
+            for item in items:
+                link = item.get("link")
+                if not link:
+                    continue
+
+                if self.is_past_high_water(section, item, now):
+                    old_streak += 1
+                    if old_streak >= CRAWL_HIGH_WATER_STREAK:
+                        stats["stopped_at_high_water"] = True
+                        break
+                else:
+                    old_streak = 0
+
+                if not self.should_fetch(link):
+                    stats["skipped"] += 1
+                    continue
+                yield item
+        finally:
+            # 중간에 멈추거나 이쪽이 닫혀도 목록 제너레이터를 닫는다
+            close = getattr(items, "close", None)
+            if close:
+                close()
+
+
+def _put(q: queue.Queue, value, stop: threading.Event) -> bool:
+    """
+    큐가 꽉 차 있으면 기다리되(backpressure), 소비자가 그만뒀으면 포기.
+    """
+    while not stop.is_set():
+        try:
+            q.put(value, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+# -------------------------------
+# 목록 → 상세 → DB 파이프라인
+# -------------------------------
+def run_crawl_pipeline(
+        sections,
+        clicks: int = 3,
+        use_selenium=None,
+        detail_workers: int | None = None,
+        batch_size: int | None = None,
+        incremental: bool = True,
+):
+    """
+    여러 섹션을 동시에 크롤링하면서 진행 상황 이벤트(dict)를 하나씩 yield 하는 제너레이터.
+
+    - 목록 스레드(섹션당 1개)가 기사 링크를 link_q 에 넣으면
+    - 상세 worker 들이 바로 가져가서 상세 페이지를 크롤링하고 result_q 에 넣고
+    - 이 제너레이터(호출한 쪽 스레드)가 결과를 batch_size 개씩 모아 DB에 저장한다.
+    목록이 다 끝나기 전에 상세 크롤링/DB 저장이 시작되고,
+    큐가 꽉 차면 앞 단계가 기다리므로 메모리가 무한정 늘지 않는다.
+
+    incremental=True 면 CrawlIndex 로 이미 저장된 url 은 건너뛰고,
+    지난 실행의 마지막 기사 시점에 도달하면 해당 섹션 목록 페이지 넘기기를 멈춘다.
+
+    이벤트 종류: article / saved / section_done / section_error / done
+    (상세 크롤링 실패는 article 이벤트에 ingest_status FAILED + error 로 표시되고 FAILED 로 저장된다)
+
+    본문은 유사 중복 인덱스(analysis.dedup)에 넣고, 이미 본 기사와 거의 같으면
+    article 이벤트에 duplicate_of(묶음 대표 url)를 붙인다. 인덱스는 끝날 때 파일로 저장.
+    """
+    sections = list(sections)
+    if use_selenium is None:
+        use_selenium = CRAWLER_USE_SELENIUM
+    detail_workers = detail_workers or CRAWLER_MAX_WORKERS
+    batch_size = batch_size or PIPELINE_DB_BATCH_SIZE
+
+    index = CrawlIndex.load(sections) if incremental else None
+    dedup = get_dedup_index()
+
+    link_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    result_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def list_worker(section):
+        listed = 0
+        stats = {}
+        items = None
+        try:
+            items = iter_section_page(section, clicks, use_selenium)
+            if index is not None:
+                items = index.filter_items(section, items, stats)
+
+            for item in items:
+                if not item.get("link"):
+                    continue
+                if not _put(link_q, (section, item), stop):
+                    return
+                listed += 1
+            _put(result_q, {"event": "section_done", "section": section, "listed": listed, **stats}, stop)
+        except Exception as e:
+            _put(result_q, {"event": "section_error", "section": section, "listed": listed, "error": str(e), **stats}, stop)
+        finally:
+            # 중간에 그만둬도 목록 제너레이터를 바로 닫아서 Selenium 드라이버 등을 반납
+            close = getattr(items, "close", None) if items is not None else None
+            if close:
+                close()
+
+    def detail_worker():
+        while True:
+            try:
+                task = link_q.get(timeout=0.5)
+            except queue.Empty:
+                if stop.is_set():
+                    return
+                continue
+
+            if task is _DONE:
+                _put(result_q, _DONE, stop)
+                return
+
+            section, item = task
+            detail = crawl_article_detail_safe(item["link"], section, title=item.get("title"))
+            event = {"event": "article", "section": section, "item": item, "detail": detail}
+            if not _put(result_q, event, stop):
+                return
+
+    list_threads = [
+        threading.Thread(target=list_worker, args=(sec,), name=f"list-{sec}", daemon=True)
+        for sec in sections
+    ]
+    detail_threads = [
+        threading.Thread(target=detail_worker, name=f"detail-{i}", daemon=True)
+        for i in range(detail_workers)
+    ]
+
+    def closer():
+        # 목록이 전부 끝나면 상세 worker 수만큼 종료 신호
+        for t in list_threads:
+            t.join()
+        for _ in detail_threads:
+            if not _put(link_q, _DONE, stop):
+                return
+
+    for t in list_threads + detail_threads:
+        t.start()
+    threading.Thread(target=closer, name="list-closer", daemon=True).start()
+
+    totals = {"listed": 0, "skipped": 0, "crawled": 0, "failed": 0, "duplicates": 0, "inserted": 0, "updated": 0}
+    batch = []
+
+    def flush():
+        counts = insert_articles(batch)
+        totals["inserted"] += counts["inserted"]
+        totals["updated"] += counts["updated"]
+        event = {"event": "saved", "batch": len(batch), **counts}
+        batch.clear()
+        return event
+
+    try:
+        finished_workers = 0
+        while finished_workers < len(detail_threads):
+            event = result_q.get()
+            if event is _DONE:
+                finished_workers += 1
+                continue
+
+            kind = event["event"]
+            if kind == "article":
+                item, detail = event["item"], event["detail"]
+                totals["crawled"] += 1
+                if detail.get("error"):
+                    totals["failed"] += 1
+                batch.append(to_article_dict(item, detail))
+
+                progress = {
+                    "event": "article",
+                    "section": event["section"],
+                    "url": detail.get("url"),
+                    "title": detail.get("title") or item.get("title"),
+                    "ingest_status": detail.get("ingest_status"),
+                }
+                if detail.get("error"):
+                    progress["error"] = detail["error"]
+                elif dedup is not None and detail.get("url"):
+                    rep = dedup.add(detail["url"], detail.get("content") or "")
+                    if rep != detail["url"]:
+                        totals["duplicates"] += 1
+                        progress["duplicate_of"] = rep
+                yield progress
+                if len(batch) >= batch_size:
+                    yield flush()
+            else:
+                if kind in ("section_done", "section_error"):
+                    totals["listed"] += event["listed"]
+                    totals["skipped"] += event.get("skipped", 0)
+                yield event
+
+        if batch:
+            yield flush()
+
+        yield {"event": "done", "sections": sections, **totals}
+
+    finally:
+        # 소비자가 중간에 멈춰도(클라이언트 연결 끊김 등) 스레드가 큐에서 영원히 막히지 않게
+        stop.set()
+        if dedup is not None and dedup.dirty:
+            dedup.save()
+
+
+# -------------------------------
+# CLI: python -m app.pipeline --sections 100,101 --clicks 3
+# -------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="네이버 뉴스 여러 섹션 파이프라인 크롤링 (NDJSON 출력)")
+    parser.add_argument("--sections", default=",".join(ALL_SECTIONS), help="콤마로 구분한 섹션 코드 (기본: 전체)")
+    parser.add_argument("--clicks", type=int, default=3, help="섹션당 '더보기' 페이지 수")
+    parser.add_argument("--selenium", action="store_true", help="목록을 Selenium 으로 크롤링")
+    parser.add_argument("--workers", type=int, default=None, help="상세 페이지 동시 요청 수")
+    parser.add_argument("--full", action="store_true", help="증분 크롤링 끄기 (저장된 url 도 전부 다시 받음)")
+    args = parser.parse_args(argv)
+
+    sections = [s.strip() for s in args.sections.split(",") if s.strip()]
+    for event in run_crawl_pipeline(
+            sections,
+            clicks=args.clicks,
+            use_selenium=args.selenium or None,
+            detail_workers=args.workers,
+            incremental=not args.full,
+    ):
+        sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
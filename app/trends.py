@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.db.db import ALLOWED_CATEGORIES, db_conn
+from analysis.trend_incremental import SavedAnalysisListener, get_trend_engine
+
+# -------------------------------
+# 트렌드 조회용 인메모리 인덱스 설정 (env로 조정)
+# -------------------------------
+TREND_INDEX_ENABLED = os.getenv("TREND_INDEX_ENABLED", "0") == "1"                     # 1 이면 서버 시작 때 인덱스를 띄움 (아니면 첫 /trends 요청 때)
+TREND_INDEX_REFRESH_SECONDS = float(os.getenv("TREND_INDEX_REFRESH_SECONDS", "60"))   # 스냅샷 다시 만드는 주기
+TREND_INDEX_MAX_K = int(os.getenv("TREND_INDEX_MAX_K", "100"))                        # 카테고리별로 미리 정렬해 둘 개수
+TREND_KEYWORD_WINDOWS = [
+    int(h) for h in os.getenv("TREND_KEYWORD_WINDOWS", "1,6,24,72").split(",") if h.strip()
+]                                                                                      # 키워드 집계 창(시간)
+
+ALL = "ALL"
+
+
+class TrendSnapshot:
+    """
+    refresh 한 번에 만든 읽기 전용 결과. 요청은 여기서 잘라서 보내기만 한다.
+    - articles: 카테고리(ALL 포함) → trend_score 내림차순 상위 TREND_INDEX_MAX_K 기사
+    - keywords: 창(시간) → 빈도 내림차순 상위 TREND_INDEX_MAX_K 키워드
+    """
+
+    def __init__(self, generated_at: datetime, articles: dict, keywords: dict):
+        self.generated_at = generated_at
+        self.articles = articles
+        self.keywords = keywords
+        self._bodies = {}      # (종류, 인자...) → (body bytes, etag)
+        self._lock = threading.Lock()
+
+    def render(self, key: tuple, build) -> tuple:
+        """
+        같은 스냅샷 / 같은 인자면 JSON 직렬화와 ETag 계산은 한 번만.
+        ETag 는 내용 해시라서 스냅샷이 새로 만들어져도 내용이 같으면 그대로 유지된다.
+        """
+        with self._lock:
+            cached = self._bodies.get(key)
+        if cached is not None:
+            return cached
+        body = json.dumps(build(), ensure_ascii=False).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        with self._lock:
+            self._bodies[key] = (body, etag)
+        return body, etag
+
+
+def _top_indices(scores: np.ndarray, published: np.ndarray, k: int) -> np.ndarray:
+    # trend_score 내림차순, 같으면 최신 기사 먼저
+    if len(scores) > k:
+        # 경계 값과 같은 점수까지 후보로 남겨야 동점 정렬이 정확하다
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((-published[candidates], -scores[candidates]))
+    return candidates[order[:k]]
+
+
+def _fetch_article_meta(article_ids: list) -> dict:
+    if not article_ids:
+        return {}
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT article_id, title, url, source, image_url, published_at
+                FROM article
+                WHERE article_id = ANY(%s::bigint[]);
+                """,
+                (article_ids,),
+            )
+            rows = cur.fetchall()
+    return {
+        row[0]: {
+            "title": row[1],
+            "url": row[2],
+            "source": row[3],
+            "image_url": row[4],
+            "published_at": row[5].isoformat() if row[5] else None,
+        }
+        for row in rows
+    }
+
+
+def build_snapshot(now: datetime | None = None) -> TrendSnapshot:
+    """
+    증분 트렌드 엔진을 DB 와 맞춘 뒤 카테고리별 상위 기사 / 창별 상위 키워드를 미리 정렬해 둔다.
+    """
+    now = now or datetime.now(timezone.utc)
+    engine = get_trend_engine()
+    engine.refresh_from_db(now)
+    df = engine.snapshot(now)
+
+    scores = df["trend_score"].to_numpy(dtype=np.float64)
+    published = df["published_ts"].to_numpy(dtype=np.float64)
+    categories = df["category"].to_numpy(dtype=object)
+
+    picked = {ALL: _top_indices(scores, published, TREND_INDEX_MAX_K)}
+    for category in ALLOWED_CATEGORIES:
+        rows = np.flatnonzero(categories == category)
+        picked[category] = rows[_top_indices(scores[rows], published[rows], TREND_INDEX_MAX_K)]
+
+    all_rows = np.unique(np.concatenate(list(picked.values()))) if picked else np.array([], dtype=np.int64)
+    meta = _fetch_article_meta(df["article_id"].to_numpy()[all_rows].tolist())
+
+    articles = {}
+    for category, rows in picked.items():
+        items = []
+        for row in rows.tolist():
+            article_id = int(df["article_id"].iat[row])
+            items.append({
+                "article_id": article_id,
+                "result_id": int(df["result_id"].iat[row]),
+                "category": categories[row],
+                "trend_score": float(scores[row]),
+                **meta.get(article_id, {}),
+            })
+        articles[category] = items
+
+    now_ts = now.timestamp()
+    keywords = {}
+    for hours in TREND_KEYWORD_WINDOWS:
+        counts = engine.keyword_counts_since(now_ts - hours * 3600)
+        keywords[hours] = [{"keyword": kw, "count": n} for kw, n in counts.most_common(TREND_INDEX_MAX_K)]
+
+    return TrendSnapshot(now, articles, keywords)
+
+
+# -------------------------------
+# 백그라운드에서 주기적으로 스냅샷 교체
+# -------------------------------
+class TrendIndex:
+    """
+    TREND_INDEX_REFRESH_SECONDS 마다 스냅샷을 새로 만들어 통째로 바꿔 끼운다.
+    분석 runner 가 결과를 저장하면(NOTIFY) 주기를 기다리지 않고 더 빨리 다시 만든다.
+    요청은 현재 스냅샷만 읽으므로 Postgres 를 건드리지 않는다.
+    """
+
+    def __init__(self, refresh_seconds: float = TREND_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.snapshot = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._listener = SavedAnalysisListener()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        started = time.perf_counter()
+        snapshot = build_snapshot()
+        self.snapshot = snapshot
+        self.last_error = None
+        print(
+            f"[LOG] 트렌드 인덱스 갱신 완료 (기사 {len(snapshot.articles[ALL])}건, "
+            f"{time.perf_counter() - started:.2f}초)"
+        )
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.refresh()
+            except Exception as e:
+                # DB 가 잠깐 안 될 때는 이전 스냅샷을 계속 쓰고 다음 주기에 다시 시도
+                self.last_error = str(e)
+                print(f"[ERROR] 트렌드 인덱스 갱신 실패: {e}")
+            self._listener.wait_next(started, self.refresh_seconds, self._stop)
+        self._listener.close()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="trend-index", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_trend_index() -> TrendIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TrendIndex()
+    return _index
@@ -1,14 +1,41 @@
+import atexit
+import json
 import os
 import platform
+import threading
 import time
-import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+
+from crawler.driver_pool import DriverPool
+from crawler.extract import get_extractor
+from crawler.http_client import CRAWLER_MAX_WORKERS, fetch_html
+
+# 네이버 뉴스 주소 (로컬 stub 서버로 바꿔서 fixture 재생할 때 env로 덮어쓰기)
+NAVER_NEWS_BASE_URL = os.getenv("NAVER_NEWS_BASE_URL", "https://news.naver.com").rstrip("/")
+
+# "더보기" 버튼이 호출하는 목록 XHR
+SECTION_LIST_PATH = "/section/template/SECTION_ARTICLE_LIST"
+
+# 1 이면 HTTP 목록 대신 Selenium 으로 "더보기" 클릭 (fallback)
+CRAWLER_USE_SELENIUM = os.getenv("CRAWLER_USE_SELENIUM", "0") == "1"
+
+# Selenium 드라이버 풀 설정
+SELENIUM_POOL_SIZE = int(os.getenv("SELENIUM_POOL_SIZE", "3"))              # 동시에 띄울 Chrome 수
+SELENIUM_DRIVER_MAX_PAGES = int(os.getenv("SELENIUM_DRIVER_MAX_PAGES", "200"))  # 페이지 로드(접속 + "더보기" 클릭)가 이만큼 쌓이면 새 Chrome 으로 교체
+SELENIUM_ACQUIRE_TIMEOUT = float(os.getenv("SELENIUM_ACQUIRE_TIMEOUT", "120"))
 
 # -------------------------------
 # ChromeDriver Path Resolver
@@ -47,6 +74,28 @@ def get_driver():
     return webdriver.Chrome(service=service, options=options)
 
 
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+
+def get_driver_pool() -> DriverPool:
+    """
+    Selenium 경로에서 쓰는 공유 드라이버 풀 (처음 쓸 때 생성, 프로세스 종료 시 정리).
+    """
+    global _driver_pool
+    if _driver_pool is None:
+        with _driver_pool_lock:
+            if _driver_pool is None:
+                _driver_pool = DriverPool(
+                    get_driver,
+                    size=SELENIUM_POOL_SIZE,
+                    max_pages=SELENIUM_DRIVER_MAX_PAGES,
+                    acquire_timeout=SELENIUM_ACQUIRE_TIMEOUT,
+                )
+                atexit.register(_driver_pool.close)
+    return _driver_pool
+
+
 # -------------------------------
 # "3시간 전", "25분 전" 파싱
 # -------------------------------
@@ -65,124 +114,189 @@ def parse_relative_time(t):
 # -------------------------------
 # section 코드 → category 문자열 매핑
 # -------------------------------
+SECTION_CATEGORIES = {
+    "100": "POLITICS",
+    "101": "ECONOMY",
+    "102": "SOCIETY",
+    "103": "CULTURE",
+    "104": "WORLD",
+    "105": "IT",
+}
+
+
 def section_to_category(section: str) -> str:
-    mapping = {
-        "100": "POLITICS",
-        "101": "ECONOMY",
-        "102": "SOCIETY",
-        "103": "CULTURE",
-        "104": "WORLD",
-        "105": "IT",
-    }
-    return mapping.get(section, "SOCIETY")  # 기본값 아무거나 하나 지정
+    return SECTION_CATEGORIES.get(section, "SOCIETY")  # 기본값 아무거나 하나 지정
+
+
+def _list_html_from_response(body: str) -> str:
+    """
+    목록 XHR 응답은 {"renderedComponent": {"SECTION_ARTICLE_LIST": "<html>"}} 형태의 JSON.
+    혹시 HTML 조각이 그대로 오면 그대로 사용.
+    """
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+
+    rendered = data.get("renderedComponent") if isinstance(data, dict) else None
+    if not isinstance(rendered, dict):
+        return ""
+    return "".join(v for v in rendered.values() if isinstance(v, str))
 
 
 # -------------------------------
-# 섹션 페이지 크롤링 (목록만)
+# 섹션 페이지 크롤링 (목록만, HTTP)
 # -------------------------------
-def crawl_section_page(section, clicks=10):
-    driver = get_driver()
-    url = f"https://news.naver.com/section/{section}"
-    driver.get(url)
-
-    # "더보기" 여러 번 클릭
-    for _ in range(clicks):
-        try:
-            more_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable(
-                    (By.CSS_SELECTOR, ".section_more_inner._CONTENT_LIST_LOAD_MORE_BUTTON")
-                )
-            )
-            ActionChains(driver).move_to_element(more_button).click().perform()
-            time.sleep(1.5)
-        except Exception:
+def iter_section_articles(section, clicks=10):
+    """
+    브라우저 없이 "더보기" 버튼이 부르는 XHR 을 직접 호출해서
+    첫 페이지 + clicks 페이지 분량의 기사 목록을 파싱되는 대로 하나씩 yield.
+    """
+    # 목록은 계속 바뀌므로 캐시를 쓰더라도 항상 조건부 요청 (max_age=0)
+    html = fetch_html(f"{NAVER_NEWS_BASE_URL}/section/{section}", max_age=0)
+    extractor = get_extractor()
+
+    seen = set()
+    page_no = 1
+
+    while True:
+        articles, cursor = extractor.extract_section(html)
+        for article in articles:
+            link = article["link"]
+            if link and link in seen:
+                continue
+            if link:
+                seen.add(link)
+            yield article
+
+        if page_no > clicks or not cursor:
             break
 
-    html = driver.page_source
-    driver.quit()
+        page_no += 1
+        url = (
+            f"{NAVER_NEWS_BASE_URL}{SECTION_LIST_PATH}"
+            f"?sid={section}&sid2=&cluid=&pageNo={page_no}&date=&next={cursor}"
+        )
+        html = _list_html_from_response(fetch_html(url, max_age=0))
 
-    soup = BeautifulSoup(html, "html.parser")
 
-    articles = []
+def iter_section_page(section, clicks=10, use_selenium=None):
+    """
+    목록 item 이터레이터. 기본은 HTTP(iter_section_articles), use_selenium 이면 Selenium fallback.
+    """
+    if use_selenium is None:
+        use_selenium = CRAWLER_USE_SELENIUM
+    if use_selenium:
+        return iter_section_articles_selenium(section, clicks)
+    return iter_section_articles(section, clicks)
 
-    for item in soup.select(".sa_item_inner"):
-        title_el = item.select_one(".sa_text_title._NLOG_IMPRESSION")
-        time_el = item.select_one(".sa_text_datetime b")
-        img_el = item.find("img")
 
-        link = title_el.get("href") if title_el else None
-        title = title_el.get_text(strip=True) if title_el else None
-        img = img_el.get("src") if img_el else None
-        time_text = time_el.get_text(strip=True) if time_el else None
+def crawl_section_page(section, clicks=10, use_selenium=None):
+    return list(iter_section_page(section, clicks, use_selenium))
 
-        articles.append(
-            {
-                "title": title,
-                "link": link,
-                "thumbnail": img,
-                "time": time_text,
-            }
-        )
 
-    return articles
+# -------------------------------
+# 섹션 페이지 크롤링 (Selenium fallback)
+# -------------------------------
+# 이미 읽은 개수 다음부터의 목록 item HTML 만 가져오기 (page_source 전체를 매번 받지 않도록)
+_NEW_ITEMS_SCRIPT = """
+return Array.from(document.querySelectorAll('.sa_item_inner'))
+    .slice(arguments[0])
+    .map(function (el) { return el.outerHTML; });
+"""
+
+
+def iter_section_articles_selenium(section, clicks=10):
+    """
+    첫 화면 목록을 yield 한 뒤 "더보기" 를 누를 때마다 새로 붙은 item 만 파싱해서 yield.
+    소비하는 쪽이 멈추면(큐가 꽉 참) 다음 클릭도 기다린다. 드라이버는 끝까지 빌려둔 채로 쓰고
+    제너레이터가 끝나거나 닫히면 풀에 반납된다.
+    """
+    url = f"{NAVER_NEWS_BASE_URL}/section/{section}"
+    extractor = get_extractor()
+    seen = set()
+
+    # 풀에서 warm 드라이버를 빌려 쓰고 반납 (반납 시 상태 초기화 / 필요하면 교체)
+    pool = get_driver_pool()
+    with pool.driver() as driver:
+        driver.get(url)
+        pool.count_page(driver)
+        read = 0
+
+        for click in range(clicks + 1):
+            fragments = driver.execute_script(_NEW_ITEMS_SCRIPT, read) or []
+            read += len(fragments)
+            if fragments:
+                articles, _ = extractor.extract_section("".join(fragments))
+                for article in articles:
+                    link = article["link"]
+                    if link and link in seen:
+                        continue
+                    if link:
+                        seen.add(link)
+                    yield article
+
+            if click == clicks:
+                break
+
+            # "더보기" 클릭
+            try:
+                more_button = WebDriverWait(driver, 10).until(
+                    EC.element_to_be_clickable(
+                        (By.CSS_SELECTOR, ".section_more_inner._CONTENT_LIST_LOAD_MORE_BUTTON")
+                    )
+                )
+                ActionChains(driver).move_to_element(more_button).click().perform()
+                time.sleep(1.5)
+            except (
+                TimeoutException,
+                NoSuchElementException,
+                ElementNotInteractableException,
+                ElementClickInterceptedException,
+                StaleElementReferenceException,
+            ):
+                # 버튼이 없거나 못 누르는 상태 = 목록 끝. 그 외 WebDriverException(Chrome 죽음 등)은
+                # 그대로 올려서 풀이 드라이버를 버리게 한다
+                break
+            pool.count_page(driver)
+
+
+def crawl_section_page_selenium(section, clicks=10):
+    return list(iter_section_articles_selenium(section, clicks))
 
 
 # -------------------------------
-# 상세 페이지 크롤링 → Article 엔티티 형태로 반환
+# 여러 섹션 목록 병렬 크롤링
 # -------------------------------
-def crawl_article_detail(url: str, section: str):
-    headers = {"User-Agent": "Mozilla/5.0"}
-    resp = requests.get(url, headers=headers)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-
-    # 제목
-    title_tag = soup.find("h2", class_="media_end_head_headline")
-    title = title_tag.get_text(strip=True) if title_tag else None
-
-    # 본문
-    body_tag = soup.find("article", id="dic_area")
-    content = body_tag.get_text("\n", strip=True) if body_tag else None
-
-    # 발행일시
-    date_tag = soup.find(
-        "span",
-        class_="media_end_head_info_datestamp_time _ARTICLE_DATE_TIME"
-    )
-    published_at = date_tag.get("data-date-time") if date_tag else None
-    # 예: "2025-11-18 18:19:45"
-
-    # 원본 링크(지금은 DB에 안 넣지만 참고용)
-    origin_link_tag = soup.find("a", class_="media_end_head_origin_link")
-    origin_link = origin_link_tag.get("href") if origin_link_tag else None
-
-    # 기자명
-    author = None
-    for sel in [".media_end_head_journalist_name", ".byline", ".reporter"]:
-        tag = soup.select_one(sel)
-        if tag and tag.get_text(strip=True):
-            author = tag.get_text(strip=True)
-            break
+def crawl_sections(sections, clicks=10, use_selenium=None):
+    """
+    섹션 목록을 병렬로 크롤링해서 {section: [기사 dict, ...]} 반환.
+    Selenium 경로면 드라이버 풀 크기만큼만 동시에 돈다.
+    """
+    sections = list(sections)
+    if not sections:
+        return {}
 
-    # 언론사명
-    source = None
-    media_logo = soup.select_one(".media_end_head_top_logo img")
-    if media_logo and media_logo.get("alt"):
-        source = media_logo.get("alt").strip()
+    if use_selenium is None:
+        use_selenium = CRAWLER_USE_SELENIUM
 
-    # 본문 이미지 중 첫 번째
-    image_url = None
+    workers = SELENIUM_POOL_SIZE if use_selenium else CRAWLER_MAX_WORKERS
+    with ThreadPoolExecutor(max_workers=min(workers, len(sections)), thread_name_prefix="section") as pool:
+        results = pool.map(lambda sec: crawl_section_page(sec, clicks, use_selenium=use_selenium), sections)
+        return dict(zip(sections, results))
 
-    # 1) 기사 본문 영역 안의 img 태그 우선 탐색
-    img_tag = soup.select_one("article#dic_area img")
-    if img_tag and img_tag.get("src"):
-        image_url = img_tag.get("src")
 
-    # 2) 그래도 없으면 og:image 메타 태그 fallback
-    if not image_url:
-        og_img = soup.find("meta", property="og:image")
-        if og_img and og_img.get("content"):
-            image_url = og_img.get("content")
+# -------------------------------
+# 상세 페이지 크롤링 → Article 엔티티 형태로 반환
+# -------------------------------
+def crawl_article_detail(url: str, section: str, timeout: float | None = None):
+    html = fetch_html(url, timeout=timeout)
+
+    # 제목 / 본문 / 발행일시 / 원본 링크 / 기자명 / 언론사명 / 대표 이미지
+    # (백엔드는 CRAWLER_PARSER: lxml 또는 bs4, 결과 dict 는 동일)
+    fields = get_extractor().extract_article(html)
+    content = fields["content"]
+    image_url = fields["image_url"]
 
     print("IMG:", image_url)
 
@@ -190,14 +304,62 @@ def crawl_article_detail(url: str, section: str):
     category = section_to_category(section)
 
     return {
-        "title": title,
-        "author": author,
+        "title": fields["title"],
+        "author": fields["author"],
         "category": category,
         "content": content,
-        "published_at": published_at,
-        "source": source,
+        "published_at": fields["published_at"],
+        "source": fields["source"],
         "url": url,
-        "origin_link": origin_link,
+        "origin_link": fields["origin_link"],
         "image_url": image_url,
         "ingest_status": "INGESTED" if content else "FAILED",
-    }
\ No newline at end of file
+    }
+
+
+def failed_article_detail(url: str, section: str, error, title: str | None = None):
+    """
+    재시도 후에도 상세 페이지를 못 받은 기사 → ingest_status FAILED + 실패 사유.
+    배치 전체를 멈추지 않고 이 dict 로 기록한다.
+    """
+    return {
+        "title": title,
+        "author": None,
+        "category": section_to_category(section),
+        "content": None,
+        "published_at": None,
+        "source": None,
+        "url": url,
+        "origin_link": None,
+        "image_url": None,
+        "ingest_status": "FAILED",
+        "error": f"{type(error).__name__}: {error}",
+    }
+
+
+def crawl_article_detail_safe(url: str, section: str, timeout: float | None = None, title: str | None = None):
+    try:
+        return crawl_article_detail(url, section, timeout=timeout)
+    except Exception as e:
+        print(f"[ERROR] 상세 크롤링 실패 url={url}: {e}")
+        return failed_article_detail(url, section, e, title)
+
+
+# -------------------------------
+# 상세 페이지 여러 개 동시 크롤링 (입력 순서 유지)
+# -------------------------------
+def crawl_article_details(urls, section: str, max_workers: int | None = None, timeout: float | None = None):
+    """
+    urls 를 스레드 풀로 동시에 크롤링해서 입력 순서 그대로 결과 리스트 반환.
+    커넥션은 http_client 의 공유 세션을 재사용하고,
+    호스트당 동시 요청 수는 CRAWLER_PER_HOST_LIMIT 으로 제한된다.
+    실패한 기사는 예외 대신 failed_article_detail() 결과로 채워진다.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+
+    workers = min(max_workers or CRAWLER_MAX_WORKERS, len(urls))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="detail") as pool:
+        # map 은 제출 순서대로 결과를 돌려준다
+        return list(pool.map(lambda u: crawl_article_detail_safe(u, section, timeout=timeout), urls))
@@ -0,0 +1,133 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import WebDriverException
+
+
+# -------------------------------
+# 재사용 가능한 headless Chrome 풀
+# -------------------------------
+class DriverPool:
+    """
+    WebDriver 를 최대 size 개까지 띄워두고 섹션 크롤링마다 빌려준다.
+    - 반납할 때 쿠키/페이지 상태를 초기화해서 다음 사용에 영향이 없게 하고
+    - 누적 페이지 로드(count_page)가 max_pages 이상이거나 사용 중 WebDriverException 이 나면 quit 후 새로 띄운다.
+      (빌려가는 쪽이 페이지를 여러 번 불러도 반납 전에는 바꾸지 않으므로 교체는 반납 시점)
+    factory 는 새 드라이버를 만드는 함수 (crawler.get_driver).
+    """
+
+    def __init__(self, factory, size: int, max_pages: int, acquire_timeout: float):
+        self._factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = []            # 반납된 드라이버 (끝에서 꺼내 재사용)
+        self._pages = {}           # id(driver) -> 누적 페이지 로드 수
+        self._total = 0            # 현재 살아있는 드라이버 수 (빌려간 것 포함)
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _create(self):
+        # _total 은 호출 전에 이미 +1 되어 있음 (Chrome 기동은 락 밖에서)
+        try:
+            driver = self._factory()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        self._pages[id(driver)] = 0
+        return driver
+
+    def warm(self, n: int | None = None):
+        """
+        n 개(기본 size)까지 미리 띄워서 cold start 비용을 앞당긴다.
+        """
+        target = min(n or self.size, self.size)
+        while True:
+            with self._cond:
+                if self._total >= target:
+                    return
+                self._total += 1
+            driver = self._create()
+            with self._cond:
+                self._idle.append(driver)
+                self._cond.notify()
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("driver pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._total < self.size:
+                    self._total += 1
+                    break
+
+                # 다 빌려간 상태면 누가 반납(또는 폐기)할 때까지 대기
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RuntimeError(f"WebDriver 대기 시간 초과 ({self.acquire_timeout}s, size={self.size})")
+                self._cond.wait(remaining)
+
+        return self._create()
+
+    def _discard(self, driver):
+        self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+    def _reset(self, driver) -> bool:
+        try:
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
+
+    def count_page(self, driver, n: int = 1):
+        """
+        빌려간 드라이버로 페이지를 불러왔을 때(driver.get, "더보기" 클릭) 호출.
+        """
+        self._pages[id(driver)] = self._pages.get(id(driver), 0) + n
+
+    def _release(self, driver, broken: bool):
+        pages = self._pages.get(id(driver), 0)
+        if broken or self._closed or pages >= self.max_pages or not self._reset(driver):
+            self._discard(driver)
+            return
+        with self._cond:
+            self._idle.append(driver)
+            self._cond.notify()
+
+    @contextmanager
+    def driver(self):
+        """
+        with pool.driver() as driver: ...
+        """
+        driver = self._acquire()
+        broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self._release(driver, broken)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver in idle:
+            self._discard(driver)
@@ -0,0 +1,363 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # lxml 없으면 bs4 백엔드만 사용
+    etree = None
+    lxml_html = None
+
+# auto(기본): lxml 있으면 lxml, 없으면 bs4
+CRAWLER_PARSER = os.getenv("CRAWLER_PARSER", "auto")
+
+
+# -------------------------------
+# BeautifulSoup(html.parser) 백엔드 (기존 로직 그대로)
+# -------------------------------
+class Bs4Extractor:
+    name = "bs4"
+
+    def extract_article(self, html: str) -> dict:
+        soup = BeautifulSoup(html, "html.parser")
+
+        # 제목
+        title_tag = soup.find("h2", class_="media_end_head_headline")
+        title = title_tag.get_text(strip=True) if title_tag else None
+
+        # 본문
+        body_tag = soup.find("article", id="dic_area")
+        content = body_tag.get_text("\n", strip=True) if body_tag else None
+
+        # 발행일시
+        date_tag = soup.find(
+            "span",
+            class_="media_end_head_info_datestamp_time _ARTICLE_DATE_TIME"
+        )
+        published_at = date_tag.get("data-date-time") if date_tag else None
+        # 예: "2025-11-18 18:19:45"
+
+        # 원본 링크(지금은 DB에 안 넣지만 참고용)
+        origin_link_tag = soup.find("a", class_="media_end_head_origin_link")
+        origin_link = origin_link_tag.get("href") if origin_link_tag else None
+
+        # 기자명
+        author = None
+        for sel in [".media_end_head_journalist_name", ".byline", ".reporter"]:
+            tag = soup.select_one(sel)
+            if tag and tag.get_text(strip=True):
+                author = tag.get_text(strip=True)
+                break
+
+        # 언론사명
+        source = None
+        media_logo = soup.select_one(".media_end_head_top_logo img")
+        if media_logo and media_logo.get("alt"):
+            source = media_logo.get("alt").strip()
+
+        # 본문 이미지 중 첫 번째
+        image_url = None
+
+        # 1) 기사 본문 영역 안의 img 태그 우선 탐색
+        img_tag = soup.select_one("article#dic_area img")
+        if img_tag and img_tag.get("src"):
+            image_url = img_tag.get("src")
+
+        # 2) 그래도 없으면 og:image 메타 태그 fallback
+        if not image_url:
+            og_img = soup.find("meta", property="og:image")
+            if og_img and og_img.get("content"):
+                image_url = og_img.get("content")
+
+        return {
+            "title": title,
+            "author": author,
+            "content": content,
+            "published_at": published_at,
+            "source": source,
+            "origin_link": origin_link,
+            "image_url": image_url,
+        }
+
+    def extract_section(self, html: str):
+        """
+        목록 HTML → ([기사 dict, ...], 다음 페이지 cursor 또는 None)
+        """
+        soup = BeautifulSoup(html, "html.parser")
+
+        articles = []
+        for item in soup.select(".sa_item_inner"):
+            title_el = item.select_one(".sa_text_title._NLOG_IMPRESSION")
+            time_el = item.select_one(".sa_text_datetime b")
+            img_el = item.find("img")
+
+            link = title_el.get("href") if title_el else None
+            title = title_el.get_text(strip=True) if title_el else None
+            img = img_el.get("src") if img_el else None
+            time_text = time_el.get_text(strip=True) if time_el else None
+
+            articles.append(
+                {
+                    "title": title,
+                    "link": link,
+                    "thumbnail": img,
+                    "time": time_text,
+                }
+            )
+
+        cursor = None
+        metas = soup.select("[data-cursor]")
+        if metas and metas[-1].get("data-has-next") != "false":
+            cursor = metas[-1].get("data-cursor") or None
+
+        return articles, cursor
+
+
+# -------------------------------
+# lxml 백엔드 (미리 컴파일한 XPath)
+# -------------------------------
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# bs4 의 get_text 처럼 script/style/template 안의 문자열과 주석은 텍스트로 치지 않음
+_SKIP_TEXT_TAGS = {"script", "style", "template"}
+
+
+def _iter_text(el):
+    if not isinstance(el.tag, str) or el.tag in _SKIP_TEXT_TAGS:
+        return
+    if el.text:
+        yield el.text
+    for child in el:
+        yield from _iter_text(child)
+        if child.tail:
+            yield child.tail
+
+
+def _get_text(el, separator: str = "") -> str:
+    """
+    BeautifulSoup 의 get_text(separator, strip=True) 와 같은 결과.
+    """
+    return separator.join(s for s in (t.strip() for t in _iter_text(el)) if s)
+
+
+class LxmlExtractor:
+    name = "lxml"
+
+    def __init__(self):
+        xp = etree.XPath
+        self._title = xp(f"(//h2[{_has_class('media_end_head_headline')}])[1]")
+        self._body = xp("(//article[@id='dic_area'])[1]")
+        self._date = xp(
+            "(//span[normalize-space(@class)='media_end_head_info_datestamp_time _ARTICLE_DATE_TIME'])[1]"
+        )
+        self._origin = xp(f"(//a[{_has_class('media_end_head_origin_link')}])[1]")
+        self._authors = [
+            xp(f"(//*[{_has_class(name)}])[1]")
+            for name in ("media_end_head_journalist_name", "byline", "reporter")
+        ]
+        self._logo_img = xp(f"(//*[{_has_class('media_end_head_top_logo')}]//img)[1]")
+        self._body_img = xp("(//article[@id='dic_area']//img)[1]")
+        self._og_image = xp("(//meta[@property='og:image'])[1]")
+
+        self._items = xp(f"//*[{_has_class('sa_item_inner')}]")
+        self._item_title = xp(f"(.//*[{_has_class('sa_text_title')} and {_has_class('_NLOG_IMPRESSION')}])[1]")
+        self._item_time = xp(f"(.//*[{_has_class('sa_text_datetime')}]//b)[1]")
+        self._item_img = xp("(.//img)[1]")
+        self._cursor = xp("(//*[@data-cursor])[last()]")
+
+    @staticmethod
+    def _parse(html: str):
+        if not html or not html.strip():
+            return None
+        try:
+            return lxml_html.fromstring(html)
+        except ValueError:
+            # <?xml encoding=...?> 선언이 붙은 문자열은 bytes 로 넘겨야 함
+            return lxml_html.fromstring(html.encode("utf-8"))
+
+    @staticmethod
+    def _first(xpath, node):
+        found = xpath(node)
+        return found[0] if found else None
+
+    def extract_article(self, html: str) -> dict:
+        root = self._parse(html)
+        if root is None:
+            return get_extractor("bs4").extract_article(html or "")
+
+        title_tag = self._first(self._title, root)
+        title = _get_text(title_tag) if title_tag is not None else None
+
+        body_tag = self._first(self._body, root)
+        content = _get_text(body_tag, "\n") if body_tag is not None else None
+
+        date_tag = self._first(self._date, root)
+        published_at = date_tag.get("data-date-time") if date_tag is not None else None
+
+        origin_link_tag = self._first(self._origin, root)
+        origin_link = origin_link_tag.get("href") if origin_link_tag is not None else None
+
+        author = None
+        for xpath in self._authors:
+            tag = self._first(xpath, root)
+            if tag is not None:
+                text = _get_text(tag)
+                if text:
+                    author = text
+                    break
+
+        source = None
+        media_logo = self._first(self._logo_img, root)
+        if media_logo is not None and media_logo.get("alt"):
+            source = media_logo.get("alt").strip()
+
+        image_url = None
+        img_tag = self._first(self._body_img, root)
+        if img_tag is not None and img_tag.get("src"):
+            image_url = img_tag.get("src")
+
+        if not image_url:
+            og_img = self._first(self._og_image, root)
+            if og_img is not None and og_img.get("content"):
+                image_url = og_img.get("content")
+
+        return {
+            "title": title,
+            "author": author,
+            "content": content,
+            "published_at": published_at,
+            "source": source,
+            "origin_link": origin_link,
+            "image_url": image_url,
+        }
+
+    def extract_section(self, html: str):
+        root = self._parse(html)
+        if root is None:
+            return [], None
+
+        articles = []
+        for item in self._items(root):
+            title_el = self._first(self._item_title, item)
+            time_el = self._first(self._item_time, item)
+            img_el = self._first(self._item_img, item)
+
+            articles.append(
+                {
+                    "title": _get_text(title_el) if title_el is not None else None,
+                    "link": title_el.get("href") if title_el is not None else None,
+                    "thumbnail": img_el.get("src") if img_el is not None else None,
+                    "time": _get_text(time_el) if time_el is not None else None,
+                }
+            )
+
+        cursor = None
+        meta = self._first(self._cursor, root)
+        if meta is not None and meta.get("data-has-next") != "false":
+            cursor = meta.get("data-cursor") or None
+
+        return articles, cursor
+
+
+# -------------------------------
+# 백엔드 선택
+# -------------------------------
+EXTRACTORS = {"bs4": Bs4Extractor}
+if etree is not None:
+    EXTRACTORS["lxml"] = LxmlExtractor
+
+_extractors = {}
+
+
+def get_extractor(name: str | None = None):
+    """
+    name(기본 CRAWLER_PARSER) 에 맞는 추출기. auto 면 lxml 우선.
+    추출기는 상태가 없어서 프로세스 전체에서 하나씩만 만들어 공유한다.
+    """
+    name = name or CRAWLER_PARSER
+    if name == "auto":
+        name = "lxml" if "lxml" in EXTRACTORS else "bs4"
+    if name not in EXTRACTORS:
+        raise ValueError(f"지원하지 않는 CRAWLER_PARSER: {name} (가능: {sorted(EXTRACTORS)})")
+
+    extractor = _extractors.get(name)
+    if extractor is None:
+        extractor = _extractors[name] = EXTRACTORS[name]()
+    return extractor
+
+
+# -------------------------------
+# 벤치마크 / 백엔드 결과 비교
+# python -m crawler.extract article saved/*.html
+# python -m crawler.extract section --repeat 20 <CRAWLER_CACHE_DIR>
+# -------------------------------
+def _load_pages(paths):
+    """
+    .html 파일 또는 http_cache 의 .json.gz 파일(디렉터리면 안의 파일 전부)을 읽는다.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in sorted(names))
+        else:
+            files.append(path)
+
+    pages = []
+    for path in files:
+        if path.endswith(".json.gz"):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                pages.append((path, json.load(f)["body"]))
+        elif path.endswith((".html", ".htm", ".json")):
+            with open(path, encoding="utf-8") as f:
+                pages.append((path, f.read()))
+    return pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTML 추출 백엔드 벤치마크 + 결과 비교")
+    parser.add_argument("kind", choices=["article", "section"])
+    parser.add_argument("paths", nargs="+", help="저장해둔 .html / 캐시 .json.gz 파일 또는 디렉터리")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    pages = _load_pages(args.paths)
+    if not pages:
+        print("[ERROR] 읽을 페이지가 없습니다.")
+        return 1
+
+    outputs = {}
+    for name in EXTRACTORS:
+        extractor = get_extractor(name)
+        extract = extractor.extract_article if args.kind == "article" else extractor.extract_section
+        outputs[name] = [extract(html) for _, html in pages]
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for _, html in pages:
+                extract(html)
+        elapsed = time.perf_counter() - start
+        print(f"[BENCH] {name:5s} {len(pages) * args.repeat / elapsed:10.1f} pages/sec")
+
+    # 모든 백엔드 결과가 bs4 와 같은지
+    mismatches = 0
+    for name, results in outputs.items():
+        for (path, _), expected, got in zip(pages, outputs["bs4"], results):
+            if expected != got:
+                mismatches += 1
+                print(f"[DIFF] {name} {path}\n  bs4 ={expected!r}\n  {name}={got!r}")
+
+    print(f"[LOG] 페이지 {len(pages)}개, 백엔드 {list(outputs)}, 불일치 {mismatches}건")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
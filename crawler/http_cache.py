@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class CacheMissError(Exception):
+    """
+    오프라인(재생) 모드에서 캐시에 없는 url 을 요청했을 때.
+    """
+
+
+# -------------------------------
+# url 단위 on-disk 응답 캐시 (gzip + LRU + TTL)
+# -------------------------------
+class HttpCache:
+    """
+    url 하나당 파일 하나 (<dir>/<hash 앞 2자리>/<sha256>.json.gz).
+    본문과 함께 ETag / Last-Modified 를 저장해서 재요청 시 조건부 GET 에 쓴다.
+    - ttl_seconds 안이면 네트워크 없이 캐시 본문을 그대로 사용
+    - 전체 크기가 max_bytes 를 넘으면 가장 오래 안 쓴 파일(mtime 기준)부터 삭제
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def _scan(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json.gz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def get(self, url: str) -> dict | None:
+        path = self._path(url)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # LRU: 읽을 때마다 mtime 갱신
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, entry: dict, max_age: float | None = None) -> bool:
+        max_age = self.ttl_seconds if max_age is None else max_age
+        return time.time() - entry.get("fetched_at", 0) < max_age
+
+    def put(self, url: str, body: str, etag: str | None = None, last_modified: str | None = None):
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+            "body": body,
+        }
+        self._write(url, entry)
+
+    def touch(self, url: str, entry: dict):
+        """
+        304 Not Modified 받았을 때: 본문은 그대로, 받아온 시각만 갱신.
+        """
+        entry = dict(entry, fetched_at=time.time())
+        self._write(url, entry)
+
+    def _write(self, url: str, entry: dict):
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # 임시 파일에 쓰고 교체 (동시에 읽는 쪽이 깨진 파일을 보지 않도록)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+
+        with self._lock:
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            os.replace(tmp, path)
+            self._total_bytes += os.path.getsize(path) - old_size
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # 90% 까지 줄여서 매번 eviction 이 돌지 않게
+        target = int(self.max_bytes * 0.9)
+        for path, size, _ in sorted(self._scan(), key=lambda x: x[2]):
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._total_bytes -= size
+            except OSError:
+                pass
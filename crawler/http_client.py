@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from crawler.http_cache import CacheMissError, HttpCache
+from crawler.throttle import CircuitBreaker, TokenBucket, backoff_delay
+
+# -------------------------------
+# 크롤러 HTTP 설정 (env로 조정)
+# -------------------------------
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+CRAWLER_TIMEOUT = float(os.getenv("CRAWLER_TIMEOUT", "10"))               # 요청당 timeout(초)
+CRAWLER_MAX_WORKERS = int(os.getenv("CRAWLER_MAX_WORKERS", "16"))         # 상세 페이지 동시 요청 수
+CRAWLER_PER_HOST_LIMIT = int(os.getenv("CRAWLER_PER_HOST_LIMIT", "8"))    # 호스트당 동시 요청 상한
+
+# 응답 캐시 (CRAWLER_CACHE_DIR 가 비어 있으면 사용 안 함)
+CRAWLER_CACHE_DIR = os.getenv("CRAWLER_CACHE_DIR", "")
+CRAWLER_CACHE_MAX_MB = float(os.getenv("CRAWLER_CACHE_MAX_MB", "512"))
+CRAWLER_CACHE_TTL = float(os.getenv("CRAWLER_CACHE_TTL", "86400"))        # 이 시간(초) 안에는 재요청 없이 캐시 사용
+CRAWLER_CACHE_OFFLINE = os.getenv("CRAWLER_CACHE_OFFLINE", "0") == "1"     # 1 이면 네트워크 없이 캐시만 재생
+
+# 호스트별 속도 제한 / 재시도 / circuit breaker
+CRAWLER_RATE_PER_SEC = float(os.getenv("CRAWLER_RATE_PER_SEC", "10"))      # 0 이면 제한 없음
+CRAWLER_RATE_BURST = int(os.getenv("CRAWLER_RATE_BURST", "20"))
+CRAWLER_MAX_RETRIES = int(os.getenv("CRAWLER_MAX_RETRIES", "3"))
+CRAWLER_BACKOFF_BASE = float(os.getenv("CRAWLER_BACKOFF_BASE", "0.5"))     # 초
+CRAWLER_BACKOFF_MAX = float(os.getenv("CRAWLER_BACKOFF_MAX", "10"))        # 초
+CRAWLER_BREAKER_THRESHOLD = int(os.getenv("CRAWLER_BREAKER_THRESHOLD", "10"))  # 연속 실패 N번이면 차단, 0 이면 사용 안 함
+CRAWLER_BREAKER_COOLDOWN = float(os.getenv("CRAWLER_BREAKER_COOLDOWN", "30"))  # 차단 유지 시간(초)
+
+# 재시도할 응답 코드 (그 외 4xx 는 바로 실패)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+_hosts = {}
+_host_lock = threading.Lock()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# -------------------------------
+# keep-alive 커넥션을 재사용하는 공유 세션
+# -------------------------------
+def get_session() -> requests.Session:
+    """
+    프로세스 전체에서 하나의 requests.Session을 공유한다.
+    (기사마다 새 TCP/TLS 핸드셰이크를 하지 않도록 커넥션 풀 재사용)
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+
+                # 풀 크기는 동시 요청 수 이상이어야 커넥션이 버려지지 않음
+                pool_size = max(CRAWLER_MAX_WORKERS, CRAWLER_PER_HOST_LIMIT)
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+class _HostState:
+    """
+    호스트 하나에 대한 동시 요청 제한 + token bucket + circuit breaker
+    """
+
+    def __init__(self):
+        self.semaphore = threading.BoundedSemaphore(CRAWLER_PER_HOST_LIMIT)
+        self.bucket = TokenBucket(CRAWLER_RATE_PER_SEC, CRAWLER_RATE_BURST)
+        self.breaker = CircuitBreaker(CRAWLER_BREAKER_THRESHOLD, CRAWLER_BREAKER_COOLDOWN)
+
+
+def _host_state(url: str) -> _HostState:
+    host = urlsplit(url).netloc
+    with _host_lock:
+        state = _hosts.get(host)
+        if state is None:
+            state = _hosts[host] = _HostState()
+        return state
+
+
+def _retry_after(resp) -> float | None:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _get(url: str, headers: dict, timeout: float) -> requests.Response:
+    """
+    속도 제한 + 지터 붙은 지수 백오프 재시도 + circuit breaker 를 거친 GET.
+    타임아웃/연결 오류/RETRY_STATUSES 응답만 재시도하고, 끝까지 실패하면 마지막 예외를 던진다.
+    """
+    state = _host_state(url)
+
+    for attempt in range(CRAWLER_MAX_RETRIES + 1):
+        state.breaker.before_request()
+        state.bucket.acquire()
+
+        delay = None
+        try:
+            with state.semaphore:
+                resp = get_session().get(url, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            state.breaker.record_failure()
+            error = e
+        except Exception:
+            # 재시도하지 않는 오류도 실패로 기록해야 half-open 시험 요청이 풀린다
+            state.breaker.record_failure()
+            raise
+        else:
+            if resp.status_code not in RETRY_STATUSES:
+                state.breaker.record_success()
+                return resp
+            state.breaker.record_failure()
+            delay = _retry_after(resp)
+            error = requests.HTTPError(f"{resp.status_code} Server Error for url: {url}", response=resp)
+
+        if attempt == CRAWLER_MAX_RETRIES:
+            raise error
+
+        backoff = backoff_delay(attempt, CRAWLER_BACKOFF_BASE, CRAWLER_BACKOFF_MAX)
+        time.sleep(min(CRAWLER_BACKOFF_MAX, delay) if delay is not None else backoff)
+
+
+def get_cache() -> HttpCache | None:
+    global _cache
+    if not CRAWLER_CACHE_DIR:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HttpCache(
+                    CRAWLER_CACHE_DIR,
+                    max_bytes=int(CRAWLER_CACHE_MAX_MB * 1024 * 1024),
+                    ttl_seconds=CRAWLER_CACHE_TTL,
+                )
+    return _cache
+
+
+def fetch_html(url: str, timeout: float | None = None, max_age: float | None = None) -> str:
+    """
+    공유 세션으로 GET 후 본문 텍스트 반환.
+    호스트별 동시 요청 수(CRAWLER_PER_HOST_LIMIT)와 초당 요청 수(CRAWLER_RATE_PER_SEC)를 제한하고,
+    일시적인 오류는 백오프 후 재시도한다. 호스트가 차단 상태면 CircuitOpenError.
+
+    캐시가 켜져 있으면
+    - max_age(기본 CRAWLER_CACHE_TTL) 안에 받은 응답은 그대로 재사용
+    - 그보다 오래됐으면 ETag / Last-Modified 로 조건부 요청, 304 면 캐시 본문 사용
+    - max_age=0 이면 항상 조건부 요청 (목록 페이지처럼 자주 바뀌는 곳)
+    - CRAWLER_CACHE_OFFLINE=1 이면 네트워크 없이 캐시에 있는 것만 돌려준다
+    """
+    cache = get_cache()
+    entry = cache.get(url) if cache else None
+
+    if entry is not None and (CRAWLER_CACHE_OFFLINE or cache.is_fresh(entry, max_age)):
+        return entry["body"]
+    if cache is not None and CRAWLER_CACHE_OFFLINE:
+        raise CacheMissError(url)
+
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    resp = _get(url, headers, timeout or CRAWLER_TIMEOUT)
+
+    if resp.status_code == 304 and entry is not None:
+        cache.touch(url, entry)
+        return entry["body"]
+
+    resp.raise_for_status()
+    if cache is not None:
+        cache.put(url, resp.text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+    return resp.text
@@ -0,0 +1,89 @@
+import random
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """
+    호스트 요청이 연속으로 실패해서 차단(open) 상태일 때.
+    """
+
+
+# -------------------------------
+# 호스트별 token bucket
+# -------------------------------
+class TokenBucket:
+    """
+    초당 rate 개씩 토큰이 차고 최대 burst 개까지 쌓인다.
+    acquire() 는 토큰이 생길 때까지 기다렸다가 하나 가져간다.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:   # 0 이하면 제한 없음
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# -------------------------------
+# 호스트별 circuit breaker
+# -------------------------------
+class CircuitBreaker:
+    """
+    연속 실패가 threshold 번 쌓이면 cooldown 초 동안 요청을 바로 거절(open).
+    cooldown 이 지나면 요청 하나만 시험으로 보내고(half-open),
+    성공하면 다시 정상(closed), 실패하면 다시 open.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        if self.threshold <= 0:   # 0 이하면 사용 안 함
+            return
+        with self._lock:
+            if self._failures < self.threshold:
+                return
+            now = time.monotonic()
+            if now < self._open_until or self._probing:
+                raise CircuitOpenError(f"circuit open ({self._failures}회 연속 실패)")
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self.threshold:
+                self._open_until = time.monotonic() + self.cooldown
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    지수 백오프 + full jitter: 0 ~ min(cap, base * 2^attempt) 사이 랜덤.
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
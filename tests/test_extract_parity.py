@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler.extract import EXTRACTORS, get_extractor
+
+# lxml 이 없는 환경에서는 비교할 상대가 없으므로 건너뜀
+pytest.importorskip("lxml")
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "naver")
+
+
+def _fixtures(prefix: str) -> list:
+    return sorted(name for name in os.listdir(FIXTURE_DIR) if name.startswith(prefix) and name.endswith(".html"))
+
+
+def _read(name: str) -> str:
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_both_backends_available():
+    assert set(EXTRACTORS) == {"bs4", "lxml"}
+
+
+@pytest.mark.parametrize("name", _fixtures("article_"))
+def test_extract_article_parity(name):
+    html = _read(name)
+    assert get_extractor("lxml").extract_article(html) == get_extractor("bs4").extract_article(html)
+
+
+@pytest.mark.parametrize("name", _fixtures("section_"))
+def test_extract_section_parity(name):
+    html = _read(name)
+    assert get_extractor("lxml").extract_section(html) == get_extractor("bs4").extract_section(html)
+
+
+@pytest.mark.parametrize("backend", ["bs4", "lxml"])
+def test_article_text_skips_markup_noise(backend):
+    result = get_extractor(backend).extract_article(_read("article_markup_noise.html"))
+
+    assert result["title"] == '금리 동결에시장"안도"'
+    assert result["content"].splitlines()[:2] == ["한국은행이 기준금리를 연 3.25%로 동결했다.", "시장은 <안도> 하는 분위기다."]
+    for hidden in ("광고", "display: none", "템플릿", "주석", "본문 시작"):
+        assert hidden not in result["content"]
+    assert result["author"] == "김철수 기자 kim@joongang.co.kr"
+    assert result["image_url"] == "https://imgnews.pstatic.net/image/og/025/2025/11/18/og_0002.jpg"
+
+
+@pytest.mark.parametrize("backend", ["bs4", "lxml"])
+def test_section_items_and_cursor(backend):
+    items, cursor = get_extractor(backend).extract_section(_read("section_page.html"))
+
+    assert cursor == "2025111817000001"
+    assert [item["time"] for item in items] == ["5분전", "1시간전", None]
+    assert items[1]["thumbnail"] is None
+    assert items[2]["link"] is None
+
+    items, cursor = get_extractor(backend).extract_section(_read("section_last_page.html"))
+    assert cursor is None
+    assert items[0]["title"] == "마지막 페이지기사"